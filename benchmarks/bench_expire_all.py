@@ -0,0 +1,84 @@
+"""
+
+    Benchmark: expiration day over every account in a LocalFileSystemAccountAdapter.
+
+    "serial" is what the market adapter does today: load an account, expire_options on it (which asks
+      the quote adapter what day it is and for its underlyings), write it back, one account at a time.
+      "expire_all" indexes the expired positions of each batch, quotes every underlying once, and loads
+      and writes the accounts across a pool of threads. The quote adapter sleeps a little per request,
+      like one that goes over the network.
+
+    usage (from the repository root): python -m benchmarks.bench_expire_all
+
+"""
+import random
+import tempfile
+import time
+
+from paperbroker.accounts import Account
+from paperbroker.adapters.accounts import LocalFileSystemAccountAdapter
+from paperbroker.adapters.markets.PaperMarketAdapter import PaperMarketAdapter
+from paperbroker.assets import Asset, asset_factory
+from paperbroker.logic.expire_all import expire_all
+from paperbroker.positions import Position
+from paperbroker.tests.TestDataQuoteAdapter import TestDataQuoteAdapter
+
+
+class SlowQuoteAdapter(TestDataQuoteAdapter):
+
+    def __init__(self, latency):
+        super(SlowQuoteAdapter, self).__init__(current_date='2017-01-28')
+        self.latency = latency
+        self.requests = 0
+
+    def get_quote(self, asset):
+        self.requests += 1
+        time.sleep(self.latency)
+        return super(SlowQuoteAdapter, self).get_quote(asset)
+
+    def get_quotes(self, assets):
+        self.requests += 1
+        time.sleep(self.latency)
+        return super(SlowQuoteAdapter, self).get_quotes(assets)
+
+
+def make_accounts(account_adapter, count, rng):
+    """Accounts of options expiring on the 27th, some later ones and some shares"""
+    expiring = ['AAL170127{}000{}000'.format(option_type, strike) for option_type in 'CP' for strike in (46, 47, 48)]
+    later = ['AAL170203C00047000', 'AAL170203P00046000']
+    for i in range(count):
+        positions = [Position(asset_factory(rng.choice(expiring)), rng.choice([-2, -1, 1, 2]), cost_basis=0.5) for _ in range(3)]
+        positions += [Position(asset_factory(rng.choice(later)), rng.randint(1, 3))]
+        positions.append(Position(Asset('AAL'), 100 * rng.randint(0, 3), cost_basis=47.0))
+        account = Account(positions=positions, account_id='account{:05d}'.format(i))
+        account.cash = 100000
+        account_adapter.put_account(account)
+
+
+def serial(account_adapter, quote_adapter):
+    market_adapter = PaperMarketAdapter(quote_adapter)
+    for account_id in account_adapter.get_account_ids():
+        account = account_adapter.get_account(account_id)
+        market_adapter.expire_options(account, quote_adapter)
+        account_adapter.put_account(account)
+
+
+def main():
+    rng = random.Random(1)
+    quote_adapter = SlowQuoteAdapter(latency=0.002)
+    for count in (500, 2000):
+        for name, run in (('serial', lambda adapter: serial(adapter, quote_adapter)),
+                          ('expire_all', lambda adapter: expire_all(adapter, quote_adapter, '2017-01-28'))):
+            # each run needs its own accounts, since expiring them is the point
+            account_adapter = LocalFileSystemAccountAdapter(root=tempfile.mkdtemp())
+            make_accounts(account_adapter, count, rng)
+            quote_adapter.requests = 0
+            start = time.perf_counter()
+            run(account_adapter)
+            seconds = time.perf_counter() - start
+            print('{:>5} accounts {:<11} {:>8.1f} ms  {:>7.1f} us/account  {:>5} quote requests'.format(
+                count, name, seconds * 1000, seconds / count * 1e6, quote_adapter.requests))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+
+    Benchmark: the maintenance margin part of filling an order, in accounts with 25 to 200 underlyings.
+
+    "full" is how fill_order used to work, grouping every position of every underlying into strategies
+      after each fill. "incremental" is fill_order now, regrouping only the underlying the order was in
+      and keeping the margin of the others from account.margin_by_underlying.
+
+    Every underlying holds stock, a covered call and a few put credit spreads, priced off the AAL
+      test data for 2017-01-27.
+
+    usage (from the repository root): python -m benchmarks.bench_incremental_margin
+
+"""
+import timeit
+
+from paperbroker.accounts import Account
+from paperbroker.adapters.quotes.SnapshotQuoteAdapter import SnapshotQuoteAdapter
+from paperbroker.assets import asset_factory
+from paperbroker.logic.fill_order import fill_order
+from paperbroker.logic.maintenance_margin import get_maintenance_margin, invalidate_maintenance_margin, update_maintenance_margin
+from paperbroker.orders import Order
+from paperbroker.quotes import Quote, OptionQuote
+from paperbroker.tests.TestDataQuoteAdapter import TestDataQuoteAdapter
+
+SPREADS = [('AAL170203P00047000', 'AAL170203P00046000'), ('AAL170203P00046500', 'AAL170203P00045500'),
+           ('AAL170210P00047000', 'AAL170210P00045000')]
+
+
+def make_quote_adapter(underlyings):
+    """The AAL quotes of the symbols the benchmark trades, copied to each underlying"""
+    test_data = TestDataQuoteAdapter(current_date='2017-01-27')
+    symbols = ['AAL', 'AAL170203C00048000', 'AAL170203P00044000'] + [_ for spread in SPREADS for _ in spread]
+    quotes = []
+    for underlying in underlyings:
+        for quote in test_data.get_quotes(symbols):
+            asset = asset_factory(underlying + quote.asset.symbol[3:])
+            if isinstance(quote, OptionQuote):
+                quotes.append(OptionQuote(quote.quote_date, asset, bid=quote.bid, ask=quote.ask, underlying_price=quote.underlying_price))
+            else:
+                quotes.append(Quote(quote.quote_date, asset, bid=quote.bid, ask=quote.ask))
+    return SnapshotQuoteAdapter(quotes)
+
+
+def order(*legs):
+    order = Order()
+    for asset, quantity, order_type in legs:
+        order.add_leg(asset=asset, quantity=quantity, order_type=order_type)
+    return order
+
+
+def make_account(quote_adapter, underlyings):
+    account = Account()
+    account.cash = 10000000
+    for underlying in underlyings:
+        fill_order(account=account, order=order((underlying, 100, 'bto')), quote_adapter=quote_adapter)
+        fill_order(account=account, order=order((underlying + '170203C00048000', -1, 'sto')), quote_adapter=quote_adapter)
+        for sell, buy in SPREADS:
+            fill_order(account=account, order=order((underlying + sell[3:], -1, 'sto'), (underlying + buy[3:], 1, 'bto')),
+                       quote_adapter=quote_adapter)
+    return account
+
+
+def main():
+    underlyings = ['U{:03d}'.format(_) for _ in range(200)]
+    quote_adapter = make_quote_adapter(underlyings)
+
+    for size in (25, 50, 100, 200):
+        account = make_account(quote_adapter, underlyings[:size])
+        touched = underlyings[size // 2]
+
+        # what each fill pays for its margin, with the order's positions already changed
+        fill_order(account=account, order=order((touched + '170203P00044000', 1, 'bto')), quote_adapter=quote_adapter)
+
+        def full():
+            return get_maintenance_margin(positions=account.positions, quote_adapter=quote_adapter)
+
+        def incremental():
+            invalidate_maintenance_margin(account, [touched])
+            return update_maintenance_margin(account, quote_adapter=quote_adapter, underlyings=[touched])
+
+        assert full() == incremental()
+
+        for name, margin in (('full', full), ('incremental', incremental)):
+            seconds = min(timeit.repeat(margin, number=20, repeat=3)) / 20
+            print('{:>3} underlyings ({:>4} positions) {:<11} {:>8.3f} ms/order'.format(size, len(account.positions), name, seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
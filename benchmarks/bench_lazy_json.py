@@ -0,0 +1,85 @@
+"""
+
+    Benchmark: decoding Google Finance's lazy JSON option chains.
+
+    Compares the tokenize based fixLazyJson GoogleFinanceQuoteAdapter used to fall back to
+      against adapters.quotes.lazy_json, on the recorded chains in tests/test_data/google_option_chain
+      and on one large chain built from every AAL and GOOG option in the test data.
+    Both have to decode every payload to the same result.
+
+    usage (from the repository root): python -m benchmarks.bench_lazy_json
+
+"""
+import csv
+import glob
+import gzip
+import json
+import os
+import timeit
+import token
+import tokenize
+from io import StringIO
+
+from paperbroker.adapters.quotes.lazy_json import lazy_json_to_json
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'paperbroker', 'tests', 'test_data')
+
+
+def fixLazyJson(in_text):
+    """The decoder GoogleFinanceQuoteAdapter used before lazy_json"""
+    tokengen = tokenize.generate_tokens(StringIO(in_text.decode('ascii')).readline)
+
+    result = []
+    for tokid, tokval, _, _, _ in tokengen:
+        if (tokid == token.NAME):
+            if tokval not in ['true', 'false', 'null', '-Infinity', 'Infinity', 'NaN']:
+                tokid = token.STRING
+                tokval = u'"%s"' % tokval
+
+        elif (tokid == token.STRING):
+            if tokval.startswith("'"):
+                tokval = u'"%s"' % tokval[1:-1].replace('"', '\\"')
+
+        elif (tokid == token.OP) and ((tokval == '}') or (tokval == ']')):
+            if (len(result) > 0) and (result[-1][1] == ','):
+                result.pop()
+
+        result.append((tokid, tokval))
+
+    return tokenize.untokenize(result)
+
+
+def large_chain():
+    """Every option in the test data as one lazy JSON chain"""
+    with gzip.open(os.path.join(TEST_DATA, 'data.csv.gz'), 'rt') as f:
+        rows = [row for row in csv.reader(f, delimiter='\t') if len(row[0]) > 8]
+
+    options = ['{cid:"%d",s:"%s",e:"OPRA",p:"-",c:"-",b:"%s",a:"%s",oi:"-",vol:"-",strike:"%.2f",expiry:\'%s\'}' % (
+        i, row[0], row[2], row[3], int(row[0][-8:]) / 1000, row[1]) for i, row in enumerate(rows)]
+    half = len(options) // 2
+    return ('{expiry:{y:2017,m:1,d:27},expirations:[{y:2017,m:1,d:27},],puts:[%s,],calls:[%s],underlying_id:"660463",underlying_price:47.36}'
+            % (','.join(options[:half]), ','.join(options[half:]))).encode('ascii')
+
+
+def report(name, seconds, size):
+    print('{:<32} {:>10.2f} ms {:>8.1f} MB/s'.format(name, seconds * 1000, size / seconds / 1e6))
+
+
+def main(repeat=5):
+    payloads = [('recorded ' + os.path.basename(_), open(_, 'rb').read()) for _ in sorted(glob.glob(os.path.join(TEST_DATA, 'google_option_chain', '*.json')))]
+    payloads.append(('large chain', large_chain()))
+
+    for name, payload in payloads:
+        if json.loads(fixLazyJson(payload)) != json.loads(lazy_json_to_json(payload)):
+            raise Exception("bench_lazy_json: {} decoded differently".format(name))
+
+        old = min(timeit.repeat(lambda: fixLazyJson(payload), number=1, repeat=repeat))
+        new = min(timeit.repeat(lambda: lazy_json_to_json(payload), number=1, repeat=repeat))
+        print('{} ({} bytes)'.format(name, len(payload)))
+        report('  fixLazyJson (tokenize)', old, len(payload))
+        report('  lazy_json_to_json', new, len(payload))
+        print('  {:.1f}x faster'.format(old / new))
+
+
+if __name__ == '__main__':
+    main()
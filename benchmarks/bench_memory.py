@@ -0,0 +1,85 @@
+"""
+
+    Memory benchmark: bytes per object for assets, quotes, positions and legs.
+
+    "before" rebuilds each object as a plain class holding the same attributes in a __dict__,
+      which is how these classes were stored before they had __slots__.
+    "after" is the slotted class itself.
+
+    usage (from the repository root): python -m benchmarks.bench_memory
+
+"""
+import csv
+import gzip
+import os
+import tracemalloc
+
+from paperbroker.assets import Option, Asset
+from paperbroker.orders import Leg
+from paperbroker.positions import Position
+from paperbroker.quotes import Quote, OptionQuote
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'paperbroker', 'tests', 'test_data', 'data.csv.gz')
+
+
+class DictBacked(object):
+    def __init__(self, state):
+        self.__dict__.update(state)
+
+
+def asset_state(asset):
+    return {name: getattr(asset, name) for name in ('symbol', 'asset_type', 'underlying', 'option_type',
+                                                    'strike', 'expiration_date', 'expiration_ordinal')
+            if hasattr(asset, name)}
+
+
+def measure(build):
+    """
+    :return: (bytes allocated by build(), the objects it built)
+    """
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    return sum(_.size_diff for _ in after.compare_to(before, 'filename')), objects
+
+
+def main():
+    with gzip.open(TEST_DATA, 'rt') as f:
+        rows = [row for row in csv.reader(f, delimiter='\t')]
+
+    option_rows = [row for row in rows if len(row[0]) > 8]
+    symbols = sorted(set(row[0] for row in option_rows))
+
+    builders = [
+        ('Option', symbols, lambda s: Option(s)),
+        ('Quote', rows, lambda r: Quote(r[1], r[0][:3], bid=r[2], ask=r[3])),
+        ('OptionQuote', option_rows, lambda r: OptionQuote(r[1], Option(r[0]), bid=r[2], ask=r[3])),
+        ('Position', option_rows, lambda r: Position(Option(r[0]), 1, float(r[2]), position_id=r[0])),
+        ('Leg', option_rows, lambda r: Leg(Option(r[0]), 1, 'bto', float(r[2]))),
+    ]
+
+    print('{} rows of test data'.format(len(rows)))
+    for name, inputs, build in builders:
+        # Option() and the quote's asset are built up front so only the measured object is counted
+        prepared = [build(_) for _ in inputs]
+        states = [asset_state(_) if isinstance(_, Asset) else _.__getstate__() for _ in prepared]
+
+        before, _ = measure(lambda: [DictBacked(state) for state in states])
+        after, _ = measure(lambda: [_fill(type(p), state) for p, state in zip(prepared, states)])
+
+        print('{:<12} {:>7} objects {:>7.0f} bytes/object before {:>7.0f} bytes/object after'.format(
+            name, len(prepared), before / len(prepared), after / len(prepared)))
+
+
+def _fill(cls, state):
+    """Build an instance of cls holding state without re-running __init__ (which would allocate its own values)"""
+    obj = object.__new__(cls)
+    for name, value in state.items():
+        object.__setattr__(obj, name, value)
+    return obj
+
+
+if __name__ == '__main__':
+    main()
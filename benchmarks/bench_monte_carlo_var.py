@@ -0,0 +1,44 @@
+"""
+
+    Benchmark: 1-day 99% Monte Carlo VaR with 100,000 paths on an account of 1,000 positions across
+      the AAL chains of 2017-01-27, at a few chunk sizes.
+
+    "grid" is the default, pricing the options on a grid of the underlying's moves and interpolating each
+      path, "exact" (grid_points=None) reprices every option on every path, at 10,000 paths.
+    Peak memory is what numpy allocates while simulating (tracemalloc).
+
+    usage (from the repository root): python -m benchmarks.bench_monte_carlo_var
+
+"""
+import random
+import time
+import tracemalloc
+
+from benchmarks.bench_scenario_grid import make_account
+from paperbroker.logic.monte_carlo_var import monte_carlo_var
+from paperbroker.tests.TestDataQuoteAdapter import TestDataQuoteAdapter
+
+
+def main():
+    quote_adapter = TestDataQuoteAdapter(current_date='2017-01-27')
+    account = make_account(quote_adapter, 1000, random.Random(3))
+    options = len(set(_.asset.symbol for _ in account.positions))
+
+    # solve the quotes' implied volatilities first
+    monte_carlo_var(account, paths=10, seed=1)
+
+    runs = [('grid', 100000, chunk_size, 2001) for chunk_size in (500, 2000, 10000)]
+    runs += [('grid', 10000, 2000, 2001), ('exact', 10000, 2000, None)]
+    for name, paths, chunk_size, grid_points in runs:
+        tracemalloc.start()
+        start = time.perf_counter()
+        report = monte_carlo_var(account, paths=paths, seed=1, chunk_size=chunk_size, grid_points=grid_points)
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print('{} assets {:<5} {:>6} paths, chunks of {:>5}: {:>6.2f} s  peak {:>6.1f} MB  VaR {:>10.2f}  ES {:>10.2f}'.format(
+            options, name, paths, chunk_size, seconds, peak / 1e6, report.var, report.expected_shortfall))
+
+
+if __name__ == '__main__':
+    main()
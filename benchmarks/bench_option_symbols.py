@@ -0,0 +1,67 @@
+"""
+
+    Micro-benchmark: building Option objects from OCC symbols.
+
+    Compares the old arrow based parsing against paperbroker.logic.option_symbols over every
+      option symbol in the included test data (full AAL and GOOG chains on four dates)
+
+    usage (from the repository root): python -m benchmarks.bench_option_symbols
+
+"""
+import csv
+import gzip
+import os
+import timeit
+
+import arrow
+
+from paperbroker.assets import Option
+from paperbroker.logic.option_symbols import decode_option_symbol
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'paperbroker', 'tests', 'test_data', 'data.csv.gz')
+
+
+def load_option_symbols():
+    with gzip.open(TEST_DATA, 'rt') as f:
+        return sorted(set(row[0] for row in csv.reader(f, delimiter='\t') if len(row[0]) > 8))
+
+
+def arrow_decode(symbol):
+    """The parsing Option.__init__ used to do for every symbol"""
+    r = symbol[::-1]
+    strike = float(r[0:8][::-1]) / 1000
+    option_type = 'call' if r[8] == 'C' else 'put'
+    expiration_date = arrow.get(r[9:15][::-1], 'YYMMDD').format('YYYY-MM-DD')
+    return r[15:][::-1], expiration_date, option_type, strike
+
+
+def arrow_days_to_expiration(expiration_date, as_of_date):
+    return (arrow.get(expiration_date) - arrow.get(as_of_date)).days
+
+
+def report(name, seconds, count):
+    print('{:<40} {:>10.1f} ms {:>10.2f} us/symbol'.format(name, seconds * 1000, seconds / count * 1e6))
+
+
+def main(repeat=3):
+    symbols = load_option_symbols()
+    print('{} option symbols'.format(len(symbols)))
+
+    old = min(timeit.repeat(lambda: [arrow_decode(s) for s in symbols], number=1, repeat=repeat))
+    new = min(timeit.repeat(lambda: [decode_option_symbol(s) for s in symbols], number=1, repeat=repeat))
+    report('decode (arrow)', old, len(symbols))
+    report('decode (option_symbols)', new, len(symbols))
+
+    # Option() directly so the asset_factory interning cache is not involved
+    construct = min(timeit.repeat(lambda: [Option(s) for s in symbols], number=1, repeat=repeat))
+    report('Option(symbol)', construct, len(symbols))
+
+    options = [Option(s) for s in symbols]
+    old = min(timeit.repeat(lambda: [arrow_days_to_expiration(o.expiration_date, '2017-01-27') for o in options], number=1, repeat=repeat))
+    new = min(timeit.repeat(lambda: [o.get_days_to_expiration('2017-01-27') for o in options], number=1, repeat=repeat))
+    report('days to expiration (arrow)', old, len(options))
+    report('days to expiration (ordinals)', new, len(options))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+
+    Benchmark: the end of day margin sweep over every account in a LocalFileSystemAccountAdapter.
+
+    "serial" loads each account and runs get_maintenance_margin on it, one account at a time.
+      "sweep" is get_portfolio_risk, flattening the accounts into columns and working out every
+      margin at once, then again with the accounts loaded across a pool of 2 processes.
+    Loading the pickles is most of both, so the margin part is also timed on its own, with the
+      accounts already loaded.
+
+    usage (from the repository root): python -m benchmarks.bench_portfolio_risk
+
+"""
+import random
+import tempfile
+import time
+
+from paperbroker.accounts import Account
+from paperbroker.adapters.accounts import LocalFileSystemAccountAdapter
+from paperbroker.assets import Asset, asset_factory
+from paperbroker.logic.maintenance_margin import get_maintenance_margin
+from paperbroker.logic.portfolio_risk import flatten_accounts, get_portfolio_risk, summarize
+from paperbroker.positions import Position
+from paperbroker.tests.TestDataQuoteAdapter import TestDataQuoteAdapter
+
+
+def make_accounts(account_adapter, count, rng):
+    """Accounts of credit and debit spreads, long options and covered calls in AAL"""
+    symbols = ['AAL1702{}{}000{}000'.format(expiration, option_type, strike) for expiration in ('03', '10')
+               for option_type in ('C', 'P') for strike in (44, 45, 46, 47, 48, 49)]
+    for i in range(count):
+        positions = [Position(asset_factory(rng.choice(symbols)), rng.randint(1, 4)) for _ in range(2)]
+        for option_type in 'CP':
+            sell, buy = rng.sample([_ for _ in symbols if _[9] == option_type], 2)
+            quantity = rng.randint(1, 10)
+            positions += [Position(asset_factory(sell), -quantity), Position(asset_factory(buy), quantity)]
+        positions.append(Position(Asset('AAL'), 100 * rng.randint(0, 3)))
+        account = Account(positions=positions, account_id='account{:05d}'.format(i))
+        account.cash = rng.choice([1000, 100000])
+        account_adapter.put_account(account)
+
+
+def serial_margins(accounts, quote_adapter):
+    margins = {}
+    for account in accounts:
+        try:
+            margins[account.account_id] = get_maintenance_margin(positions=account.positions, quote_adapter=quote_adapter)
+        except Exception:
+            margins[account.account_id] = None
+    return margins
+
+
+def serial(account_adapter, quote_adapter):
+    return serial_margins((account_adapter.get_account(_) for _ in account_adapter.get_account_ids()), quote_adapter)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    quote_adapter = TestDataQuoteAdapter(current_date='2017-01-27')
+    for count in (500, 2000):
+        account_adapter = LocalFileSystemAccountAdapter(root=tempfile.mkdtemp())
+        make_accounts(account_adapter, count, random.Random(1))
+
+        accounts = [account_adapter.get_account(_) for _ in account_adapter.get_account_ids()]
+
+        for name, sweep in (('serial', lambda: serial(account_adapter, quote_adapter)),
+                            ('sweep', lambda: get_portfolio_risk(account_adapter, quote_adapter)),
+                            ('sweep x2', lambda: get_portfolio_risk(account_adapter, quote_adapter, processes=2)),
+                            ('serial margin only', lambda: serial_margins(accounts, quote_adapter)),
+                            ('sweep margin only', lambda: summarize(flatten_accounts(accounts), quote_adapter))):
+            seconds = min(timed(sweep) for _ in range(3))
+            print('{:>5} accounts {:<18} {:>8.1f} ms  {:>7.1f} us/account'.format(count, name, seconds * 1000, seconds / count * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+
+    Benchmark: PaperBroker.enter_order throughput on recorded quote traffic.
+
+    Records a simulated trading day (orders for random AAL and GOOG options, one a second) through a
+      RecordingQuoteAdapter over the test data, then enters the same orders again with the quotes served by
+      a ReplayQuoteAdapter. Last, the recorded quote calls are replayed at 100x their recorded pace.
+
+    usage (from the repository root): python -m benchmarks.bench_replay [orders]
+
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from paperbroker import PaperBroker
+from paperbroker.adapters.accounts import LocalFileSystemAccountAdapter
+from paperbroker.adapters.quotes import HistoricalQuoteAdapter, RecordingQuoteAdapter, ReplayQuoteAdapter
+from paperbroker.orders import Order
+from paperbroker.quote_store import ColumnarQuoteStore
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'paperbroker', 'tests', 'test_data', 'data.csv.gz')
+
+QUOTE_DATE = '2017-01-27'
+
+# seconds between orders in the simulated day
+ORDER_INTERVAL = 1.0
+
+# open a new account every this many orders so positions don't pile up
+ORDERS_PER_ACCOUNT = 20
+
+
+class SimulatedClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_orders(quote_adapter, count, seed=0):
+    """
+    :return: count single leg option orders on options with a price, calls are bought and puts sold
+               (a long and a short option at the same strike can't be grouped for margin)
+    """
+    rng = random.Random(seed)
+    options = [_.asset for _ in quote_adapter.get_options(None, None) if _.is_priceable()]
+    calls = [_ for _ in options if _.option_type == 'call']
+    puts = [_ for _ in options if _.option_type == 'put']
+
+    orders = []
+    for _ in range(count):
+        order = Order()
+        if rng.random() < 0.5:
+            order.add_leg(asset=rng.choice(calls), quantity=1, order_type='bto')
+        else:
+            order.add_leg(asset=rng.choice(puts), quantity=-1, order_type='sto')
+        orders.append(order)
+    return orders
+
+
+def enter_orders(broker, orders, on_order=None):
+    """:return: Seconds taken to enter every order"""
+    started = time.perf_counter()
+    account = None
+    for i, order in enumerate(orders):
+        if i % ORDERS_PER_ACCOUNT == 0:
+            account = broker.open_account()
+        if on_order is not None:
+            on_order(i)
+        broker.enter_order(account, order)
+    return time.perf_counter() - started
+
+
+def main(count=500):
+    directory = tempfile.mkdtemp()
+    account_adapter = LocalFileSystemAccountAdapter(root=directory)
+    filename = os.path.join(directory, 'day.quotes.gz')
+
+    live = HistoricalQuoteAdapter(ColumnarQuoteStore.from_csv(TEST_DATA), current_date=QUOTE_DATE)
+    orders = make_orders(live, count)
+
+    clock = SimulatedClock()
+    recorder = RecordingQuoteAdapter(live, filename, flush=False, clock=clock)
+
+    def tick(i):
+        clock.now = i * ORDER_INTERVAL
+
+    recorded = enter_orders(PaperBroker(quote_adapter=recorder, account_adapter=account_adapter), orders, on_order=tick)
+    recorder.close()
+
+    baseline = enter_orders(PaperBroker(quote_adapter=live, account_adapter=account_adapter), orders)
+
+    loading = time.perf_counter()
+    replay = ReplayQuoteAdapter(filename)
+    loading = time.perf_counter() - loading
+
+    replayed = enter_orders(PaperBroker(quote_adapter=replay, account_adapter=account_adapter), orders)
+
+    day = replay.calls[-1][0]
+    paced = time.perf_counter()
+    replay.replay(replay, speed=100)
+    paced = time.perf_counter() - paced
+
+    print('{} orders, {} quote calls recorded to {} bytes over a simulated {:.0f} seconds'.format(
+        count, len(replay.calls), os.path.getsize(filename), day))
+    print('{:<32} {:>8.0f} orders/s'.format('recording', count / recorded))
+    print('{:<32} {:>8.0f} orders/s'.format('historical adapter', count / baseline))
+    print('{:<32} {:>8.0f} orders/s   (loaded in {:.3f}s)'.format('replay adapter', count / replayed, loading))
+    print('{:<32} {:>8.2f}s for a {:.0f}s day'.format('quote calls replayed at 100x', paced, day))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
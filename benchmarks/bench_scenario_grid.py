@@ -0,0 +1,50 @@
+"""
+
+    Benchmark: a 50 x 50 grid of spot (-10%..+10%) and volatility (-5..+5 points) shocks on accounts of
+      100 to 5,000 option and stock positions across the AAL chains of 2017-01-27.
+
+    The first run of each size includes solving the implied volatility of quotes that haven't been
+      solved yet, the best of the repeats after that is the grid itself.
+
+    usage (from the repository root): python -m benchmarks.bench_scenario_grid
+
+"""
+import random
+import time
+
+import numpy as np
+
+from paperbroker.accounts import Account
+from paperbroker.logic.scenario_risk import scenario_grid
+from paperbroker.positions import Position
+from paperbroker.tests.TestDataQuoteAdapter import TestDataQuoteAdapter
+
+
+def make_account(quote_adapter, size, rng):
+    options = [_ for _ in quote_adapter.get_options('AAL') if _.is_priceable()]
+    stock = quote_adapter.get_quote('AAL')
+    positions = []
+    for i in range(size):
+        quote = stock if i % 10 == 0 else rng.choice(options)
+        positions.append(Position(quote.asset, rng.choice([-3, -1, 1, 2, 5]), quote.price, quote=quote))
+    return Account(positions=positions)
+
+
+def main():
+    quote_adapter = TestDataQuoteAdapter(current_date='2017-01-27')
+    spot_shocks, vol_shocks = np.linspace(-0.1, 0.1, 50), np.linspace(-5, 5, 50)
+    rng = random.Random(3)
+
+    for size in (100, 1000, 5000):
+        account = make_account(quote_adapter, size, rng)
+        times = []
+        for _ in range(4):
+            start = time.perf_counter()
+            scenario_grid(account, spot_shocks, vol_shocks)
+            times.append(time.perf_counter() - start)
+        options = len(set(_.asset.symbol for _ in account.positions))
+        print('{:>5} positions ({:>3} assets)  first {:>7.1f} ms  grid {:>7.1f} ms'.format(size, options, times[0] * 1000, min(times[1:]) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+
+    Benchmark: simulating a one leg order against accounts with thousands of positions.
+
+    "deepcopy" is how PaperMarketAdapter.simulate_order used to work, filling the order into a deep copy
+      of the account and the order. "overlay" is simulate_order now, filling it into an AccountOverlay.
+    Both still compute the maintenance margin of the whole account after the fill.
+
+    usage (from the repository root): python -m benchmarks.bench_simulate_order
+
+"""
+import timeit
+from copy import deepcopy
+
+from paperbroker.accounts import Account
+from paperbroker.adapters.markets import PaperMarketAdapter
+from paperbroker.logic.fill_order import fill_order
+from paperbroker.orders import Order
+from paperbroker.positions import Position
+from paperbroker.tests.TestDataQuoteAdapter import TestDataQuoteAdapter
+
+
+def make_account(quote_adapter, size):
+    """An account of size long option and stock lots, each with its quote attached"""
+    options = [_ for _ in quote_adapter.get_options('AAL') if _.is_priceable()]
+    stock = quote_adapter.get_quote('AAL')
+    positions = []
+    for i in range(size):
+        quote = options[i % len(options)] if i % 2 == 0 else stock
+        positions.append(Position(quote.asset, 1, quote.price, quote=quote))
+    return Account(positions=positions)
+
+
+def main():
+    quote_adapter = TestDataQuoteAdapter(current_date='2017-01-27')
+    market_adapter = PaperMarketAdapter(quote_adapter)
+
+    order = Order()
+    order.add_leg(asset='AAL170203P00046500', quantity=1, order_type='bto')
+
+    def with_deepcopy(account):
+        return fill_order(account=deepcopy(account), order=deepcopy(order), quote_adapter=quote_adapter)
+
+    def with_overlay(account):
+        return market_adapter.simulate_order(account=account, order=order)
+
+    for size in (500, 5000):
+        account = make_account(quote_adapter, size)
+        number = max(1, 5000 // size)
+        for name, simulate in (('deepcopy', with_deepcopy), ('overlay', with_overlay)):
+            seconds = min(timeit.repeat(lambda: simulate(account), number=number, repeat=3)) / number
+            print('{:>5} positions {:<9} {:>9.2f} ms/order'.format(size, name, seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""
+
+    Benchmark: grouping one underlying into strategies as its positions grow from 10 to 5,000 contracts.
+
+    The positions are the same eight options (put and call credit spreads, covered calls and some extra
+      long options) at every size, only the quantities change. Grouping works on one bucket per option,
+      so its cost stays with the number of options rather than the number of contracts.
+
+    usage (from the repository root): python -m benchmarks.bench_strategy_grouping
+
+"""
+import timeit
+
+from paperbroker.assets import Asset, asset_factory
+from paperbroker.logic.group_into_basic_strategies import group_into_basic_strategies
+from paperbroker.positions import Position
+
+
+def make_positions(contracts):
+    legs = [('AAL170203P00047000', -1), ('AAL170203P00046000', 1), ('AAL170203P00045000', -1), ('AAL170203P00044000', 1),
+            ('AAL170203C00048000', -1), ('AAL170203C00049000', 1), ('AAL170210C00050000', -1), ('AAL170210P00043000', 1)]
+    positions = [Position(asset_factory(symbol), sign * contracts) for symbol, sign in legs]
+    positions.append(Position(Asset('AAL'), 100 * contracts))
+    return positions
+
+
+def main():
+    for contracts in (10, 100, 1000, 5000):
+        positions = make_positions(contracts)
+        seconds = min(timeit.repeat(lambda: group_into_basic_strategies(positions), number=200, repeat=3)) / 200
+        print('{:>5} contracts a position  {:>3} strategies  {:>8.3f} ms'.format(contracts, len(group_into_basic_strategies(positions)), seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+
+    AsyncPaperBroker
+
+    PaperBroker for asyncio code, every call is a coroutine:
+        from paperbroker import AsyncPaperBroker
+        broker = AsyncPaperBroker()
+        account = await broker.open_account()
+        await broker.buy_to_open(account, 'AAPL', 10)
+
+    Orders are filled the same way PaperBroker fills them. The quotes an order needs (every leg, and the short
+      positions its margin depends on) are fetched concurrently first, then the order is filled against them
+      without going back upstream.
+
+    Synchronous quote and account adapters work too, their calls run on a thread pool.
+
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from math import copysign
+
+from .adapters.quotes import QuoteAdapter, AsyncQuoteAdapter, ThreadedAsyncQuoteAdapter, AsyncGoogleFinanceQuoteAdapter
+from .adapters.quotes import SnapshotQuoteAdapter
+
+from .adapters.accounts import AccountAdapter
+from .adapters.accounts import LocalFileSystemAccountAdapter
+
+from .adapters.markets.PaperMarketAdapter import PaperMarketAdapter
+
+from .accounts import Account
+from .orders import Order
+from .estimators import Estimator
+from .assets import Asset, Option, asset_factory
+
+from .logic.validate_account import validate_account
+
+
+class AsyncPaperBroker():
+
+    def __init__(self, quote_adapter=None, account_adapter:AccountAdapter=None, estimator:Estimator=None, executor=None):
+        """
+        :param quote_adapter: An AsyncQuoteAdapter, or a QuoteAdapter to run on the thread pool. AsyncGoogleFinanceQuoteAdapter by default
+        :param account_adapter: Its calls run on the thread pool. LocalFileSystemAccountAdapter by default
+        :param estimator: How orders are priced
+        :param executor: The thread pool synchronous adapters run on, a new ThreadPoolExecutor by default
+        """
+        self.executor = executor if executor is not None else ThreadPoolExecutor()
+
+        if quote_adapter is None:
+            quote_adapter = AsyncGoogleFinanceQuoteAdapter(executor=self.executor)
+        elif isinstance(quote_adapter, QuoteAdapter):
+            quote_adapter = ThreadedAsyncQuoteAdapter(quote_adapter, executor=self.executor)
+        elif not isinstance(quote_adapter, AsyncQuoteAdapter):
+            raise Exception("AsyncPaperBroker: quote_adapter must be a QuoteAdapter or an AsyncQuoteAdapter")
+
+        self.quote_adapter = quote_adapter
+        self.account_adapter = account_adapter if account_adapter is not None else LocalFileSystemAccountAdapter()
+        self.estimator = estimator if estimator is not None else Estimator()
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def get_price(self, asset):
+        quote = await self.get_quote(asset)
+        return quote.price if quote is not None else None
+
+    async def get_quote(self, asset):
+        return await self.quote_adapter.get_quote(asset)
+
+    async def get_quotes(self, assets):
+        return await self.quote_adapter.get_quotes(assets)
+
+    async def get_options(self, underlying_asset=None, expiration_date=None):
+        return await self.quote_adapter.get_options(underlying_asset, expiration_date)
+    async def get_option_quotes(self, underlying_asset=None, expiration_date=None):
+        return await self.get_options(underlying_asset=underlying_asset, expiration_date=expiration_date)
+
+    async def get_expiration_dates(self, underlying_asset=None):
+        return await self.quote_adapter.get_expiration_dates(underlying_asset)
+
+    async def open_account(self):
+        account = Account()
+        await self._run(self.account_adapter.put_account, account)
+        return account
+
+    async def get_account(self, account_id:str=None):
+        return await self._run(self.account_adapter.get_account, account_id)
+
+    async def buy_to_open(self, account: Account=None, asset:Asset=None, quantity = 1, simulate=False):
+        o = Order()
+        o.add_leg(asset=asset_factory(asset), quantity=abs(quantity), order_type='bto')
+        return await self.enter_order(account, o, simulate=simulate)
+
+    async def sell_to_open(self, account: Account=None, asset:Asset=None, quantity = 1, simulate=False):
+        o = Order()
+        o.add_leg(asset=asset_factory(asset), quantity=abs(quantity)*-1, order_type='sto')
+        return await self.enter_order(account, o, simulate=simulate)
+
+    async def buy_to_close(self, account: Account=None, asset:Asset=None, quantity = 1, simulate=False):
+        o = Order()
+        o.add_leg(asset=asset_factory(asset), quantity=abs(quantity), order_type='btc')
+        return await self.enter_order(account, o, simulate=simulate)
+
+    async def sell_to_close(self, account: Account=None, asset:Asset=None, quantity = 1, simulate=False):
+        o = Order()
+        o.add_leg(asset=asset_factory(asset), quantity=abs(quantity)*-1, order_type='stc')
+        return await self.enter_order(account, o, simulate=simulate)
+
+    async def _market_adapter(self, account: Account, order: Order):
+        """
+            A PaperMarketAdapter whose quotes were all fetched at once: every leg, and every short non-option
+              position the maintenance margin will need. Short positions that can't be quoted are left out,
+              filling only fails on them if they are still needed
+        """
+        leg_assets = [leg.asset for leg in order.legs]
+        short_assets = list({position.asset.symbol: position.asset for position in account.positions
+                             if copysign(1, position.quantity) < 0 and not isinstance(position.asset, Option)}.values())
+
+        results = await asyncio.gather(self.quote_adapter.get_quotes(leg_assets),
+                                       *[self.quote_adapter.get_quote(_) for _ in short_assets],
+                                       return_exceptions=True)
+
+        if isinstance(results[0], BaseException):
+            raise results[0]
+
+        quote_adapter = SnapshotQuoteAdapter(results[0])
+        quote_adapter.add_quotes([_ for _ in results[1:] if not isinstance(_, BaseException)])
+        return PaperMarketAdapter(quote_adapter, estimator=self.estimator)
+
+    async def enter_order(self, account: Account, order: Order, estimator:Estimator=None, simulate=False):
+        market_adapter = await self._market_adapter(account, order)
+
+        if simulate:
+            return market_adapter.simulate_order(account=account, order=order, estimator=estimator)
+
+        # enter order always simulates first but only executes on simulate=False
+        market_adapter.simulate_order(account=account, order=order, estimator=estimator)
+        market_adapter.enter_order(account=account, order=order, estimator=estimator)
+        await self._run(self.account_adapter.put_account, account)
+        return account
+
+    async def simulate_order(self, account: Account, order: Order, estimator:Estimator=None):
+        market_adapter = await self._market_adapter(account, order)
+        account_after = market_adapter.simulate_order(account=account, order=order, estimator=estimator).account1
+        validate_account(account_after)
+        account_after.account_id = account_after.account_id + "_simulated_order"
+        return account_after
+
+    async def close_position(self, account:Account, position=None, simulate=False):
+        return await self.close_positions(account, [position], simulate=simulate)
+
+    async def close_positions(self, account:Account, positions=None, simulate=False):
+        if positions is None:
+            positions = []
+
+        btc = {}
+        stc = {}
+        assets_by_symbol = {}
+        for p in positions:
+            assets_by_symbol[p.asset.symbol] = p.asset
+            if p.quantity > 0:
+                stc[p.asset.symbol] = stc.get(p.asset.symbol, 0) + p.quantity
+            else:
+                btc[p.asset.symbol] = btc.get(p.asset.symbol, 0) + p.quantity
+
+        o = Order()
+        for s in stc.keys():
+            o.add_leg(order_type = 'stc', asset=assets_by_symbol[s], quantity=-1*stc[s])
+        for b in btc.keys():
+            o.add_leg(order_type = 'btc', asset=assets_by_symbol[b], quantity=abs(btc[b]))
+
+        return await self.enter_order(account=account, order=o, simulate=simulate)
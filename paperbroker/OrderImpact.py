@@ -12,14 +12,16 @@ class OrderImpact():
     order - the order itself
     actual_commission - The amount of commission charged for the order
     actual_fill_price - The actual price that the order filled at
+    validation_error - Why the order can't go through (it couldn't fill, or failed validate_account), None if it can
 
     """
-    def __init__(self, account0 = None, account1 = None, order = None, actual_commission = None, actual_fill_price = None):
+    def __init__(self, account0 = None, account1 = None, order = None, actual_commission = None, actual_fill_price = None, validation_error = None):
         self.account0 = account0
         self.account1 = account1
         self.order = order
         self.actual_commission = actual_commission
         self.actual_fill_price = actual_fill_price
+        self.validation_error = validation_error
 
     @property
     def change_in_cash(self):
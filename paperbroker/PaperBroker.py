@@ -11,6 +11,7 @@
 """
 from .adapters.quotes import QuoteAdapter
 from .adapters.quotes import GoogleFinanceQuoteAdapter
+from .adapters.quotes import CachingQuoteAdapter
 
 from .adapters.accounts import AccountAdapter
 from .adapters.accounts import LocalFileSystemAccountAdapter
@@ -24,11 +25,15 @@ from .estimators import Estimator
 from .assets import Asset, asset_factory
 
 from .logic.validate_account import validate_account
+from .logic.simulate_orders import simulate_orders
+from .logic.portfolio_risk import get_portfolio_risk
+from .logic.monte_carlo_var import simulate_var
+from .logic.expire_all import expire_all
 
 class PaperBroker():
 
     def __init__(self, quote_adapter:QuoteAdapter=None, account_adapter:AccountAdapter=None, market_adapter:MarketAdapter=None):
-        self.quote_adapter = quote_adapter if quote_adapter is not None else GoogleFinanceQuoteAdapter()
+        self.quote_adapter = quote_adapter if quote_adapter is not None else CachingQuoteAdapter(GoogleFinanceQuoteAdapter())
         self.account_adapter = account_adapter if account_adapter is not None else LocalFileSystemAccountAdapter()
         self.market_adapter = market_adapter if market_adapter is not None else PaperMarketAdapter(self.quote_adapter)
 
@@ -39,6 +44,9 @@ class PaperBroker():
     def get_quote(self, asset):
         return self.quote_adapter.get_quote(asset)
 
+    def get_quotes(self, assets):
+        return self.quote_adapter.get_quotes(assets)
+
     def get_options(self, underlying_asset=None, expiration_date=None):
         return self.quote_adapter.get_options(underlying_asset, expiration_date)
     def get_option_quotes(self, underlying_asset=None, expiration_date=None):
@@ -87,11 +95,47 @@ class PaperBroker():
         return account
 
     def simulate_order(self, account: Account, order: Order, estimator:Estimator=None):
-        account_after = self.market_adapter.simulate_order(account=account, order=order, estimator=estimator)
+        account_after = self.market_adapter.simulate_order(account=account, order=order, estimator=estimator).account1
         validate_account(account_after)
         account_after.account_id = account_after.account_id + "_simulated_order"
         return account_after
 
+    def simulate_orders(self, account: Account, orders, estimator:Estimator=None, fail_fast=False, processes=None):
+        """
+            Simulate many candidate orders against the same account at once, see logic.simulate_orders
+        :return: A list of OrderImpacts in the same order as orders
+        """
+        estimator = estimator if estimator is not None else getattr(self.market_adapter, 'estimator', None)
+        pending_orders = [_.order for _ in getattr(self.market_adapter, 'pending_orders', []) if _.account == account]
+        return simulate_orders(account, orders, self.quote_adapter, estimator=estimator, fail_fast=fail_fast,
+                               processes=processes, pending_orders=pending_orders)
+
+    def get_portfolio_risk(self, account_ids=None, processes=None):
+        """
+            Margin, cash and net liquidation value of every account at once, see logic.portfolio_risk
+        :return: A numpy structured array with one row per account, margin calls first
+        """
+        return get_portfolio_risk(self.account_adapter, self.quote_adapter, account_ids=account_ids, processes=processes)
+
+    def get_value_at_risk(self, account_ids=None, **kwargs):
+        """
+            Monte Carlo VaR and expected shortfall of every account, on the same paths, see logic.monte_carlo_var
+        :param kwargs: Passed to simulate_var (paths, confidence, horizon_days, seed, ...)
+        :return: A list of RiskReports
+        """
+        account_ids = account_ids if account_ids is not None else self.account_adapter.get_account_ids()
+        accounts = [self.account_adapter.get_account(_) for _ in account_ids]
+        return simulate_var(accounts, quote_adapter=self.quote_adapter, **kwargs)
+
+    def expire_all(self, as_of, account_ids=None, **kwargs):
+        """
+            Close the options of every account that expired before as_of, see logic.expire_all
+        :param kwargs: Passed to expire_all (workers, batch_size)
+        :return: A list of ExpirationResults, one per account
+        """
+        return expire_all(self.account_adapter, self.quote_adapter, as_of, account_ids=account_ids,
+                          market_adapter=self.market_adapter, **kwargs)
+
     def close_position(self, account:Account, position=None, simulate=False):
         return self.close_positions(account, [position], simulate=simulate)
 
@@ -1 +1,2 @@
-from .PaperBroker import PaperBroker
\ No newline at end of file
+from .PaperBroker import PaperBroker
+from .AsyncPaperBroker import AsyncPaperBroker
@@ -9,6 +9,9 @@
 import random
 import string
 
+from .positions import PositionList, PositionOverlay
+from .logic.lot_policy import validate_lot_policy
+
 def account_factory(account):
     if isinstance(account, Account):
         return account
@@ -17,11 +20,88 @@ def account_factory(account):
 
 class Account():
 
-    def __init__(self, positions=None, account_id:str=None):
+    def __init__(self, positions=None, account_id:str=None, lot_policy='separate'):
+        """
+        :param lot_policy: How fills become positions, 'separate', 'aggregate', 'fifo' or 'lifo'. See logic.lot_policy
+        """
         self.account_id = account_id if account_id is not None else 'account' + ''.join(random.choice(string.ascii_uppercase + string.digits) for _ in range(10))
         self.cash = 10000
         self.maintenance_margin = 0.0
         self.positions = positions if positions is not None else []
+        self.lot_policy = validate_lot_policy(lot_policy)
+
+        # {underlying: margin requirement} behind maintenance_margin, see logic.maintenance_margin.update_maintenance_margin
+        self.margin_by_underlying = {}
+
+    @property
+    def positions(self):
+        """A PositionList, which also indexes the positions by symbol, underlying and expiration"""
+        return self._positions
+
+    @positions.setter
+    def positions(self, positions):
+        self._positions = positions if isinstance(positions, PositionList) else PositionList(positions)
+        self.margin_by_underlying = {}
+
+    def __getstate__(self):
+        # pickled as it was before positions were indexed, so accounts load either way
+        state = dict(self.__dict__)
+        state['positions'] = list(state.pop('_positions'))
+        return state
+
+    def __setstate__(self, state):
+        state = dict(state)
+        positions = state.pop('positions', [])
+        state.setdefault('lot_policy', 'separate')
+        margin_by_underlying = state.pop('margin_by_underlying', {})
+        self.__dict__.update(state)
+        self.positions = positions
+        self.margin_by_underlying = margin_by_underlying
+
+
+class AccountOverlay(Account):
+    """
+    A copy-on-write view of an account, for simulating orders.
+
+    Cash, margin and the other attributes are copied (they are numbers), the positions are a
+      PositionOverlay that only copies the positions an order changes. Filling an order into an
+      overlay costs the same however many positions the account has, and the account doesn't change.
+
+    Pickling or deep copying an overlay gives a plain Account.
+
+    usage: simulated = fill_order(account=AccountOverlay(account), order=order, quote_adapter=quote_adapter)
+    """
+
+    def __init__(self, account: Account):
+        state = dict(account.__dict__)
+        state.pop('_positions', None)
+        self.__dict__.update(state)
+        self.base = account
+        self._positions = PositionOverlay(account.positions)
+
+    @property
+    def positions(self):
+        return self._positions
+
+    @positions.setter
+    def positions(self, positions):
+        raise Exception("AccountOverlay: positions can't be replaced, change them through the overlay")
+
+    def __getstate__(self):
+        state = super(AccountOverlay, self).__getstate__()
+        state.pop('base')
+        return state
+
+    def to_account(self):
+        """:return: A plain Account with the overlay's positions, the unchanged ones are shared with the base"""
+        return account_from_state(self.__getstate__())
 
+    def __reduce_ex__(self, protocol):
+        return account_from_state, (self.__getstate__(),)
 
 
+def account_from_state(state):
+    """:return: The Account pickled as state"""
+    account = Account.__new__(Account)
+    account.__setstate__(state)
+    return account
@@ -1,8 +1,8 @@
 from ...orders import Order
-from ...accounts import Account
+from ...accounts import Account, AccountOverlay
 from ...adapters.quotes import QuoteAdapter
 from ...estimators import Estimator
-from copy import deepcopy
+from copy import copy
 
 from .MarketAdapter import MarketAdapter
 
@@ -56,14 +56,14 @@ class PaperMarketAdapter(MarketAdapter):
     def simulate_order(self, account: Account, order: Order, estimator:Estimator=None):
         estimator = estimator if estimator is not None else self.estimator
 
-        # since we are simulating the order, make a copy of the account and the order
-        # we'll force the order against the account and check the values at the end
-        account_copy = deepcopy(account)
-        order_copy = deepcopy(order)
+        # since we are simulating the order, fill it into a copy-on-write overlay of the account and a copy of the order
+        # (filling only changes an order's status) and check the values at the end
+        account_copy = AccountOverlay(account)
+        order_copy = copy(order)
 
-        # force fill copies of any open orders against copies of this account
+        # force fill copies of any open orders against the same overlay
         for pending_order in [_ for _ in self.pending_orders if _.account == account]:
-            account_copy = fill_order(account=account_copy, order=deepcopy(pending_order.order), estimator=estimator, quote_adapter=self.quote_adapter)
+            account_copy = fill_order(account=account_copy, order=copy(pending_order.order), estimator=estimator, quote_adapter=self.quote_adapter)
 
         # now fill this order against a copy of the account
         fill_order(account=account_copy, order=order_copy, estimator=estimator, quote_adapter=self.quote_adapter)
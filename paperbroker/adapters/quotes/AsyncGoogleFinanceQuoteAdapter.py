@@ -0,0 +1,54 @@
+import asyncio
+
+from ...assets import asset_factory, Option
+from .AsyncQuoteAdapter import ThreadedAsyncQuoteAdapter
+from .GoogleFinanceQuoteAdapter import GoogleFinanceQuoteAdapter, MAX_CHAIN_WORKERS
+
+
+"""
+    Get current prices from Google Finance without blocking the event loop
+
+    The HTTP requests run on a thread pool but are split up so they overlap: an option chain and its
+      underlying's quote are fetched together, and get_quotes fetches the equities and every chain it needs at once.
+
+    usage: quote_adapter = AsyncGoogleFinanceQuoteAdapter()
+           quotes = await quote_adapter.get_quotes(['AAL', 'AAL170203C00047000'])
+"""
+class AsyncGoogleFinanceQuoteAdapter(ThreadedAsyncQuoteAdapter):
+
+    def __init__(self, vectorized_greeks=False, option_chain_url=None, max_workers=None, expiration_ttl=3600, executor=None):
+        """
+        :param executor: The concurrent.futures executor the requests run on, a new ThreadPoolExecutor by default
+        The rest are passed to GoogleFinanceQuoteAdapter
+        """
+        max_workers = max_workers if max_workers is not None else MAX_CHAIN_WORKERS
+        super(AsyncGoogleFinanceQuoteAdapter, self).__init__(
+            GoogleFinanceQuoteAdapter(vectorized_greeks=vectorized_greeks, option_chain_url=option_chain_url,
+                                      max_workers=max_workers, expiration_ttl=expiration_ttl),
+            executor=executor, max_workers=max_workers)
+
+    async def get_quote(self, asset):
+        return (await self.get_quotes([asset]))[0]
+
+    async def get_quotes(self, assets):
+        adapter = self.quote_adapter
+        assets = [asset_factory(_) for _ in assets]
+        equities = sorted(set(_.symbol for _ in assets if not isinstance(_, Option)))
+        chains = adapter._chains_of(assets)
+
+        results = await asyncio.gather(self.run(adapter._equity_quotes, equities),
+                                       *[self.get_options(underlying, expiration_date) for underlying, expiration_date in chains])
+
+        quotes = results[0]
+        for options in results[1:]:
+            for quote in options:
+                quotes.setdefault(quote.asset.symbol, quote)
+
+        return adapter._in_order(assets, quotes)
+
+    async def get_options(self, underlying_asset=None, expiration_date=None):
+        adapter = self.quote_adapter
+        oc, underlying_quote = await asyncio.gather(
+            self.run(lambda: adapter._option_chain(underlying_asset, expiration_date=expiration_date)),
+            self.run(adapter.get_quote, underlying_asset))
+        return adapter._option_quotes(oc, expiration_date, underlying_quote)
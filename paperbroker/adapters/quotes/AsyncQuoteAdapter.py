@@ -0,0 +1,67 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from .QuoteAdapter import QuoteAdapter
+
+
+class AsyncQuoteAdapter:
+    """
+        The asyncio version of QuoteAdapter, every lookup is a coroutine
+    """
+
+    async def get_quote(self, asset):
+        raise NotImplementedError("AsyncQuoteAdapter.get_quote: You should subclass this and create an adapter.")
+
+    async def get_quotes(self, assets):
+        """
+            Quotes for many assets at once. This awaits get_quote for every asset concurrently, override it
+              when the data source can do better than one request per asset
+        :return: A list of quotes in the same order as assets
+        """
+        return list(await asyncio.gather(*[self.get_quote(asset) for asset in assets]))
+
+    async def get_options(self, underlying_asset=None, expiration_date=None):
+        raise NotImplementedError("AsyncQuoteAdapter.get_options: You should subclass this and create an adapter.")
+
+    async def get_expiration_dates(self, underlying_asset=None):
+        raise NotImplementedError("AsyncQuoteAdapter.get_expiration_dates: You should subclass this and create an adapter.")
+
+
+"""
+    Makes any QuoteAdapter awaitable by running its calls on a thread pool, so a slow lookup
+      doesn't block the event loop and several lookups can run at once.
+
+    get_quotes is one call to the wrapped adapter's get_quotes, which keeps its bulk behavior.
+
+    usage: quote_adapter = ThreadedAsyncQuoteAdapter(CachingQuoteAdapter(GoogleFinanceQuoteAdapter()))
+           quote = await quote_adapter.get_quote('AAPL')
+"""
+class ThreadedAsyncQuoteAdapter(AsyncQuoteAdapter):
+
+    def __init__(self, quote_adapter: QuoteAdapter, executor=None, max_workers=None):
+        """
+        :param quote_adapter: The synchronous adapter to wrap
+        :param executor: The concurrent.futures executor to run calls on, a new ThreadPoolExecutor by default
+        :param max_workers: The size of the new ThreadPoolExecutor
+        """
+        self.quote_adapter = quote_adapter
+        self.executor = executor if executor is not None else ThreadPoolExecutor(max_workers=max_workers)
+
+    async def run(self, fn, *args):
+        """:return: fn(*args), run on the executor"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def get_quote(self, asset):
+        return await self.run(self.quote_adapter.get_quote, asset)
+
+    async def get_quotes(self, assets):
+        return await self.run(self.quote_adapter.get_quotes, list(assets))
+
+    async def get_options(self, underlying_asset=None, expiration_date=None):
+        return await self.run(self.quote_adapter.get_options, underlying_asset, expiration_date)
+
+    async def get_expiration_dates(self, underlying_asset=None):
+        return await self.run(self.quote_adapter.get_expiration_dates, underlying_asset)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,143 @@
+import threading
+import time
+
+from ...assets import asset_factory, Option
+from ...caches import ExpiringLRUCache, SingleFlight
+from .QuoteAdapter import QuoteAdapter
+
+# what the cache returns for a key it doesn't have, quotes can be None
+_missing = object()
+
+"""
+    Wraps any QuoteAdapter with a bounded cache whose entries expire.
+
+    Equity quotes, option quotes, option chains and expiration date lists each have their own time to live
+      in seconds (None keeps them until they are evicted, 0 doesn't cache them). Every option quote in a
+      chain is cached too, so quoting an option after fetching its chain doesn't go upstream.
+    At most max_entries are kept, the least recently used go first.
+
+    Concurrent requests for something that is already being fetched wait for that fetch rather than
+      starting their own.
+
+    The cache doesn't know about dates, so don't wrap historical adapters whose current_date changes.
+
+    usage: quote_adapter = CachingQuoteAdapter(GoogleFinanceQuoteAdapter(), equity_ttl=15)
+           quote_adapter.stats()
+"""
+class CachingQuoteAdapter(QuoteAdapter):
+
+    kinds = ('equities', 'options', 'chains', 'expirations')
+
+    def __init__(self, quote_adapter: QuoteAdapter, equity_ttl=15, option_ttl=60, chain_ttl=60, expiration_ttl=3600,
+                 max_entries=10000, clock=time.monotonic):
+        """
+        :param quote_adapter: The adapter to cache
+        :param equity_ttl: Seconds to keep equity (non-option) quotes
+        :param option_ttl: Seconds to keep option quotes
+        :param chain_ttl: Seconds to keep the results of get_options
+        :param expiration_ttl: Seconds to keep the results of get_expiration_dates
+        :param max_entries: The most entries to keep
+        :param clock: Returns the current time in seconds
+        """
+        self.quote_adapter = quote_adapter
+        self.ttls = {'equities': equity_ttl, 'options': option_ttl, 'chains': chain_ttl, 'expirations': expiration_ttl}
+        self.cache = ExpiringLRUCache(maxsize=max_entries, clock=clock)
+        self.flights = SingleFlight()
+        self.hits = {_: 0 for _ in self.kinds}
+        self.misses = {_: 0 for _ in self.kinds}
+        self.fetches = {_: 0 for _ in self.kinds}
+        self._counter_lock = threading.Lock()
+
+    def _count(self, counter, kind):
+        with self._counter_lock:
+            counter[kind] += 1
+
+    def _put(self, kind, key, value):
+        if self.ttls[kind] != 0:
+            self.cache.put(key, value, ttl=self.ttls[kind])
+        return value
+
+    def _lookup(self, kind, key):
+        """:return: (found, value)"""
+        value = self.cache.get(key, _missing)
+        if value is _missing:
+            self._count(self.misses, kind)
+            return False, None
+        self._count(self.hits, kind)
+        return True, value
+
+    def get_quote(self, asset):
+        return self.get_quotes([asset])[0]
+
+    def get_quotes(self, assets):
+        assets = [asset_factory(_) for _ in assets]
+
+        quotes = {}
+        missing = []
+        seen = set()
+        for asset in assets:
+            if asset.symbol in seen:
+                continue
+            seen.add(asset.symbol)
+            found, quote = self._lookup('options' if isinstance(asset, Option) else 'equities', ('quote', asset.symbol))
+            if found:
+                quotes[asset.symbol] = quote
+            else:
+                missing.append(asset)
+
+        if len(missing) > 0:
+            fetched = self.flights.do_many([('quote', _.symbol) for _ in missing], self._fetch_quotes)
+            for asset, quote in zip(missing, fetched):
+                quotes[asset.symbol] = quote
+
+        return [quotes[_.symbol] for _ in assets]
+
+    def _fetch_quotes(self, keys):
+        assets = [asset_factory(symbol) for _, symbol in keys]
+        for asset in assets:
+            self._count(self.fetches, 'options' if isinstance(asset, Option) else 'equities')
+
+        quotes = self.quote_adapter.get_quotes(assets)
+        for asset, key, quote in zip(assets, keys, quotes):
+            self._put('options' if isinstance(asset, Option) else 'equities', key, quote)
+        return quotes
+
+    def get_options(self, underlying_asset=None, expiration_date=None):
+        key = ('chain', asset_factory(underlying_asset).symbol if underlying_asset is not None else None, expiration_date)
+        found, options = self._lookup('chains', key)
+        if found:
+            return list(options)
+
+        def fetch():
+            self._count(self.fetches, 'chains')
+            options = self.quote_adapter.get_options(underlying_asset, expiration_date)
+            for quote in options:
+                self._put('options', ('quote', quote.asset.symbol), quote)
+            return self._put('chains', key, options)
+
+        return list(self.flights.do(key, fetch))
+
+    def get_expiration_dates(self, underlying_asset=None):
+        key = ('expirations', asset_factory(underlying_asset).symbol if underlying_asset is not None else None)
+        found, expiration_dates = self._lookup('expirations', key)
+        if found:
+            return list(expiration_dates)
+
+        def fetch():
+            self._count(self.fetches, 'expirations')
+            return self._put('expirations', key, self.quote_adapter.get_expiration_dates(underlying_asset))
+
+        return list(self.flights.do(key, fetch))
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self):
+        """
+        :return: {kind: {hits, misses, fetches}} for each kind of entry, plus 'cache' (size, evictions, expirations...)
+                   and 'coalesced', the requests that waited for a fetch that was already running
+        """
+        stats = {_: {'hits': self.hits[_], 'misses': self.misses[_], 'fetches': self.fetches[_]} for _ in self.kinds}
+        stats['cache'] = self.cache.stats()
+        stats['coalesced'] = self.flights.coalesced
+        return stats
@@ -2,67 +2,125 @@ import arrow
 from ...assets import asset_factory, Option
 from ...quotes import OptionQuote, Quote
 from .QuoteAdapter import QuoteAdapter
+from ...logic.option_symbols import encode_expiration
+from ...logic.vectorized_option_greeks import set_option_quote_greeks
+from ...caches import ExpiringLRUCache
+from .lazy_json import json_decode
 from googlefinance import getQuotes
 
 
 
 """
     Get current prices from Google Finance
+
+    Nothing is cached here, PaperBroker wraps this in a CachingQuoteAdapter by default
 """
 class GoogleFinanceQuoteAdapter(QuoteAdapter):
 
-    def __init__(self):
-        self._cache = {}
-    def _set_cache(self, quote):
-        self._cache[quote.asset.symbol] = quote
-        return quote
+    def __init__(self, vectorized_greeks=False, option_chain_url=None, max_workers=None, expiration_ttl=3600):
+        """
+        :param vectorized_greeks: Solve the greeks for a whole chain at once with logic.vectorized_option_greeks
+        :param option_chain_url: Where to get option chains from, Google Finance by default
+        :param max_workers: The most expirations of a chain to fetch at once, also the size of the connection pool
+        :param expiration_ttl: Seconds to remember the expiration dates of an underlying
+        """
+        self.vectorized_greeks = vectorized_greeks
+        self.option_chain_url = option_chain_url if option_chain_url is not None else OPTION_CHAIN_URL
+        self.max_workers = max_workers if max_workers is not None else MAX_CHAIN_WORKERS
+        self.expiration_ttl = expiration_ttl
+        self.expiration_cache = ExpiringLRUCache(maxsize=1024)
+        self.session = create_session(self.max_workers)
 
     def get_quote(self, asset):
+        return self.get_quotes([asset])[0]
 
-        asset = asset_factory(asset)
-        if self._cache.get(asset.symbol) is not None:
-            return self._cache.get(asset.symbol)
-
-        if isinstance(asset, Option):
-
-            options = self.get_options(asset.underlying, asset.expiration_date)
-            matches = [_ for _ in options if _.asset == asset]
-            if len(matches) == 0:
+    def get_quotes(self, assets):
+        """
+            Every equity, and the underlying of every option chain, is fetched with a single getQuotes request
+              and every option chain (underlying and expiration) is fetched once however many of its options are asked for
+        """
+        assets = [asset_factory(_) for _ in assets]
+        chains = self._chains_of(assets)
+        quotes = self._equity_quotes(sorted(set(_.symbol for _ in assets if not isinstance(_, Option)) | set(_[0] for _ in chains)))
+
+        for underlying, expiration_date in chains:
+            oc = self._option_chain(underlying, expiration_date=expiration_date)
+            for quote in self._option_quotes(oc, expiration_date, quotes[underlying]):
+                quotes.setdefault(quote.asset.symbol, quote)
+
+        return self._in_order(assets, quotes)
+
+    @staticmethod
+    def _chains_of(assets):
+        """:return: The (underlying, expiration_date) chains the options in assets are in"""
+        return sorted(set((_.underlying.symbol, _.expiration_date) for _ in assets if isinstance(_, Option)))
+
+    @staticmethod
+    def _in_order(assets, quotes):
+        for asset in assets:
+            if asset.symbol not in quotes:
                 raise Exception("GoogleFinanceAdapter.get_quote: No quote found for {}".format(asset.symbol))
-            return matches[0]
+        return [quotes[_.symbol] for _ in assets]
 
-        else:
+    def _equity_quotes(self, symbols):
+        """:return: {symbol: Quote} from one getQuotes request"""
+        quotes = {}
+        if len(symbols) == 0:
+            return quotes
 
-            google_quotes = getQuotes(asset.symbol)
+        google_quotes = getQuotes(symbols)
 
-            if google_quotes is None or len(google_quotes) == 0:
-                raise Exception("GoogleFinanceAdapter.get_quote: No quote found for {}".format(asset.symbol))
+        if google_quotes is None or len(google_quotes) != len(symbols):
+            raise Exception("GoogleFinanceAdapter.get_quote: No quote found for {}".format(', '.join(symbols)))
 
-            last_trade = google_quotes[0].get('LastTradeWithCurrency', None)
+        for symbol, google_quote in zip(symbols, google_quotes):
+            last_trade = google_quote.get('LastTradeWithCurrency', None)
             if last_trade is None or last_trade == '' or last_trade == '-':
-                raise Exception("GoogleFinanceAdapter.get_quote: No quote found for {}".format(asset.symbol))
+                raise Exception("GoogleFinanceAdapter.get_quote: No quote found for {}".format(symbol))
+            quotes[symbol] = Quote(quote_date=arrow.now().format('YYYY-MM-DD'), asset=symbol, bid=float(last_trade)-0.01, ask=float(last_trade)+0.01)
+
+        return quotes
 
-            return Quote(quote_date=arrow.now().format('YYYY-MM-DD'), asset=asset, bid=float(last_trade)-0.01, ask=float(last_trade)+0.01)
+    def _option_chain(self, underlying_asset, expiration_date=None, first_only=False):
+        symbol = asset_factory(underlying_asset).symbol
+        oc = OptionChain('NASDAQ:' + symbol, expiration_date=expiration_date, first_only=first_only,
+                         session=self.session, url=self.option_chain_url, max_workers=self.max_workers)
+        self.expiration_cache.put(symbol, oc.expiration_dates, ttl=self.expiration_ttl)
+        return oc
 
     def get_expiration_dates(self, underlying_asset=None):
-        oc = OptionChain('NASDAQ:' + asset_factory(underlying_asset).symbol)
-        return sorted(list(set([asset_factory(_['s']).expiration_date for _ in (oc.calls + oc.puts)])))
+        expiration_dates = self.expiration_cache.get(asset_factory(underlying_asset).symbol)
+        if expiration_dates is None:
+            # the first expiration lists all the others
+            expiration_dates = self._option_chain(underlying_asset, first_only=True).expiration_dates
+        return list(expiration_dates)
 
     def get_options(self, underlying_asset=None, expiration_date=None):
-        oc = OptionChain('NASDAQ:' + asset_factory(underlying_asset).symbol)
+        oc = self._option_chain(underlying_asset, expiration_date=expiration_date)
         underlying_quote = self.get_quote(underlying_asset)
+        return self._option_quotes(oc, expiration_date, underlying_quote)
+
+    def _option_quotes(self, oc, expiration_date, underlying_quote):
+        """:return: OptionQuotes for the options in an OptionChain that expire on expiration_date"""
+
+        # the YYMMDD segment of the OCC symbols we want
+        expiration_segment = encode_expiration(expiration_date)
 
         out = []
         for option in (oc.calls + oc.puts):
-            if arrow.get(expiration_date).format('YYMMDD') in option['s']:
+            if expiration_segment in option['s']:
                 quote = OptionQuote(quote_date=arrow.now().format('YYYY-MM-DD'),
                                 asset=option['s'],
                                 bid=float(option['b']) if option['b'] != '-' else None,
                                 ask=float(option['a']) if option['a'] != '-' else None,
-                                underlying_price = underlying_quote.price)
-                self._set_cache(quote)
+                                underlying_price = underlying_quote.price if not self.vectorized_greeks else None)
                 out.append(quote)
 
+        if self.vectorized_greeks:
+            for quote in out:
+                quote.underlying_price = underlying_quote.price
+            set_option_quote_greeks(out)
+
         return out
 
 
@@ -70,107 +128,86 @@ class GoogleFinanceQuoteAdapter(QuoteAdapter):
 
 
 # the code below is from https://github.com/makmac213/python-google-option-chain
+# changed to fetch expirations in parallel over a shared session, or just the one expiration asked for
 
 
 import requests
+from concurrent.futures import ThreadPoolExecutor
 
 
 OPTION_CHAIN_URL = 'https://www.google.com/finance/option_chain'
 
+# the most expirations fetched at once
+MAX_CHAIN_WORKERS = 8
+
+
+def create_session(max_workers=MAX_CHAIN_WORKERS):
+    """
+    :return: A requests.Session that keeps up to max_workers connections per host alive
+    """
+    session = requests.Session()
+    http_adapter = requests.adapters.HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+    session.mount('http://', http_adapter)
+    session.mount('https://', http_adapter)
+    return session
+
 
 class OptionChain(object):
 
-    def __init__(self, q):
+    def __init__(self, q, expiration_date=None, first_only=False, session=None, url=OPTION_CHAIN_URL, max_workers=MAX_CHAIN_WORKERS):
         """
         Usage:
         from optionchain import OptionChain
         oc = OptionChain('NASDAQ:AAPL')
         # oc.calls
         # oc.puts
+        # oc.expiration_dates
+
+        :param expiration_date: Only fetch this expiration ('YYYY-MM-DD'), one request
+        :param first_only: Only fetch the first expiration, one request
+        :param session: The requests.Session to use, a new one by default
+        :param url: Where to get the chains from
+        :param max_workers: The most expirations to fetch at once
         """
+        self.session = session if session is not None else create_session(max_workers)
+        self.url = url
 
         params = {
             'q': q,
             'output': 'json'
         }
 
-        data = self._get_content(OPTION_CHAIN_URL, params)
+        if expiration_date is not None:
+            year, month, day = (int(_) for _ in expiration_date.split('-'))
+            params.update({'expy': year, 'expm': month, 'expd': day})
+
+        data = self._get_content(params)
 
         # get first calls and puts
-        calls = data['calls']
-        puts = data['puts']
+        calls = data.get('calls') or []
+        puts = data.get('puts') or []
 
-        for (ctr, exp) in enumerate(data['expirations']):
-            # we already got the first put and call
-            # skip first
-            if ctr:
-                params['expd'] = exp['d']
-                params['expm'] = exp['m']
-                params['expy'] = exp['y']
+        expirations = data.get('expirations') or []
+        self.expiration_dates = ['{:04d}-{:02d}-{:02d}'.format(int(_['y']), int(_['m']), int(_['d'])) for _ in expirations]
 
-                new_data = self._get_content(OPTION_CHAIN_URL, params)
+        if expiration_date is None and not first_only and len(expirations) > 1:
+            # we already got the first put and call, fetch the rest at once
+            requests_params = [dict(params, expd=exp['d'], expm=exp['m'], expy=exp['y']) for exp in expirations[1:]]
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(requests_params))) as executor:
+                for new_data in executor.map(self._get_content, requests_params):
 
-                if new_data.get('calls') is not None:
-                    calls += new_data.get('calls')
+                    if new_data.get('calls') is not None:
+                        calls += new_data.get('calls')
 
-                if new_data.get('puts') is not None:
-                    puts += new_data.get('puts')
+                    if new_data.get('puts') is not None:
+                        puts += new_data.get('puts')
 
         self.calls = calls
         self.puts = puts
 
-    def _get_content(self, url, params):
-        response = requests.get(url, params=params)
-        if response.status_code == 200:
-            content_json = response.content
-            data = json_decode(content_json)
-
-            return data
-
-import json
-import token, tokenize
-
-from io import StringIO
-
-
-
-# using below solution fixes the json output from google
-# http://stackoverflow.com/questions/4033633/handling-lazy-json-in-python-expecting-property-name
-def fixLazyJson (in_text):
-    tokengen = tokenize.generate_tokens(StringIO(in_text.decode('ascii')).readline)
-
-    result = []
-    for tokid, tokval, _, _, _ in tokengen:
-        # fix unquoted strings
-        if (tokid == token.NAME):
-            if tokval not in ['true', 'false', 'null', '-Infinity', 'Infinity', 'NaN']:
-                tokid = token.STRING
-                tokval = u'"%s"' % tokval
-
-        # fix single-quoted strings
-        elif (tokid == token.STRING):
-            if tokval.startswith ("'"):
-                tokval = u'"%s"' % tokval[1:-1].replace ('"', '\\"')
-
-        # remove invalid commas
-        elif (tokid == token.OP) and ((tokval == '}') or (tokval == ']')):
-            if (len(result) > 0) and (result[-1][1] == ','):
-                result.pop()
-
-        # fix single-quoted strings
-        elif (tokid == token.STRING):
-            if tokval.startswith ("'"):
-                tokval = u'"%s"' % tokval[1:-1].replace ('"', '\\"')
-
-        result.append((tokid, tokval))
-
-    return tokenize.untokenize(result)
-
+    def _get_content(self, params):
+        response = self.session.get(self.url, params=params)
+        if response.status_code != 200:
+            raise Exception("OptionChain: {} returned {} for {}".format(self.url, response.status_code, params.get('q')))
 
-def json_decode(json_string):
-    try:
-        ret = json.loads(json_string)
-    except:
-        json_string = fixLazyJson(json_string)
-        ret = json.loads(json_string)
-    return ret
\ No newline at end of file
+        return json_decode(response.content)
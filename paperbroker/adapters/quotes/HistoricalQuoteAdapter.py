@@ -0,0 +1,60 @@
+from ...logic.option_symbols import date_to_ordinal, ordinal_to_date_string
+from ...logic.vectorized_option_greeks import set_option_quote_greeks
+from ...quote_store import ColumnarQuoteStore
+from .QuoteAdapter import QuoteAdapter
+
+
+"""
+    Quotes from a historical dataset held in a ColumnarQuoteStore.
+
+    Set the date you would like quotes for with the current_date property, it defaults to the first date in the data.
+
+    usage: adapter = HistoricalQuoteAdapter.from_csv('quotes.csv.gz', current_date='2017-01-27')
+           PaperBroker(quote_adapter=adapter)
+"""
+class HistoricalQuoteAdapter(QuoteAdapter):
+
+    def __init__(self, store, current_date=None, vectorized_greeks=False):
+        """
+        :param store: A ColumnarQuoteStore
+        :param current_date: The date to quote, anything date_to_ordinal() accepts
+        :param vectorized_greeks: Solve the greeks for a whole chain at once with logic.vectorized_option_greeks
+        """
+        self.store = store
+        self.current_date = current_date
+        self.vectorized_greeks = vectorized_greeks
+
+    @classmethod
+    def from_csv(cls, filename, current_date=None, underlyings=None, delimiter='\t', vectorized_greeks=False):
+        """
+            Load a file of [symbol],[date],[bid],[ask] rows, gzipped if the name ends in .gz
+        :param underlyings: Only load these underlyings and their options
+        """
+        store = ColumnarQuoteStore.from_csv(filename, delimiter=delimiter, underlyings=underlyings)
+        return cls(store, current_date=current_date, vectorized_greeks=vectorized_greeks)
+
+    @property
+    def current_date(self):
+        if self._current_date is None:
+            dates = self.store.get_dates()
+            return dates[0] if len(dates) > 0 else None
+        return self._current_date
+
+    @current_date.setter
+    def current_date(self, value):
+        self._current_date = ordinal_to_date_string(date_to_ordinal(value)) if value is not None else None
+
+    def get_quote(self, asset):
+        return self.store.get_quote(asset, self.current_date)
+
+    def get_quotes(self, assets):
+        return self.store.get_quotes(assets, self.current_date)
+
+    def get_options(self, underlying_asset=None, expiration_date=None):
+        options = self.store.get_options(underlying_asset, self.current_date, expiration_date=expiration_date)
+        if self.vectorized_greeks and len(options) > 0:
+            set_option_quote_greeks(options)
+        return options
+
+    def get_expiration_dates(self, underlying_asset=None):
+        return self.store.get_expiration_dates(underlying_asset, self.current_date)
@@ -5,6 +5,14 @@ class QuoteAdapter:
     def get_quote(self, asset):
         raise NotImplementedError("QuoteAdapter.get_quote: You should subclass this and create an adapter.")
 
+    def get_quotes(self, assets):
+        """
+            Quotes for many assets at once. This calls get_quote for each one, override it
+              when the data source can do better than one request per asset
+        :return: A list of quotes in the same order as assets
+        """
+        return [self.get_quote(asset) for asset in assets]
+
     def get_options(self, underlying_asset=None, expiration_date=None):
         raise NotImplementedError("QuoteAdapter.get_options: You should subclass this and create an adapter.")
 
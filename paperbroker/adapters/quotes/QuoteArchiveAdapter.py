@@ -0,0 +1,22 @@
+from ...quote_archive import QuoteArchive
+from .HistoricalQuoteAdapter import HistoricalQuoteAdapter
+
+
+"""
+    Quotes from a memory mapped quote archive (see quote_archive.py).
+
+    Opening the archive only reads its header, so this starts immediately however large the file is,
+      and only the quotes that are asked for are read and built.
+
+    usage: adapter = QuoteArchiveAdapter('quotes.pbqa', current_date='2017-01-27')
+           PaperBroker(quote_adapter=adapter)
+"""
+class QuoteArchiveAdapter(HistoricalQuoteAdapter):
+
+    def __init__(self, filename, current_date=None, vectorized_greeks=False):
+        """
+        :param filename: An archive written by quote_archive.write_quote_archive or convert_csv_to_archive
+        :param current_date: The date to quote, defaults to the first date in the archive
+        :param vectorized_greeks: Solve the greeks for a whole chain at once with logic.vectorized_option_greeks
+        """
+        super(QuoteArchiveAdapter, self).__init__(QuoteArchive(filename), current_date=current_date, vectorized_greeks=vectorized_greeks)
@@ -0,0 +1,94 @@
+import gzip
+import json
+import threading
+import time
+
+from ...assets import asset_factory
+from ...quotes import Quote, OptionQuote
+from .QuoteAdapter import QuoteAdapter
+
+
+"""
+    Records every response of a QuoteAdapter to an append-only file so ReplayQuoteAdapter can serve it back.
+
+    The file has one compact JSON array per call:
+        [seconds since recording started, kind, args, response]
+    kind is 'quote', 'quotes', 'options' or 'expirations'. Quotes are stored as
+        [quote_date, symbol, bid, ask, price] with the underlying_price appended for option quotes,
+      greeks aren't stored because they are solved from those when they are read.
+    Calls that raise aren't recorded. Files ending in .gz are gzipped, appending adds another gzip member.
+
+    usage: quote_adapter = RecordingQuoteAdapter(GoogleFinanceQuoteAdapter(), 'monday.quotes.gz')
+           broker = PaperBroker(quote_adapter=quote_adapter)
+"""
+class RecordingQuoteAdapter(QuoteAdapter):
+
+    def __init__(self, quote_adapter: QuoteAdapter, filename, flush=True, clock=time.monotonic):
+        """
+        :param quote_adapter: The adapter to record
+        :param filename: The file to append to
+        :param flush: Flush after every call, so a crash loses nothing
+        :param clock: Returns the current time in seconds
+        """
+        self.quote_adapter = quote_adapter
+        self.filename = filename
+        self.flush = flush
+        self.clock = clock
+        self.started = clock()
+        self.records = 0
+        self._lock = threading.Lock()
+        self._file = (gzip.open if filename.endswith('.gz') else open)(filename, 'at')
+
+    def _record(self, kind, args, response):
+        line = json.dumps([round(self.clock() - self.started, 6), kind, args, response], separators=(',', ':'))
+        with self._lock:
+            self._file.write(line + '\n')
+            if self.flush:
+                self._file.flush()
+            self.records += 1
+
+    def get_quote(self, asset):
+        quote = self.quote_adapter.get_quote(asset)
+        self._record('quote', [asset_factory(asset).symbol], encode_quote(quote))
+        return quote
+
+    def get_quotes(self, assets):
+        assets = list(assets)
+        quotes = self.quote_adapter.get_quotes(assets)
+        self._record('quotes', [[asset_factory(_).symbol for _ in assets]], [encode_quote(_) for _ in quotes])
+        return quotes
+
+    def get_options(self, underlying_asset=None, expiration_date=None):
+        options = self.quote_adapter.get_options(underlying_asset, expiration_date)
+        underlying = asset_factory(underlying_asset).symbol if underlying_asset is not None else None
+        self._record('options', [underlying, expiration_date], [encode_quote(_) for _ in options])
+        return options
+
+    def get_expiration_dates(self, underlying_asset=None):
+        expiration_dates = self.quote_adapter.get_expiration_dates(underlying_asset)
+        underlying = asset_factory(underlying_asset).symbol if underlying_asset is not None else None
+        self._record('expirations', [underlying], list(expiration_dates))
+        return expiration_dates
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def encode_quote(quote):
+    """:return: The quote as a compact list, None stays None"""
+    if quote is None:
+        return None
+    row = [quote.quote_date, quote.asset.symbol, quote.bid, quote.ask, quote.price]
+    if isinstance(quote, OptionQuote):
+        row.append(quote.underlying_price)
+    return row
+
+
+def decode_quote(row):
+    """:return: The Quote or OptionQuote encode_quote() made row from"""
+    if row is None:
+        return None
+    if len(row) > 5:
+        return OptionQuote(quote_date=row[0], asset=row[1], bid=row[2], ask=row[3], price=row[4], underlying_price=row[5])
+    return Quote(quote_date=row[0], asset=row[1], bid=row[2], ask=row[3], price=row[4])
@@ -0,0 +1,127 @@
+import gzip
+import json
+import time
+
+from ...assets import asset_factory
+from .QuoteAdapter import QuoteAdapter
+from .RecordingQuoteAdapter import decode_quote
+
+
+"""
+    Serves back what a RecordingQuoteAdapter recorded, from memory.
+
+    The file is read once into an index of quotes by symbol, chains by (underlying, expiration_date) and
+      expiration dates by underlying. Every quote in a recorded chain or bulk call can be asked for on its own.
+    A key that was recorded more than once is served its last response, or with sequential=True its responses
+      in the order they were recorded (staying on the last one), which replays a day's prices as they moved.
+    Anything that wasn't recorded raises.
+
+    The calls themselves are kept too, replay() makes them again against another adapter at the recorded pace.
+
+    usage: quote_adapter = ReplayQuoteAdapter('monday.quotes.gz')
+           broker = PaperBroker(quote_adapter=quote_adapter)
+"""
+class ReplayQuoteAdapter(QuoteAdapter):
+
+    def __init__(self, filename, sequential=False):
+        """
+        :param filename: A file written by RecordingQuoteAdapter
+        :param sequential: Serve the responses of a key in recorded order instead of always the last one
+        """
+        self.filename = filename
+        self.sequential = sequential
+
+        # (seconds, kind, args) of every call in recorded order
+        self.calls = []
+
+        # key -> [responses], and key -> the next one to serve when sequential
+        self.index = {}
+        self._cursors = {}
+
+        self._load()
+
+    def _load(self):
+        quote_cache = {}
+
+        def decode(row):
+            # the same row recorded twice decodes to the same quote
+            key = None if row is None else tuple(row)
+            if key not in quote_cache:
+                quote_cache[key] = decode_quote(row)
+            return quote_cache[key]
+
+        with (gzip.open if self.filename.endswith('.gz') else open)(self.filename, 'rt') as f:
+            for line in f:
+                if len(line.strip()) == 0:
+                    continue
+                seconds, kind, args, response = json.loads(line)
+                self.calls.append((seconds, kind, args))
+
+                if kind == 'quote':
+                    self._add(('quote', args[0]), decode(response))
+                elif kind == 'quotes':
+                    for symbol, row in zip(args[0], response):
+                        self._add(('quote', symbol), decode(row))
+                elif kind == 'options':
+                    options = [decode(_) for _ in response]
+                    self._add(('options', args[0], args[1]), options)
+                    for quote in options:
+                        self._add(('quote', quote.asset.symbol), quote)
+                elif kind == 'expirations':
+                    self._add(('expirations', args[0]), response)
+                else:
+                    raise Exception("ReplayQuoteAdapter: {} has an unknown call {}".format(self.filename, kind))
+
+    def _add(self, key, response):
+        self.index.setdefault(key, []).append(response)
+
+    def _serve(self, key, name):
+        responses = self.index.get(key)
+        if responses is None:
+            raise Exception("ReplayQuoteAdapter.{}: {} was not recorded".format(name, ', '.join(str(_) for _ in key[1:])))
+
+        if not self.sequential:
+            return responses[-1]
+
+        i = self._cursors.get(key, 0)
+        self._cursors[key] = min(i + 1, len(responses) - 1)
+        return responses[i]
+
+    def rewind(self):
+        """Start serving sequential responses from the beginning again"""
+        self._cursors.clear()
+
+    def get_quote(self, asset):
+        return self._serve(('quote', asset_factory(asset).symbol), 'get_quote')
+
+    def get_options(self, underlying_asset=None, expiration_date=None):
+        underlying = asset_factory(underlying_asset).symbol if underlying_asset is not None else None
+        return list(self._serve(('options', underlying, expiration_date), 'get_options'))
+
+    def get_expiration_dates(self, underlying_asset=None):
+        underlying = asset_factory(underlying_asset).symbol if underlying_asset is not None else None
+        return list(self._serve(('expirations', underlying), 'get_expiration_dates'))
+
+    def replay(self, quote_adapter: QuoteAdapter, speed=None, sleep=time.sleep, clock=time.monotonic):
+        """
+            Make every recorded call again, in order, against quote_adapter
+        :param speed: How many times faster than recorded to go, None for as fast as possible
+        :return: The number of calls made
+        """
+        started = clock()
+        for seconds, kind, args in self.calls:
+            if speed is not None:
+                wait = (seconds / speed) - (clock() - started)
+                if wait > 0:
+                    sleep(wait)
+
+            if kind == 'quote':
+                quote_adapter.get_quote(args[0])
+            elif kind == 'quotes':
+                quote_adapter.get_quotes([asset_factory(_) for _ in args[0]])
+            elif kind == 'options':
+                quote_adapter.get_options(args[0], args[1])
+            elif kind == 'expirations':
+                quote_adapter.get_expiration_dates(args[0])
+
+        return len(self.calls)
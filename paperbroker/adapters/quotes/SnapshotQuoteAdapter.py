@@ -0,0 +1,40 @@
+from ...assets import asset_factory
+from .QuoteAdapter import QuoteAdapter
+
+
+"""
+    Quotes that were already fetched, so synchronous logic can run without going upstream.
+
+    AsyncPaperBroker fetches every quote an order needs concurrently and then fills the order against one of these.
+    Asking for a quote that isn't in the snapshot raises.
+
+    usage: quote_adapter = SnapshotQuoteAdapter(await async_quote_adapter.get_quotes(assets))
+"""
+class SnapshotQuoteAdapter(QuoteAdapter):
+
+    def __init__(self, quotes=None):
+        """
+        :param quotes: An iterable of quotes, or a dict of {symbol: quote}
+        """
+        self.quotes = {}
+        if isinstance(quotes, dict):
+            self.quotes.update({asset_factory(symbol).symbol: quote for symbol, quote in quotes.items()})
+        elif quotes is not None:
+            self.add_quotes(quotes)
+
+    def add_quotes(self, quotes):
+        for quote in quotes:
+            if quote is not None:
+                self.quotes[quote.asset.symbol] = quote
+
+    def get_quote(self, asset):
+        symbol = asset_factory(asset).symbol
+        if symbol not in self.quotes:
+            raise Exception("SnapshotQuoteAdapter.get_quote: No quote for {} in the snapshot".format(symbol))
+        return self.quotes[symbol]
+
+    def get_options(self, underlying_asset=None, expiration_date=None):
+        raise NotImplementedError("SnapshotQuoteAdapter.get_options: Only single quotes are kept in a snapshot.")
+
+    def get_expiration_dates(self, underlying_asset=None):
+        raise NotImplementedError("SnapshotQuoteAdapter.get_expiration_dates: Only single quotes are kept in a snapshot.")
@@ -0,0 +1,123 @@
+import csv
+import gzip
+from collections import OrderedDict
+from itertools import groupby
+
+from ...logic.option_symbols import date_to_ordinal, ordinal_to_date_string
+from ...quote_store import ColumnarQuoteStore, filter_underlyings
+from .HistoricalQuoteAdapter import HistoricalQuoteAdapter
+
+
+"""
+    Quotes streamed from a date ordered file of [symbol],[date],[bid],[ask] rows.
+
+    The file is read one date at a time through a generator pipeline (rows -> underlying filter -> dates)
+      and each date becomes a small ColumnarQuoteStore. Only the last window dates read are kept, so memory
+      stays flat however many dates the file covers and the first quotes are ready as soon as their date is read.
+
+    Moving current_date forward reads ahead to that date. Moving it back to a date that has already
+      left the window starts the file over.
+
+    usage: adapter = StreamingQuoteAdapter('quotes.csv.gz', underlyings=['AAL'])
+           for quote_date in dates:
+               adapter.current_date = quote_date
+               ...
+"""
+class StreamingQuoteAdapter(HistoricalQuoteAdapter):
+
+    def __init__(self, filename, current_date=None, window=2, underlyings=None, delimiter='\t', vectorized_greeks=False):
+        """
+        :param filename: The file to stream, gzipped if the name ends in .gz. Rows must be grouped by date in date order
+        :param current_date: The date to quote, defaults to the first date in the file
+        :param window: How many dates to keep in memory
+        :param underlyings: Only load these underlyings and their options, None for all of them
+        :param delimiter: The column delimiter
+        :param vectorized_greeks: Solve the greeks for a whole chain at once with logic.vectorized_option_greeks
+        """
+        if window < 1:
+            raise Exception("StreamingQuoteAdapter: window must be at least 1")
+
+        self.filename = filename
+        self.window = window
+        self.underlyings = underlyings
+        self.delimiter = delimiter
+        self.vectorized_greeks = vectorized_greeks
+
+        # date ordinal -> ColumnarQuoteStore, oldest first
+        self._stores = OrderedDict()
+        self._dates = None
+        self._first_date = None
+        self._last_date = None
+
+        self.current_date = current_date
+
+    @property
+    def current_date(self):
+        if self._current_date is None:
+            self._read_ahead(None)
+            return ordinal_to_date_string(self._first_date) if self._first_date is not None else None
+        return self._current_date
+
+    @current_date.setter
+    def current_date(self, value):
+        self._current_date = ordinal_to_date_string(date_to_ordinal(value)) if value is not None else None
+
+    @property
+    def store(self):
+        """The ColumnarQuoteStore of current_date, empty if the file has no quotes on it"""
+        current_date = self.current_date
+        if current_date is None:
+            return ColumnarQuoteStore([], [], [], [])
+
+        ordinal = date_to_ordinal(current_date)
+        if ordinal not in self._stores:
+            if len(self._stores) > 0 and self._first_date <= ordinal < next(iter(self._stores)):
+                # gone from the window, start over
+                self._dates = None
+            self._read_ahead(ordinal)
+
+        store = self._stores.get(ordinal)
+        return store if store is not None else ColumnarQuoteStore([], [], [], [])
+
+    def _read_ahead(self, ordinal):
+        """Read dates until ordinal (or just the first date if ordinal is None) has been read"""
+        if self._dates is None:
+            self._dates = self._read_dates()
+            self._stores.clear()
+            self._last_date = None
+
+        while self._last_date is None or (ordinal is not None and self._last_date < ordinal):
+            try:
+                date, store = next(self._dates)
+            except StopIteration:
+                return
+
+            self._stores[date] = store
+            while len(self._stores) > self.window:
+                self._stores.popitem(last=False)
+
+            if self._first_date is None:
+                self._first_date = date
+            self._last_date = date
+
+    def _read_rows(self):
+        opener = gzip.open if self.filename.endswith('.gz') else open
+        with opener(self.filename, 'rt') as f:
+            for row in csv.reader(f, delimiter=self.delimiter):
+                if len(row) >= 4:
+                    yield row
+
+    def _read_dates(self):
+        """:return: A generator of (date ordinal, ColumnarQuoteStore) in date order"""
+        rows = self._read_rows()
+        if self.underlyings is not None:
+            rows = filter_underlyings(rows, self.underlyings)
+
+        last_date = None
+        for quote_date, date_rows in groupby(rows, key=lambda row: row[1]):
+            date = date_to_ordinal(quote_date)
+            if last_date is not None and date <= last_date:
+                raise Exception("StreamingQuoteAdapter: {} is not in date order at {}".format(self.filename, quote_date))
+            last_date = date
+
+            yield date, ColumnarQuoteStore.from_rows(date_rows)
@@ -1,2 +1,11 @@
 from .QuoteAdapter import QuoteAdapter
 from .GoogleFinanceQuoteAdapter import GoogleFinanceQuoteAdapter
+from .HistoricalQuoteAdapter import HistoricalQuoteAdapter
+from .QuoteArchiveAdapter import QuoteArchiveAdapter
+from .StreamingQuoteAdapter import StreamingQuoteAdapter
+from .CachingQuoteAdapter import CachingQuoteAdapter
+from .SnapshotQuoteAdapter import SnapshotQuoteAdapter
+from .AsyncQuoteAdapter import AsyncQuoteAdapter, ThreadedAsyncQuoteAdapter
+from .AsyncGoogleFinanceQuoteAdapter import AsyncGoogleFinanceQuoteAdapter
+from .RecordingQuoteAdapter import RecordingQuoteAdapter
+from .ReplayQuoteAdapter import ReplayQuoteAdapter
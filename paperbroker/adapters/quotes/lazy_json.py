@@ -0,0 +1,66 @@
+"""
+
+    Decoding of the "lazy" JSON Google Finance returns: keys without quotes, strings in single quotes
+      and trailing commas before } or ].
+
+    lazy_json_to_json() rewrites it into strict JSON with regex splits instead of a tokenizer:
+        1. one regex split separates quoted strings from everything between them
+        2. everything between them is joined on a character that can't appear in JSON text, trailing
+             commas are dropped and bare words that aren't JSON literals are split out and quoted,
+             so nothing inside a string is ever touched
+        3. the pieces are split apart again and interleaved with the strings, single quoted strings requoted
+
+    usage: json_decode(response.content)
+
+"""
+import json
+import re
+
+# quoted strings, captured so split() keeps them
+STRINGS = re.compile(r'''("[^"\\]*(?:\\.[^"\\]*)*"|'[^'\\]*(?:\\.[^'\\]*)*')''', re.DOTALL)
+
+# bare words, but not the exponent of a number like 1e5
+BARE_WORDS = re.compile(r'(?<![\w$.])([A-Za-z_$][\w$]*)')
+
+# bare words json.loads already understands
+JSON_LITERALS = frozenset(['true', 'false', 'null', 'NaN', 'Infinity'])
+
+TRAILING_COMMAS = re.compile(r',(?=\s*[}\]])')
+
+# never valid in JSON text outside of a string
+SEPARATOR = '\x00'
+
+
+def _requote(string):
+    if string[0] == '"':
+        return string
+    return '"' + string[1:-1].replace("\\'", "'").replace('"', '\\"') + '"'
+
+
+def lazy_json_to_json(text):
+    """
+    :param text: Lazy JSON as str or bytes
+    :return: The same document as strict JSON
+    """
+    if isinstance(text, bytes):
+        text = text.decode('utf-8')
+
+    parts = STRINGS.split(text)
+    between = TRAILING_COMMAS.sub('', SEPARATOR.join(parts[0::2]))
+
+    words = BARE_WORDS.split(between)
+    words[1::2] = [_ if _ in JSON_LITERALS else '"' + _ + '"' for _ in words[1::2]]
+
+    parts[0::2] = ''.join(words).split(SEPARATOR)
+    parts[1::2] = [_requote(_) for _ in parts[1::2]]
+    return ''.join(parts)
+
+
+def json_decode(json_string):
+    """
+        json.loads, falling back to lazy_json_to_json when the input isn't strict JSON
+    """
+    try:
+        return json.loads(json_string)
+    except ValueError:
+        return json.loads(lazy_json_to_json(json_string))
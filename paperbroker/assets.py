@@ -3,11 +3,17 @@
     Specialized classes for assets. Anything that can be represented by a symbol.
     Overrides the == to make it easier
     Use asset_factory() if you don't know if an object is a string or an asset
+    Assets are immutable and asset_factory() interns them, so the same symbol always returns
+      the same instance (bounded by ASSET_CACHE_SIZE, least recently used symbols are dropped first)
     Logic within the asset classes is kept to a minimum to make it easier
       to learn from the code. Most is in /paperbroker/logic/
 
 """
-import arrow
+from functools import lru_cache
+from .logic.option_symbols import decode_option_symbol, encode_option_symbol, date_to_ordinal, ordinal_to_date_string
+
+# the maximum number of distinct symbols asset_factory() keeps interned
+ASSET_CACHE_SIZE = 2 ** 16
 
 
 def asset_factory(symbol=None):
@@ -23,8 +29,15 @@ def asset_factory(symbol=None):
     if isinstance(symbol, Asset):
         return symbol
 
-    symbol = symbol.upper()
+    return _interned_asset_factory(symbol.upper())
+
 
+@lru_cache(maxsize=ASSET_CACHE_SIZE)
+def _interned_asset_factory(symbol):
+    """
+        Builds the asset for an upper case symbol. Wrapped in an LRU cache so that parsing
+          a symbol only happens once and every caller shares the same immutable instance
+    """
     if len(symbol) > 8:
         if 'P0' in symbol:
             return Put(symbol)
@@ -40,11 +53,40 @@ Asset: Assets are always identified by a symbol which uniquely identifies the as
 """
 class Asset():
 
+    __slots__ = ('symbol', 'asset_type', '_frozen')
+
     def __init__(self, symbol: str=None, asset_type: str=None):
         self.symbol = symbol.upper()
         self.asset_type = asset_type or 'asset'
+        self._frozen = True
         return
 
+    def __setattr__(self, key, value):
+        """Assets are shared by asset_factory() so they cannot change once created"""
+        if getattr(self, '_frozen', False):
+            raise AttributeError("Asset: assets are immutable, cannot set {} on {}".format(key, self.symbol))
+        super(Asset, self).__setattr__(key, value)
+
+    def __reduce__(self):
+        """Pickle and deepcopy by symbol so loading an asset goes back through the interning cache"""
+        return asset_factory, (self.symbol,)
+
+    def __setstate__(self, state):
+        """Assets pickled before they were interned come back as a plain attribute dict"""
+        for key, value in state.items():
+            object.__setattr__(self, key, value)
+        object.__setattr__(self, '_frozen', True)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __hash__(self):
+        """Hash by symbol to match __eq__"""
+        return hash(self.symbol)
+
     def __eq__(self, other):
         """Override the default Equals behavior"""
         if isinstance(other, self.__class__):
@@ -64,18 +106,21 @@ class Asset():
 """
 class Option(Asset):
 
+    __slots__ = ('underlying', 'option_type', 'strike', 'expiration_date', 'expiration_ordinal')
+
     def __init__(self, symbol:str = None, underlying=None, option_type:str = None, strike:float = None, expiration_date = None):
 
         if symbol is not None:
 
             # if a symbol is provided, then we create the asset based on the symbol
 
-            r = symbol[::-1]
+            underlying_symbol, expiration_date, expiration_ordinal, option_type, strike = decode_option_symbol(symbol)
 
-            self.strike = float(r[0:8][::-1]) / 1000
-            self.option_type = 'call' if r[8] == 'C' else 'put'
-            self.expiration_date = arrow.get(r[9:15][::-1], 'YYMMDD').format('YYYY-MM-DD')
-            self.underlying = asset_factory(r[15:][::-1])
+            self.strike = strike
+            self.option_type = option_type
+            self.expiration_date = expiration_date
+            self.expiration_ordinal = expiration_ordinal
+            self.underlying = asset_factory(underlying_symbol)
 
         else:
 
@@ -97,20 +142,26 @@ class Option(Asset):
 
             # parse the date real quick to check on it
             try:
-                expiration_date = arrow.get(expiration_date).format('YYMMDD')
+                expiration_ordinal = date_to_ordinal(expiration_date)
             except Exception as e:
                 raise Exception('Option(Asset): expiration_date is invalid')
 
             # build the symbol
-            symbol = (underlying.symbol + expiration_date + option_type[0] + str(int(round(strike, 2) * 1000)).zfill(8)).upper()
+            symbol = encode_option_symbol(underlying.symbol, expiration_ordinal, option_type, strike)
 
             self.underlying = underlying
             self.option_type = option_type
             self.strike = float(strike)
-            self.expiration_date = arrow.get(expiration_date, 'YYMMDD').format('YYYY-MM-DD')
+            self.expiration_date = ordinal_to_date_string(expiration_ordinal)
+            self.expiration_ordinal = expiration_ordinal
 
         super(Option, self).__init__(symbol, self.option_type)
 
+    def __setstate__(self, state):
+        if 'expiration_ordinal' not in state:
+            state = dict(state, expiration_ordinal=date_to_ordinal(state['expiration_date']))
+        super(Option, self).__setstate__(state)
+
     def get_extrinsic_value(self, underlying_price=None, price=None):
         return (abs(price) - self.get_intrinsic_value(underlying_price=underlying_price)) if price is not None else None
 
@@ -130,15 +181,19 @@ class Option(Asset):
         return None
 
     def get_days_to_expiration(self, as_of_date):
-        return (arrow.get(self.expiration_date) - arrow.get(as_of_date)).days
+        return self.expiration_ordinal - date_to_ordinal(as_of_date)
 
 
 class Put(Option):
+    __slots__ = ()
+
     def __init__(self, symbol: str = None, underlying = None,
                  underlying_symbol: str = None, strike: float = None, expiration_date=None):
         super(Put, self).__init__(symbol=symbol, option_type='put', underlying = underlying, strike=strike, expiration_date=expiration_date)
 
 class Call(Option):
+    __slots__ = ()
+
     def __init__(self, symbol: str = None, underlying = None,
                  underlying_symbol: str = None, strike: float = None, expiration_date=None):
         super(Call, self).__init__(symbol=symbol, option_type='call', underlying = underlying, strike=strike, expiration_date=expiration_date)
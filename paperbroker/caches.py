@@ -0,0 +1,204 @@
+"""
+
+    A small bounded cache used to memoize expensive lookups (greeks, quotes).
+
+    LRUCache keeps at most maxsize entries and drops the least recently used one when it is full.
+    It counts hits, misses and evictions so you can see if it is sized right for your workload.
+
+    ExpiringLRUCache is an LRUCache where every entry also has a time to live.
+
+    SingleFlight makes concurrent callers asking for the same key share one call instead of each making their own.
+
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache(object):
+
+    def __init__(self, maxsize=1024):
+        if maxsize is None or maxsize <= 0:
+            raise Exception("LRUCache: maxsize must be > 0")
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        :return: The value stored for key, or default if there isn't one
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """
+        :return: A dict of counters, hit_rate is None until something has been looked up
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hit_rate': (self.hits / lookups) if lookups > 0 else None,
+        }
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+
+class ExpiringLRUCache(LRUCache):
+    """
+        An LRUCache whose entries expire ttl seconds after they are put.
+        Expired entries count as misses (and as expirations) and are dropped when they are found
+    """
+
+    def __init__(self, maxsize=1024, clock=time.monotonic):
+        super(ExpiringLRUCache, self).__init__(maxsize=maxsize)
+        self.clock = clock
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] is not None and self.clock() >= entry[1]:
+                del self._data[key]
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, ttl=None):
+        """
+        :param ttl: Seconds until the entry expires, None to keep it until it is evicted
+        """
+        super(ExpiringLRUCache, self).put(key, (value, (self.clock() + ttl) if ttl is not None else None))
+        return value
+
+    def clear(self):
+        super(ExpiringLRUCache, self).clear()
+        self.expirations = 0
+
+    def stats(self):
+        stats = super(ExpiringLRUCache, self).stats()
+        stats['expirations'] = self.expirations
+        return stats
+
+
+class _Flight(object):
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+        While a call for a key is running, other calls for the same key wait for it and get its result
+          (or its exception) instead of running again. coalesced counts the calls that waited
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _claim(self, keys):
+        """:return: (flights this caller runs, flights it waits for) as {key: _Flight}"""
+        leading, following = {}, {}
+        with self._lock:
+            for key in keys:
+                if key in leading or key in following:
+                    continue
+                if key in self._flights:
+                    following[key] = self._flights[key]
+                    self.coalesced += 1
+                else:
+                    leading[key] = self._flights[key] = _Flight()
+        return leading, following
+
+    def _land(self, flights):
+        with self._lock:
+            for key in flights:
+                del self._flights[key]
+        for flight in flights.values():
+            flight.done.set()
+
+    def do(self, key, fn):
+        """
+        :return: fn(), or the result of the call of fn already running for key
+        """
+        return self.do_many([key], lambda keys: [fn()])[0]
+
+    def do_many(self, keys, fn):
+        """
+            The bulk version of do()
+        :param fn: Called with the list of keys no one else is already fetching, returns their values in order
+        :return: The values of keys in order
+        """
+        leading, following = self._claim(keys)
+
+        try:
+            if len(leading) > 0:
+                values = list(fn(list(leading)))
+                if len(values) != len(leading):
+                    raise Exception("SingleFlight: got {} values for {} keys".format(len(values), len(leading)))
+                for flight, value in zip(leading.values(), values):
+                    flight.value = value
+        except BaseException as e:
+            for flight in leading.values():
+                flight.error = e
+            raise
+        finally:
+            self._land(leading)
+
+        for flight in following.values():
+            flight.done.wait()
+
+        flights = dict(following)
+        flights.update(leading)
+        out = []
+        for key in keys:
+            flight = flights[key]
+            if flight.error is not None:
+                raise flight.error
+            out.append(flight.value)
+        return out
@@ -8,12 +8,15 @@
 
 
 
-import arrow
 from ..accounts import Account
 from ..assets import Option, Call, Put, Asset
 from ..adapters.quotes.QuoteAdapter import QuoteAdapter
 from ..orders import Order, Leg
 from ..positions import Position
+from .option_symbols import date_to_ordinal
+from .lot_policy import open_position, reduce_position
+from .maintenance_margin import invalidate_maintenance_margin, update_maintenance_margin
+from .group_into_basic_strategies import StrategyError
 
 from ..adapters.markets import MarketAdapter
 
@@ -30,26 +33,42 @@ def drain_asset(positions, asset, quantity):
     remaining_quantity = quantity
 
     # get a list of positions that are opposite to the quantity we are draining
-    positions = [_ for _ in positions if _.asset == asset and copysign(1,_.quantity) == copysign(1, quantity * -1)]
+    positions = positions.for_symbol(asset) if hasattr(positions, 'for_symbol') else [_ for _ in positions if _.asset == asset]
+    positions = [_ for _ in positions if copysign(1,_.quantity) == copysign(1, quantity * -1)]
     for position in positions:
 
-        if abs(remaining_quantity) <= abs(position.quantity):
-            # there are enough quantity in this position to complete it
-            position.quantity += remaining_quantity
-            remaining_quantity = 0
+        # take as much as this position has, out of its lots if it has them
+        remaining_quantity -= copysign(1, remaining_quantity) * reduce_position(position, remaining_quantity)
+        if remaining_quantity == 0:
             return remaining_quantity
 
-        if abs(remaining_quantity) > abs(position.quantity):
-            # we are going to have some left over
-            remaining_quantity += position.quantity
-            position.quantity = 0
-
     return remaining_quantity
 
-def close_expired_options(account:Account, quote_adapter:QuoteAdapter, market_adapter:MarketAdapter):
+class _SettlementQuoteAdapter(QuoteAdapter):
+    """The underlyings' settlement quotes, then anything else from upstream"""
+
+    def __init__(self, upstream, quotes):
+        self.upstream = upstream
+        self.quotes = quotes
+
+    def get_quote(self, asset):
+        symbol = asset.symbol if isinstance(asset, Asset) else asset
+        return self.quotes[symbol] if symbol in self.quotes else self.upstream.get_quote(asset)
+
+    def get_quotes(self, assets):
+        symbols = [_.symbol if isinstance(_, Asset) else _ for _ in assets]
+        missing = [asset for asset, symbol in zip(assets, symbols) if symbol not in self.quotes]
+        fetched = iter(self.upstream.get_quotes(missing) if len(missing) > 0 else [])
+        return [self.quotes[_] if _ in self.quotes else next(fetched) for _ in symbols]
+
+
+def close_expired_options(account:Account, quote_adapter:QuoteAdapter, market_adapter:MarketAdapter,
+                          current_date=None, underlying_quotes=None):
     """
     Process an account's positions and handle the process of closing any expired options
     :param account:
+    :param current_date: What day it is, instead of asking the quote_adapter
+    :param underlying_quotes: {underlying symbol: quote} to settle against, the rest are quoted from quote_adapter
     :return:
     """
 
@@ -63,35 +82,36 @@ def close_expired_options(account:Account, quote_adapter:QuoteAdapter, market_ad
         return
 
     # get one quote so we can see what day it is
-    current_date = quote_adapter.get_quote(asset=account.positions[0].asset.underlying if isinstance(account.positions[0].asset, Option) else account.positions[0].asset ).quote_date
+    if current_date is None:
+        current_date = quote_adapter.get_quote(asset=account.positions[0].asset.underlying if isinstance(account.positions[0].asset, Option) else account.positions[0].asset ).quote_date
+    current_ordinal = date_to_ordinal(current_date)
 
     # get a list of all the options that are expired
-    expired = [_ for _ in account.positions
-               if isinstance(_.asset, Option)
-               and arrow.get(_.asset.expiration_date).format('YYYY-MM-DD') < arrow.get(current_date).format('YYYY-MM-DD')]
+    expired = account.positions.expired_before(current_ordinal)
 
     # no expirations, bail
     if len(expired) == 0:
         return
 
     # get a unique list of underlyings
-    underlyings = list(set([_.asset.underlying.symbol for _ in expired]))
+    underlyings = sorted(set([_.asset.underlying.symbol for _ in expired]))
+
+    # get current quotes for all of them in one request, less the ones we were given
+    underlying_quotes = dict(underlying_quotes) if underlying_quotes is not None else {}
+    missing = [_ for _ in underlyings if _ not in underlying_quotes]
+    if len(missing) > 0:
+        underlying_quotes.update(zip(missing, quote_adapter.get_quotes(missing)))
 
     # iterate through them
     for underlying in underlyings:
 
-        # get a current quote
-        underlying_quote = quote_adapter.get_quote(underlying)
+        underlying_quote = underlying_quotes[underlying]
 
         # get the positions in or of this underlying
-        positions_in_underlying = [_ for _ in account.positions if (isinstance(_.asset, Option) and _.asset.underlying == underlying) or (_.asset == underlying)]
+        positions_in_underlying = account.positions.in_underlying(underlying)
 
         # make a list of the positions of expiring options in this underlying
-        expired_positions = [_ for _ in account.positions
-                   if isinstance(_.asset, Option)
-                   and arrow.get(_.asset.expiration_date).format('YYYY-MM-DD') <
-                    arrow.get(current_date).format('YYYY-MM-DD')
-                   ]
+        expired_positions = [_ for _ in expired if _.asset.underlying.symbol == underlying]
 
         # record the amount of long and short equity we have open to work with
         long_equity = sum([_.quantity for _ in positions_in_underlying
@@ -119,9 +139,9 @@ def close_expired_options(account:Account, quote_adapter:QuoteAdapter, market_ad
                     # long calls expire by buying the stock at the strike price and
                     #   adding the option cost basis to the stock cost basis
                     account.cash -= position.asset.strike * position.quantity * 100
-                    account.positions.append(Position(asset=underlying,
-                                                      quantity=abs(position.quantity) * 100,
-                                                      cost_basis=position.asset.strike + abs(position.cost_basis)))
+                    open_position(account, asset=underlying,
+                                  quantity=abs(position.quantity) * 100,
+                                  cost_basis=position.asset.strike + abs(position.cost_basis))
 
                 elif position.asset.option_type == 'call' and position.quantity < 0:
                     # short calls expire by being forced to surrender the stock and get the strike price
@@ -148,9 +168,9 @@ def close_expired_options(account:Account, quote_adapter:QuoteAdapter, market_ad
                     # long puts expire by you gaining short shares and cash at the strike
                     #   adding the option cost basis to the stock cost basis
                     account.cash += position.asset.strike * abs(position.quantity) * 100
-                    account.positions.append(Position(asset=underlying,
-                                                      quantity= -1 * abs(position.quantity) * 100,
-                                                      cost_basis=position.asset.strike - abs(position.cost_basis)))
+                    open_position(account, asset=underlying,
+                                  quantity= -1 * abs(position.quantity) * 100,
+                                  cost_basis=position.asset.strike - abs(position.cost_basis))
 
                 elif position.asset.option_type == 'put' and position.quantity < 0:
                     # short puts expire by you being forced to liquidate a short but you  shares strike price in cash
@@ -172,5 +192,13 @@ def close_expired_options(account:Account, quote_adapter:QuoteAdapter, market_ad
 
             position.quantity = 0
 
-    account.positions = [_ for _ in account.positions if _.quantity != 0]
+    account.positions.prune()
+
+    # the margin of the underlyings that settled, at their settlement price. Quote errors are raised
+    try:
+        update_maintenance_margin(account, _SettlementQuoteAdapter(quote_adapter, underlying_quotes), underlyings)
+    except StrategyError:
+        # what's left can't be grouped (like a spread of equal strikes), the options are still settled
+        invalidate_maintenance_margin(account)
+        account.maintenance_margin = None
     return account
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""
+
+    Expiration day for every account in an AccountAdapter at once.
+
+    Accounts are loaded in batches across a pool of threads, and the positions of each that expired
+      before as_of are indexed by underlying. Every underlying in the index is quoted once, in one request
+      per batch for the ones the earlier batches didn't have, and those quotes settle every account's
+      exercises and assignments through close_expired_options. The accounts that changed are written
+      back across the same pool while the next batch loads.
+
+    as_of is the day the expirations are processed, like the quote date close_expired_options goes by:
+      options that expired on a Friday are closed with as_of on the Saturday (or later).
+
+    usage: results = expire_all(account_adapter, quote_adapter, as_of='2017-01-28', workers=8)
+           [_.account_id for _ in results if _.status == 'failed']
+
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from ..adapters.accounts.AccountAdapter import AccountAdapter
+from ..adapters.quotes.QuoteAdapter import QuoteAdapter
+from .close_expired_options import close_expired_options
+from .option_symbols import date_to_ordinal
+from .simulate_orders import quote_snapshot
+
+
+class ExpirationResult():
+    """
+    What expire_all did to one account
+
+    status - 'expired' if options were closed and the account written back, 'unchanged' if it had none
+               expired, 'failed' if it couldn't be loaded, settled or written (it's left as it was stored)
+    expired - the symbols of the options that were closed
+    cash_change - the cash the exercises and assignments took or gave
+    error - the exception, when it failed
+    """
+    def __init__(self, account_id, status, expired=None, cash_change=0.0, error=None):
+        self.account_id = account_id
+        self.status = status
+        self.expired = expired if expired is not None else []
+        self.cash_change = cash_change
+        self.error = error
+
+    def __repr__(self):
+        return 'ExpirationResult({!r}, {!r}, expired={})'.format(self.account_id, self.status, len(self.expired))
+
+
+def _load(account_adapter, account_id):
+    try:
+        return account_adapter.get_account(account_id), None
+    except Exception as e:
+        return None, e
+
+
+def _write(account_adapter, account):
+    try:
+        account_adapter.put_account(account)
+    except Exception as e:
+        return e
+
+
+def expire_all(account_adapter:AccountAdapter, quote_adapter:QuoteAdapter, as_of, account_ids=None,
+               market_adapter=None, workers=8, batch_size=500):
+    """
+    :param as_of: The day being processed, an ordinal, 'YYYY-MM-DD' or a date
+    :param account_ids: The accounts to expire, None for every account the adapter has
+    :param workers: Threads loading and writing accounts
+    :param batch_size: Accounts loaded at a time
+    :return: A list of ExpirationResults in the order of account_ids
+    """
+    ordinal = date_to_ordinal(as_of)
+    account_ids = list(account_ids) if account_ids is not None else list(account_adapter.get_account_ids())
+
+    results = {}
+    settlements = {}
+    writing = []
+
+    def finish_writes():
+        for result, future in writing:
+            error = future.result()
+            if error is not None:
+                result.status, result.error = 'failed', error
+        writing.clear()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for start in range(0, len(account_ids), batch_size):
+            batch = account_ids[start:start + batch_size]
+            loaded = list(executor.map(lambda _: _load(account_adapter, _), batch))
+
+            # index the expired positions of the batch by underlying
+            expiring = []
+            for account_id, (account, error) in zip(batch, loaded):
+                if account is None:
+                    results[account_id] = ExpirationResult(account_id, 'failed', error=error)
+                    continue
+                expired = account.positions.expired_before(ordinal)
+                if len(expired) == 0:
+                    results[account_id] = ExpirationResult(account_id, 'unchanged')
+                    continue
+                expiring.append((account_id, account, expired))
+
+            # settlement quotes for the underlyings we haven't seen yet, in one request
+            unseen = {_.asset.underlying.symbol: _.asset.underlying for item in expiring for _ in item[2]}
+            unseen = [asset for symbol, asset in sorted(unseen.items()) if symbol not in settlements]
+            if len(unseen) > 0:
+                snapshot = quote_snapshot(quote_adapter, unseen).quotes
+                settlements.update((_.symbol, snapshot.get(_.symbol)) for _ in unseen)
+
+            # the previous batch is written by now, or close to it
+            finish_writes()
+
+            for account_id, account, expired in expiring:
+                underlyings = set(_.asset.underlying.symbol for _ in expired)
+                unquoted = sorted(_ for _ in underlyings if settlements[_] is None)
+                if len(unquoted) > 0:
+                    error = Exception("logic.expire_all: no settlement quote for {}".format(', '.join(unquoted)))
+                    results[account_id] = ExpirationResult(account_id, 'failed', error=error)
+                    continue
+
+                symbols = [_.asset.symbol for _ in expired]
+                cash = account.cash
+                try:
+                    close_expired_options(account, quote_adapter, market_adapter, current_date=ordinal,
+                                          underlying_quotes={_: settlements[_] for _ in underlyings})
+                except Exception as e:
+                    results[account_id] = ExpirationResult(account_id, 'failed', error=e)
+                    continue
+
+                result = ExpirationResult(account_id, 'expired', expired=symbols, cash_change=account.cash - cash)
+                results[account_id] = result
+                writing.append((result, executor.submit(_write, account_adapter, account)))
+
+        finish_writes()
+
+    return [results[_] for _ in account_ids]
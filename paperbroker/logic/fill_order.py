@@ -13,10 +13,15 @@ from ..positions import Position
 from ..adapters.quotes import QuoteAdapter
 from ..estimators import Estimator
 from math import copysign
-from .maintenance_margin import get_maintenance_margin
+from .maintenance_margin import update_maintenance_margin
+from .lot_policy import open_position, reduce_position
 
 
-def fill_order(account: Account = None, order: Order = None, quote_adapter:QuoteAdapter=None, estimator:Estimator=None):
+def fill_order(account: Account = None, order: Order = None, quote_adapter:QuoteAdapter=None, estimator:Estimator=None, update_margin=True):
+    """
+    :param update_margin: Recalculate account.maintenance_margin after the fill, callers that work it out themselves can skip it.
+                          Only the underlyings of the order's legs are regrouped, see update_maintenance_margin
+    """
     if account is None:
         raise Exception("logic.fill_order: must provide an account.")
 
@@ -29,11 +34,14 @@ def fill_order(account: Account = None, order: Order = None, quote_adapter:Quote
     if estimator is None:
         estimator = Estimator()
 
+    # quote every leg in one request
+    leg_quotes = dict(zip(order.legs, quote_adapter.get_quotes([leg.asset for leg in order.legs])))
+
     # figure out the best expected price the order would fill at
     leg_prices = {}
     order_price = 0.0
     for leg in order.legs:
-        leg_prices[leg] = estimator.estimate(quote_adapter.get_quote(leg.asset)) * copysign(1, leg.quantity)
+        leg_prices[leg] = estimator.estimate(leg_quotes[leg]) * copysign(1, leg.quantity)
         order_price += leg_prices[leg] * abs(leg.quantity)
 
     if order.condition == 'market' or (order.condition == 'limit' and order.price < order_price):
@@ -58,13 +66,12 @@ def fill_order(account: Account = None, order: Order = None, quote_adapter:Quote
             # if the leg is opening, then create a position for each leg
             if leg.order_type.lower() in ['bto', 'sto']:
 
-                account.positions.append(Position(leg.asset, leg.quantity, cost_basis, quote=quote_adapter.get_quote(leg.asset)))
+                open_position(account, leg.asset, leg.quantity, cost_basis, quote=leg_quotes[leg])
 
             elif leg.order_type.lower() in ['btc', 'stc']:
 
-                closable_positions = [position for position in account.positions if
-                                      position.asset == leg.asset and copysign(1, position.quantity) == (
-                                          copysign(1, leg.quantity) * -1)]
+                closable_positions = [position for position in account.positions.for_symbol(leg.asset) if
+                                      copysign(1, position.quantity) == (copysign(1, leg.quantity) * -1)]
 
                 if len(closable_positions) == 0:
                     raise Exception("logic.fill_order: There are no available positions to close.")
@@ -79,14 +86,14 @@ def fill_order(account: Account = None, order: Order = None, quote_adapter:Quote
                 quantity_to_close_remaining = abs(leg.quantity)
                 for position in closable_positions:
                     if quantity_to_close_remaining > 0:
-                        quantity_can_close = abs(position.quantity)
-                        quantity_to_close = min(quantity_to_close_remaining, quantity_can_close)
-                        position.quantity += copysign(1, position.quantity) * -1 * quantity_to_close
-                        quantity_to_close_remaining -= quantity_to_close
+                        quantity_to_close_remaining -= reduce_position(position, quantity_to_close_remaining)
 
     # filter out any positions that are completely closed
-    account.positions = [position for position in account.positions if position.quantity != 0]
-    account.maintenance_margin = get_maintenance_margin(positions=account.positions, quote_adapter=quote_adapter)
+    account.positions.prune()
+    if update_margin:
+        update_maintenance_margin(account, quote_adapter=quote_adapter,
+                                  underlyings=[leg.asset.underlying.symbol if isinstance(leg.asset, Option) else leg.asset.symbol
+                                               for leg in order.legs])
     order.status = 'filled'
 
     return account
@@ -22,9 +22,14 @@
 
 
 
-from ..assets import Asset, Option, Call, Put
+from ..assets import Asset, Option, Call, Put, asset_factory
 from ..positions import Position
 
+
+class StrategyError(Exception):
+    """Positions that can't be put together into a strategy, so they can't be margined"""
+
+
 class BasicStrategy:
     def __init__(self, strategy_type=None, quantity=1):
         self.strategy_type = strategy_type if strategy_type is not None else 'basic'
@@ -61,13 +66,13 @@ class SpreadStrategy(BasicStrategy):
         super(SpreadStrategy, self).__init__('spread', quantity)
 
         if sell_option.option_type != buy_option.option_type:
-            raise Exception("SpreadStrategy: option types of sell and buy must match")
+            raise StrategyError("SpreadStrategy: option types of sell and buy must match")
 
         if sell_option.underlying != buy_option.underlying :
-            raise Exception("SpreadStrategy: underlying types of sell and buy must match")
+            raise StrategyError("SpreadStrategy: underlying types of sell and buy must match")
 
         if sell_option.strike == buy_option.strike :
-            raise Exception("SpreadStrategy: strikes of sell and buy must be different")
+            raise StrategyError("SpreadStrategy: strikes of sell and buy must be different")
 
         self.sell_option = sell_option
         self.buy_option = buy_option
@@ -89,7 +94,7 @@ class CoveredStrategy(BasicStrategy):
         super(CoveredStrategy, self).__init__('covered', quantity)
 
         if asset != sell_option.underlying:
-            raise Exception("CoveredStrategy: option underlying must be the same as asset")
+            raise StrategyError("CoveredStrategy: option underlying must be the same as asset")
 
         self.asset = asset
         self.sell_option = sell_option
@@ -105,6 +110,8 @@ def create_asset_strategies(positions, underlying):
 
     asset_strategies = []
 
+    # the underlying can be given as its symbol, the equity strategies hold the asset
+    underlying = asset_factory(underlying)
     long_equity = AssetStrategy(asset=underlying, quantity=sum([_.quantity for _ in positions if not isinstance(_.asset, Option) and _.quantity > 0]))
     short_equity = AssetStrategy(asset=underlying, quantity=sum([_.quantity for _ in positions if not isinstance(_.asset, Option) and _.quantity < 0]))
 
@@ -142,95 +149,112 @@ def _group_into_basic_strategies_in_underlying(underlying, positions):
 
     positions = [_ for _ in positions if (isinstance(_.asset, Option) and _.asset.underlying == underlying) or (_.asset == underlying)]
 
-    strategies = []
-
-    long_equity = AssetStrategy(asset=underlying, quantity=sum([_.quantity for _ in positions if not isinstance(_.asset, Option) and _.quantity > 0]))
-    short_equity = AssetStrategy(asset=underlying, quantity=sum([_.quantity for _ in positions if not isinstance(_.asset, Option) and _.quantity < 0]))
-
-    # get the short calls/puts
-    short_calls = []
-    for call in [p for p in positions if
-                 isinstance(p.asset, Option) and p.quantity < 0 and p.asset.option_type == 'call']:
-        for x in range(0, abs(int(call.quantity))):
-            short_calls.append(AssetStrategy(asset=call.asset, quantity=-1))
-
-    short_puts = []
-    for put in [p for p in positions if
-                 isinstance(p.asset, Option) and p.quantity < 0 and p.asset.option_type == 'put']:
-        for x in range(0, abs(int(put.quantity))):
-            short_puts.append(AssetStrategy(asset=put.asset, quantity=-1))
-
-    # get all the long calls/puts
-    long_calls = []
-    for call in [p for p in positions if
-                 isinstance(p.asset, Option) and p.quantity > 0 and p.asset.option_type == 'call']:
-        for x in range(0, abs(int(call.quantity))):
-            long_calls.append(AssetStrategy(asset=call.asset, quantity=1))
-
-    long_puts = []
-    for put in [p for p in positions if
-                 isinstance(p.asset, Option) and p.quantity > 0 and p.asset.option_type == 'put']:
-        for x in range(0, abs(int(put.quantity))):
-            long_puts.append(AssetStrategy(asset=put.asset, quantity=1))
-
-    # sort by in the moneyness
-    short_calls = sorted(short_calls, key = lambda k: k.asset.strike, reverse=False)
-    long_calls = sorted(long_calls, key = lambda k: k.asset.strike, reverse=False)
-    short_puts = sorted(short_puts, key = lambda k: k.asset.strike, reverse=True)
-    long_puts = sorted(long_puts, key = lambda k: k.asset.strike, reverse=True)
-
-
+    return _group_positions_in_underlying(underlying, positions)
 
 
-    for short_call in short_calls:
-
-        if long_equity.quantity >= 100:
-            # if there are enough shares to cover this call, cover it and don't hit margin
-            strategies.append(CoveredStrategy(asset=underlying, sell_option=short_call.asset))
-            long_equity.quantity -= 100
-
-        elif len(long_calls) > 0:
-            # if there are still any long calls, use them to build spreads
-            long_call = long_calls.pop(0)
-            strategies.append(SpreadStrategy( buy_option=long_call.asset, sell_option=short_call.asset))
+def _contract_buckets(positions, option_type, short, reverse):
+    """
+        The contracts of the long or short options of option_type, as [option, number of contracts] per option
+          sorted by strike, options with the same strike in the order their first position comes in
+    """
+    buckets = {}
+    for position in positions:
+        if isinstance(position.asset, Option) and position.asset.option_type == option_type \
+                and (position.quantity < 0 if short else position.quantity > 0):
+            bucket = buckets.setdefault(position.asset.symbol, [position.asset, 0])
+            bucket[1] += abs(int(position.quantity))
+    return sorted([_ for _ in buckets.values() if _[1] > 0], key=lambda k: k[0].strike, reverse=reverse)
 
-        else:
-            # if not then we just have to add this one as a naked short call
-            strategies.append(short_call)
 
+def _pair_short_options(underlying, short_options, long_options, covering_shares, consume_shares=True):
+    """
+        Cover, spread or leave naked each short contract, in the order a contract at a time would be, but a
+          bucket at a time. long_options is used up as it is paired.
+    :param covering_shares: The shares available to cover with
+    :param consume_shares: Whether covering a contract uses up 100 of them
+    :return: The strategies, and the shares left to cover with
+    """
+    strategies = []
+    for option, contracts in short_options:
+
+        if covering_shares >= 100:
+            # if there are enough shares to cover these, cover them and don't hit margin
+            covered = min(contracts, int(covering_shares // 100)) if consume_shares else contracts
+            strategies.append(CoveredStrategy(asset=underlying, sell_option=option, quantity=covered))
+            if consume_shares:
+                covering_shares -= 100 * covered
+            contracts -= covered
+
+        while contracts > 0 and len(long_options) > 0:
+            # if there are still any long options, use them to build spreads
+            long_option = long_options[0]
+            paired = min(contracts, long_option[1])
+            strategies.append(SpreadStrategy(buy_option=long_option[0], sell_option=option, quantity=paired))
+            long_option[1] -= paired
+            contracts -= paired
+            if long_option[1] == 0:
+                long_options.pop(0)
+
+        if contracts > 0:
+            # if not then we just have to add these as naked short options
+            strategies.append(AssetStrategy(asset=option, quantity=-contracts))
+
+    return strategies, covering_shares
+
+
+def _group_positions_in_underlying(underlying, positions):
+    """
+        positions must already be the positions in or of underlying.
+        Contracts are kept in (option, quantity) buckets and the strategies carry quantities, so grouping
+          costs as much as the number of distinct options, not the number of contracts.
+    """
 
-    for short_put in short_puts:
+    strategies = []
 
-        if short_equity.quantity >= 100:
-            # if there are enough shares to cover this put, cover it and don't hit margin
-            strategies.append(CoveredStrategy(asset=underlying, sell_option=short_put.asset))
-            short_put.quantity -= 100
+    # the underlying can be given as its symbol, the equity strategies hold the asset
+    underlying = asset_factory(underlying)
+    long_equity = AssetStrategy(asset=underlying, quantity=sum([_.quantity for _ in positions if not isinstance(_.asset, Option) and _.quantity > 0]))
+    short_equity = AssetStrategy(asset=underlying, quantity=sum([_.quantity for _ in positions if not isinstance(_.asset, Option) and _.quantity < 0]))
 
-        elif len(long_puts) > 0:
-            # if there are still any long puts, use them to build spreads
-            long_put = long_puts.pop(0)
-            strategies.append(SpreadStrategy( buy_option=long_put.asset, sell_option=short_put.asset))
+    # sort by in the moneyness
+    short_calls = _contract_buckets(positions, 'call', short=True, reverse=False)
+    long_calls = _contract_buckets(positions, 'call', short=False, reverse=False)
+    short_puts = _contract_buckets(positions, 'put', short=True, reverse=True)
+    long_puts = _contract_buckets(positions, 'put', short=False, reverse=True)
 
-        else:
-            # if not then we just have to add this one as a naked short put
-            strategies.append(short_put)
+    call_strategies, long_equity.quantity = _pair_short_options(underlying, short_calls, long_calls, long_equity.quantity)
+    strategies += call_strategies
 
+    # short shares (a negative quantity) never reach 100, so puts are spread or left naked
+    put_strategies, _ = _pair_short_options(underlying, short_puts, long_puts, short_equity.quantity, consume_shares=False)
+    strategies += put_strategies
 
     # ok, now to close everything up
-    # we can ignore the short option lists now because we're done with those
+    # we can ignore the short options now because we're done with those
     # but we need to add everything long and also the long/short equities
-    strategies += long_calls + long_puts + [long_equity] + [short_equity]
+    strategies += [AssetStrategy(asset=option, quantity=contracts) for option, contracts in long_calls + long_puts]
+    strategies += [long_equity] + [short_equity]
 
     return strategies
 
 def group_into_basic_strategies(positions):
 
-    # get a unique list of underlyings
-    underlyings = list(set([_.asset.underlying.symbol for _ in positions if isinstance(_.asset, Option)]))
+    # the positions in or of each underlying with options, from the account's index if there is one
+    if hasattr(positions, 'option_underlyings'):
+        positions_by_underlying = {_: positions.in_underlying(_) for _ in positions.option_underlyings()}
+    else:
+        positions_by_underlying = {}
+        for position in positions:
+            if isinstance(position.asset, Option):
+                positions_by_underlying.setdefault(position.asset.underlying.symbol, [])
+        for position in positions:
+            underlying = position.asset.underlying.symbol if isinstance(position.asset, Option) else position.asset.symbol
+            if underlying in positions_by_underlying:
+                positions_by_underlying[underlying].append(position)
 
     # add all the strategies for each underlying
     strategies = []
-    for underlying in underlyings:
-        strategies += _group_into_basic_strategies_in_underlying(underlying=underlying, positions=positions)
+    for underlying, positions_in_underlying in positions_by_underlying.items():
+        strategies += _group_positions_in_underlying(underlying=underlying, positions=positions_in_underlying)
 
     return strategies
\ No newline at end of file
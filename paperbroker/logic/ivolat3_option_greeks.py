@@ -5,8 +5,28 @@
 ###############################
 
 import ivolat3
-
-def get_option_greeks(option_type, strike, underlying_price, days_to_expiration, price, dividend = 0.0):
+from ..caches import LRUCache
+
+# the order of each greek, pass the orders you need to get_option_greeks to skip the rest
+# implied volatility is always solved since everything else depends on it
+GREEK_ORDERS = {
+    "delta": 1,
+    "vega": 1,
+    "theta": 1,
+    "rho": 1,
+    "dual_delta": 1,
+    "gamma": 2,
+    "vanna": 2,
+    "charm": 2,
+    "veta": 2,
+    "vomma": 2,
+    "speed": 3,
+    "zomma": 3,
+    "color": 3,
+    "ultima": 3,
+}
+
+def get_option_greeks(option_type, strike, underlying_price, days_to_expiration, price, dividend = 0.0, orders = (1, 2, 3)):
 
     out = {
         "iv": None,
@@ -61,30 +81,80 @@ def get_option_greeks(option_type, strike, underlying_price, days_to_expiration,
 
     out['iv'] = sigma
 
-    out['delta'] = ivolat3.delta_call(s, k, r, q, t, sigma) if \
-        option_type == 'call' else ivolat3.delta_put(s, k, r, q, t, sigma)
+    if 1 in orders:
+        out['delta'] = ivolat3.delta_call(s, k, r, q, t, sigma) if \
+            option_type == 'call' else ivolat3.delta_put(s, k, r, q, t, sigma)
+
+        out['vega'] = ivolat3.vega(s, k, r, q, t, sigma)
 
-    out['vega'] = ivolat3.vega(s, k, r, q, t, sigma)
+        out['theta'] = (ivolat3.theta_call(s, k, r, q, t, sigma) if
+                        option_type == 'call' else ivolat3.theta_put(s, k, r, q, t, sigma)) / 365
 
-    out['theta'] = (ivolat3.theta_call(s, k, r, q, t, sigma) if
-                    option_type == 'call' else ivolat3.theta_put(s, k, r, q, t, sigma)) / 365
+        out['rho'] = ivolat3.rho_call(s, k, r, q, t, sigma) if \
+            option_type == 'call' else ivolat3.rho_put(s, k, r, q, t, sigma)
 
-    out['rho'] = ivolat3.rho_call(s, k, r, q, t, sigma) if \
-        option_type == 'call' else ivolat3.rho_put(s, k, r, q, t, sigma)
+        out['dual_delta'] = ivolat3.dualdelta_call(s, k, r, q, t, sigma) if option_type == 'call' else ivolat3.dualdelta_put(
+            s, k, r, q, t, sigma)
 
-    out['gamma'] = ivolat3.gamma(s, k, r, q, t, sigma)
-    out['vanna'] = ivolat3.vanna(s, k, r, q, t, sigma)
-    out['charm'] = (ivolat3.charm_call(s, k, r, q, t, sigma) if \
-        option_type == 'call' else ivolat3.charm_put(s, k, r, q, t, sigma)) / 365
-    out['speed'] = ivolat3.speed(s, k, r, q, t, sigma) / 365
-    out['zomma'] = ivolat3.zomma(s, k, r, q, t, sigma) / 365
-    out['color'] = ivolat3.color(s, k, r, q, t, sigma) / (365)
-    out['veta'] = ivolat3.DvegaDtime(s, k, r, q, t, sigma) / (100 * 365)
-    out['vomma'] = ivolat3.vomma(s, k, r, q, t, sigma)
-    out['ultima'] = ivolat3.ultima(s, k, r, q, t, sigma) / 365
+    if 2 in orders:
+        out['gamma'] = ivolat3.gamma(s, k, r, q, t, sigma)
+        out['vanna'] = ivolat3.vanna(s, k, r, q, t, sigma)
+        out['charm'] = (ivolat3.charm_call(s, k, r, q, t, sigma) if \
+            option_type == 'call' else ivolat3.charm_put(s, k, r, q, t, sigma)) / 365
+        out['veta'] = ivolat3.DvegaDtime(s, k, r, q, t, sigma) / (100 * 365)
+        out['vomma'] = ivolat3.vomma(s, k, r, q, t, sigma)
 
-    out['dual_delta'] = ivolat3.dualdelta_call(s, k, r, q, t, sigma) if option_type == 'call' else ivolat3.dualdelta_put(
-        s, k, r, q, t, sigma)
+    if 3 in orders:
+        out['speed'] = ivolat3.speed(s, k, r, q, t, sigma) / 365
+        out['zomma'] = ivolat3.zomma(s, k, r, q, t, sigma) / 365
+        out['color'] = ivolat3.color(s, k, r, q, t, sigma) / (365)
+        out['ultima'] = ivolat3.ultima(s, k, r, q, t, sigma) / 365
 
     return out
 
+
+class OptionGreeksCache(object):
+    """
+        Memoizes get_option_greeks in a bounded LRU cache.
+
+        The price and underlying price are rounded to price_digits and underlying_price_digits decimal
+          places before being used as the key, and the greeks are solved from the rounded values, so quotes
+          that only differ past those digits share an entry and the result never depends on which came first.
+        hits, misses and evictions are counted, see stats()
+    """
+
+    def __init__(self, maxsize=2 ** 16, price_digits=4, underlying_price_digits=4):
+        self.price_digits = price_digits
+        self.underlying_price_digits = underlying_price_digits
+        self.cache = LRUCache(maxsize=maxsize)
+
+    def get_option_greeks(self, option_type, strike, underlying_price, days_to_expiration, price, dividend = 0.0, orders = (1, 2, 3)):
+        if price is not None:
+            price = round(price, self.price_digits)
+        if underlying_price is not None:
+            underlying_price = round(underlying_price, self.underlying_price_digits)
+
+        key = (option_type, strike, underlying_price, days_to_expiration, price, dividend, tuple(orders))
+        greeks = self.cache.get(key)
+        if greeks is None:
+            greeks = self.cache.put(key, get_option_greeks(option_type, strike, underlying_price, days_to_expiration, price, dividend=dividend, orders=orders))
+
+        # a copy so callers can't change what is cached
+        return dict(greeks)
+
+    def stats(self):
+        return self.cache.stats()
+
+    def clear(self):
+        self.cache.clear()
+
+
+# the cache get_cached_option_greeks uses, replace it to resize or change the rounding
+option_greeks_cache = OptionGreeksCache()
+
+
+def get_cached_option_greeks(option_type, strike, underlying_price, days_to_expiration, price, dividend = 0.0, orders = (1, 2, 3)):
+    """
+        get_option_greeks memoized through option_greeks_cache
+    """
+    return option_greeks_cache.get_option_greeks(option_type, strike, underlying_price, days_to_expiration, price, dividend=dividend, orders=orders)
@@ -0,0 +1,72 @@
+"""
+
+    How an account's fills become positions, set per account with Account.lot_policy:
+
+        'separate'   every opening fill is its own Position (the default, how accounts always worked)
+        'aggregate'  one Position per asset and direction with a weighted average cost basis
+        'fifo'       one Position per asset and direction whose Lots close oldest first
+        'lifo'       one Position per asset and direction whose Lots close newest first
+
+    The last three keep an account that scales into a name over thousands of fills at one position,
+      and closing any quantity out of fifo or lifo lots is a binary search instead of a scan.
+
+    usage: account = Account(lot_policy='fifo')
+
+"""
+from math import copysign
+
+from ..positions import Position, Lots
+
+LOT_POLICIES = ('separate', 'aggregate', 'fifo', 'lifo')
+
+
+def validate_lot_policy(lot_policy):
+    if lot_policy not in LOT_POLICIES:
+        raise Exception("logic.lot_policy: lot_policy must be one of {}".format(', '.join(LOT_POLICIES)))
+    return lot_policy
+
+
+def open_position(account, asset, quantity, cost_basis, quote=None):
+    """
+        Add quantity of asset at cost_basis to the account per its lot policy
+    :return: The position it went into
+    """
+    lot_policy = getattr(account, 'lot_policy', 'separate')
+
+    if lot_policy != 'separate':
+        same_direction = [_ for _ in account.positions.for_symbol(asset) if copysign(1, _.quantity) == copysign(1, quantity)]
+        if len(same_direction) > 0:
+            position = same_direction[-1]
+            if position.lots is not None:
+                position.lots.add(quantity, cost_basis)
+                position.cost_basis = position.lots.cost_basis
+            else:
+                total = abs(position.quantity) + abs(quantity)
+                position.cost_basis = (position.cost_basis * abs(position.quantity) + cost_basis * abs(quantity)) / total
+            position.quantity += quantity
+            if quote is not None:
+                position.quote = quote
+            return position
+
+    lots = None
+    if lot_policy in ('fifo', 'lifo'):
+        lots = Lots(lot_policy)
+        lots.add(quantity, cost_basis)
+
+    position = Position(asset, quantity, cost_basis, quote=quote, lots=lots)
+    account.positions.append(position)
+    return position
+
+
+def reduce_position(position, quantity):
+    """
+        Take abs(quantity) off of position, out of its lots if it has them. The position is left at zero
+          rather than removed, prune the account's positions afterwards
+    :return: The quantity taken off
+    """
+    quantity = min(abs(quantity), abs(position.quantity))
+    if position.lots is not None:
+        position.lots.close(quantity)
+        position.cost_basis = position.lots.cost_basis if position.lots.quantity > 0 else position.cost_basis
+    position.quantity += copysign(1, position.quantity) * -1 * quantity
+    return quantity
@@ -22,6 +22,13 @@ def get_maintenance_margin(strategies=None, positions=None, quote_adapter:QuoteA
     if positions is None: positions = list()
     if strategies is None: strategies = group_into_basic_strategies(positions)
 
+    # quote every short non-option asset in one request
+    short_assets = [strategy.asset for strategy in strategies
+                    if strategy.strategy_type == 'asset'
+                    and strategy.direction == 'short'
+                    and strategy.asset.asset_type not in ('option', 'call', 'put')]
+    quotes = dict(zip([_.symbol for _ in short_assets], quote_adapter.get_quotes(short_assets))) if len(short_assets) > 0 else {}
+
     #start the calculation off
     total_margin_requirement = 0.0
 
@@ -36,7 +43,7 @@ def get_maintenance_margin(strategies=None, positions=None, quote_adapter:QuoteA
                 and strategy.asset.asset_type not in ('option', 'call', 'put') \
                 and strategy.direction == 'short':
             # non-option shorts have a margin requirement equal to the cost to repurchase
-            total_margin_requirement += abs(strategy.quantity) * quote_adapter.get_quote(strategy.asset).price
+            total_margin_requirement += abs(strategy.quantity) * quotes[strategy.asset.symbol].price
 
         elif strategy.strategy_type == 'covered':
             # no margin requirements for covered strategies
@@ -51,13 +58,13 @@ def get_maintenance_margin(strategies=None, positions=None, quote_adapter:QuoteA
                 and strategy.spread_type == 'credit' \
                 and strategy.option_type=='put':
             # credit put spreads use the width of the strikes
-            total_margin_requirement += (strategy.sell_option.strike - strategy.buy_option.strike) * 100
+            total_margin_requirement += (strategy.sell_option.strike - strategy.buy_option.strike) * 100 * strategy.quantity
 
         elif strategy.strategy_type == 'spread' \
                 and strategy.spread_type == 'credit' \
                 and strategy.option_type == 'call':
             # credit call spreads use the width of the strikes
-            total_margin_requirement += (strategy.buy_option.strike - strategy.sell_option.strike) * 100
+            total_margin_requirement += (strategy.buy_option.strike - strategy.sell_option.strike) * 100 * strategy.quantity
 
         elif strategy.strategy_type == 'asset' \
                 and strategy.direction=='short' \
@@ -75,3 +82,74 @@ def get_maintenance_margin(strategies=None, positions=None, quote_adapter:QuoteA
             raise Exception('A strategy was provided that we do not know how to calculate the maintenance margin for')
 
     return total_margin_requirement
+
+
+def get_maintenance_margin_by_underlying(positions=None, quote_adapter:QuoteAdapter=None, underlyings=None):
+    """
+        The margin requirement of each underlying with options on its own, strategies never span underlyings
+          so the requirement of the whole account is total_maintenance_margin() of these
+    :param positions: A PositionList (or anything with the same lookups)
+    :param underlyings: Only these underlyings, None for every underlying with options
+    :return: {underlying symbol: margin requirement, None if it can't be calculated}
+    """
+    option_underlyings = set(positions.option_underlyings())
+    if underlyings is None:
+        underlyings = option_underlyings
+
+    margins = {}
+    for underlying in underlyings:
+        if underlying not in option_underlyings:
+            # positions without options aren't grouped into strategies
+            margins[underlying] = 0.0
+            continue
+        strategies = group_into_basic_strategies(positions.in_underlying(underlying))
+        margins[underlying] = get_maintenance_margin(strategies=strategies, quote_adapter=quote_adapter)
+    return margins
+
+
+def total_maintenance_margin(margins):
+    """
+    :param margins: {underlying: margin requirement} from get_maintenance_margin_by_underlying
+    :return: Their sum, or None if any of them is None
+    """
+    total = 0.0
+    for margin in margins.values():
+        if margin is None:
+            return None
+        total += margin
+    return total
+
+
+def update_maintenance_margin(account, quote_adapter:QuoteAdapter=None, underlyings=()):
+    """
+        Bring account.maintenance_margin up to date after its positions in underlyings changed.
+        The margin of each underlying is kept in account.margin_by_underlying, so only these underlyings (and
+          any not worked out yet) are grouped into strategies and priced again, the rest keep their last margin.
+    :param underlyings: The symbols of the underlyings whose positions changed
+    :return: The new maintenance margin
+    """
+    option_underlyings = set(account.positions.option_underlyings())
+    underlyings = set(underlyings)
+
+    # a new dict rather than changing the old one, copies of the account share it
+    margins = {underlying: margin for underlying, margin in account.margin_by_underlying.items()
+               if underlying in option_underlyings and underlying not in underlyings}
+    stale = option_underlyings.difference(margins)
+    margins.update(get_maintenance_margin_by_underlying(account.positions, quote_adapter=quote_adapter, underlyings=stale))
+
+    account.margin_by_underlying = margins
+    account.maintenance_margin = total_maintenance_margin(margins)
+    return account.maintenance_margin
+
+
+def invalidate_maintenance_margin(account, underlyings=None):
+    """
+        Forget the cached margin of underlyings (every underlying if None) whose positions were changed
+          outside of fill_order, so the next update_maintenance_margin works it out again
+    """
+    if underlyings is None:
+        account.margin_by_underlying = {}
+    else:
+        underlyings = set(underlyings)
+        account.margin_by_underlying = {underlying: margin for underlying, margin in account.margin_by_underlying.items()
+                                        if underlying not in underlyings}
@@ -0,0 +1,293 @@
+"""
+
+    Monte Carlo value at risk and expected shortfall of accounts, in total and for each underlying.
+
+    Correlated moves of every underlying over the horizon are drawn with numpy (lognormal, at each
+      underlying's volatility), stock is revalued at the moved prices and options are repriced with
+      Black-Scholes at their quote's implied volatility and the time left after the horizon. Options that
+      expire within the horizon, or whose volatility can't be solved, are worth their intrinsic value. Options
+      quoted without an underlying price move by their intrinsic value at the underlying's own quote, and
+      positions that can't be priced at all are left out and listed in RiskReport.unpriced.
+
+    An option's value only depends on its own underlying's price, so by default each account's options in an
+      underlying are priced together on a fine grid of that underlying's moves (grid_points, spanning 9
+      standard deviations either way) and each path interpolates the total. Pass grid_points=None to reprice
+      every option on every path instead, which is exact but takes paths x options Black-Scholes evaluations.
+
+    Paths are drawn and evaluated a chunk at a time, so the memory needed stays at chunk_size x underlyings
+      (x options without the grid) however many paths there are; only the p&l of each path per underlying is kept.
+    The same seed gives the same paths, whatever the chunk size, and every account in one call sees the same
+      paths, so their results can be compared and added up.
+
+    By default an underlying's volatility is the average implied volatility of the options held on it
+      (30% if there are none) and underlyings are uncorrelated, pass volatilities and correlations to set them.
+
+    usage: report = monte_carlo_var(account, quote_adapter, paths=100000, seed=7)
+           report.var, report.expected_shortfall, report.by_underlying['AAL']
+
+"""
+import numpy as np
+
+from ..accounts import Account
+from ..adapters.quotes.QuoteAdapter import QuoteAdapter
+from ..assets import Asset, Option
+from .scenario_risk import black_scholes_premiums, position_quotes
+from .simulate_orders import quote_snapshot
+
+DEFAULT_VOLATILITY = 0.3
+
+
+class RiskReport():
+    """
+    The result of monte_carlo_var for one account, losses are positive
+
+    account_id - the account
+    confidence, horizon_days, paths - how it was simulated
+    var - the loss that is only exceeded with 1 - confidence probability
+    expected_shortfall - the average loss when var is exceeded
+    by_underlying - {underlying: {'var': ..., 'expected_shortfall': ...}} of the positions in or of each underlying
+    pnl - the p&l of every path
+    unpriced - the symbols of the positions that couldn't be priced, and so aren't in any of it
+    """
+    def __init__(self, account_id, confidence, horizon_days, paths, var, expected_shortfall, by_underlying, pnl, unpriced=None):
+        self.account_id = account_id
+        self.confidence = confidence
+        self.horizon_days = horizon_days
+        self.paths = paths
+        self.var = var
+        self.expected_shortfall = expected_shortfall
+        self.by_underlying = by_underlying
+        self.pnl = pnl
+        self.unpriced = unpriced if unpriced is not None else []
+
+
+def value_at_risk(pnl, confidence=0.99):
+    """:return: (var, expected shortfall) of the p&l samples, as positive losses"""
+    pnl = np.asarray(pnl, dtype=float)
+    var = -np.quantile(pnl, 1.0 - confidence)
+    tail = pnl[pnl <= -var]
+    return float(var), float(-tail.mean()) if len(tail) > 0 else float(var)
+
+
+def correlation_root(underlyings, correlations=None):
+    """
+    :param correlations: One correlation for every pair, a {(underlying, underlying): correlation} dict
+                           (pairs left out are uncorrelated), or a matrix in the order of underlyings
+    :return: A matrix that turns independent normal draws into correlated ones
+    """
+    n = len(underlyings)
+    if correlations is None:
+        matrix = np.eye(n)
+    elif isinstance(correlations, dict):
+        matrix = np.eye(n)
+        index = {_: i for i, _ in enumerate(underlyings)}
+        for (a, b), correlation in correlations.items():
+            if a in index and b in index and a != b:
+                matrix[index[a], index[b]] = matrix[index[b], index[a]] = correlation
+    elif np.ndim(correlations) == 0:
+        matrix = np.full((n, n), float(correlations))
+        np.fill_diagonal(matrix, 1.0)
+    else:
+        matrix = np.asarray(correlations, dtype=float)
+
+    if matrix.shape != (n, n):
+        raise Exception("logic.monte_carlo_var: correlations must be {0} x {0}".format(n))
+
+    # the symmetric square root, which (unlike cholesky) also works for perfectly correlated underlyings
+    eigenvalues, eigenvectors = np.linalg.eigh(matrix)
+    if n > 0 and eigenvalues.min() < -1e-8:
+        raise Exception("logic.monte_carlo_var: correlations must be positive semi-definite")
+    return eigenvectors @ np.diag(np.sqrt(np.maximum(eigenvalues, 0.0))) @ eigenvectors.T
+
+
+class _Book():
+    """An account's positions as arrays, options and stock by underlying"""
+
+    def __init__(self, account, quote_adapter):
+        self.account_id = account.account_id
+        positions = list(account.positions)
+        quotes = position_quotes(positions, quote_adapter)
+
+        stock, options = {}, {}
+        self.spots, self.ivs, self.unpriced = {}, {}, []
+        for position, quote in zip(positions, quotes):
+            if quote is None or not quote.is_priceable():
+                self.unpriced.append(position.asset.symbol)
+                continue
+            if isinstance(position.asset, Option):
+                underlying = position.asset.underlying.symbol
+                row = options.setdefault(position.asset.symbol, [underlying, quote, 0.0])
+                row[2] += position.quantity
+                if quote.underlying_price is not None and quote.iv is not None:
+                    self.ivs.setdefault(underlying, []).append(quote.iv / 100.0)
+            else:
+                stock[position.asset.symbol] = stock.get(position.asset.symbol, 0.0) + position.quantity
+                self.spots[position.asset.symbol] = quote.price
+
+        # options quoted without their underlying's price move with the underlying's own quote
+        options = [(underlying, quote, quantity, quote.underlying_price) for underlying, quote, quantity in options.values() if quantity != 0]
+        missing = sorted(set(_[0] for _ in options if _[3] is None) - set(self.spots))
+        spots = dict(self.spots)
+        if len(missing) > 0 and quote_adapter is not None:
+            snapshot = quote_snapshot(quote_adapter, [Asset(_) for _ in missing]).quotes
+            spots.update((_, snapshot[_].price) for _ in missing if _ in snapshot and snapshot[_].is_priceable())
+
+        self.options = []
+        for underlying, quote, quantity, spot in options:
+            spot = spot if spot is not None else spots.get(underlying)
+            if spot is None:
+                self.unpriced.append(quote.asset.symbol)
+            else:
+                self.options.append((underlying, quote, quantity, spot))
+
+        self.underlyings = sorted(set(stock) | set(_[0] for _ in self.options))
+        self.stock = [(underlying, quantity) for underlying, quantity in stock.items() if quantity != 0]
+
+    def prepare(self, underlying_index, horizon_days, log_grids=None):
+        """
+            Arrays for evaluate(), underlying_index is the column of each underlying in the draws
+        :param log_grids: (grid points, underlyings) of log moves to price the options on, None to price every path
+        """
+        local = {_: i for i, _ in enumerate(self.underlyings)}
+
+        # the value of each stock position, and which of the book's underlyings it adds to
+        self.stock_index = np.array([underlying_index[_] for _, q in self.stock], dtype='i8')
+        self.stock_value = np.array([q * self.spots[_] for _, q in self.stock], dtype=float)
+        self.stock_columns = np.zeros((len(self.stock), len(self.underlyings)))
+        self.stock_columns[np.arange(len(self.stock)), [local[_] for _, q in self.stock]] = 1.0
+
+        if len(self.options) == 0:
+            return
+        self.option_index = np.array([underlying_index[_[0]] for _ in self.options], dtype='i8')
+        self.option_columns = np.zeros((len(self.options), len(self.underlyings)))
+        self.option_columns[np.arange(len(self.options)), [local[_[0]] for _ in self.options]] = 1.0
+        self.is_call = np.array([_[1].asset.option_type == 'call' for _ in self.options])
+        self.strike = np.array([_[1].asset.strike for _ in self.options], dtype=float)
+        self.multiplier = np.array([_[2] * 100 for _ in self.options], dtype=float)
+        self.spot = np.array([_[3] for _ in self.options], dtype=float)
+        iv = np.array([_[1].iv if _[1].underlying_price is not None and _[1].iv is not None else np.nan
+                       for _ in self.options], dtype=float) / 100.0
+        days = np.array([_[1].days_to_expiration for _ in self.options], dtype=float)
+
+        # options that live past the horizon with a volatility get repriced, the rest are worth their intrinsic value
+        self.repriced = np.isfinite(iv) & (days > horizon_days)
+        t, t_after = days / 365.0, (days - horizon_days) / 365.0
+        self.t_after, self.r_after, self.iv = t_after, t_after * 0.02, iv
+
+        with np.errstate(all='ignore'):
+            base = black_scholes_premiums(self.is_call, self.spot, self.strike, t * 0.02, t, iv)
+        base_intrinsic = self.intrinsic(self.spot[None, :])[0]
+        self.base = np.where(np.isfinite(iv) & (days > 0), base, base_intrinsic)
+
+        # the p&l of the options in each of the book's underlyings at every point of its grid
+        self.log_grids = log_grids
+        if log_grids is not None:
+            option_underlyings = sorted(set(_[0] for _ in self.options))
+            self.grid_index = np.array([underlying_index[_] for _ in option_underlyings], dtype='i8')
+            self.grid_local = np.array([local[_] for _ in option_underlyings], dtype='i8')
+            # a block of options at a time, so pricing the grid doesn't take grid points x options of memory
+            moves = np.exp(log_grids)
+            self.grid_pnl = np.zeros((len(log_grids), len(self.underlyings)))
+            for start in range(0, len(self.options), 64):
+                rows = slice(start, start + 64)
+                self.grid_pnl += self.option_pnl(moves, rows) @ self.option_columns[rows]
+
+    def intrinsic(self, spots, rows=slice(None)):
+        is_call, strike = self.is_call[rows], self.strike[rows]
+        return np.where(is_call, np.maximum(spots - strike, 0.0), np.maximum(strike - spots, 0.0))
+
+    def option_pnl(self, moves, rows=slice(None)):
+        """:return: (paths, options) of the p&l of each option position (or of rows of them) after each path's moves"""
+        is_call, strike, iv, repriced = self.is_call[rows], self.strike[rows], self.iv[rows], self.repriced[rows]
+        spots = self.spot[rows] * moves[:, self.option_index[rows]]
+        values = self.intrinsic(spots, rows)
+        if repriced.any():
+            with np.errstate(all='ignore'):
+                values[:, repriced] = black_scholes_premiums(is_call[repriced], spots[:, repriced], strike[repriced],
+                                                             self.r_after[rows][repriced], self.t_after[rows][repriced], iv[repriced])
+        return (values - self.base[rows]) * self.multiplier[rows]
+
+    def evaluate(self, log_moves, pnl_by_underlying):
+        """
+        :param log_moves: (paths, underlyings) of the log of each underlying's price relative to now
+        :param pnl_by_underlying: (paths, the book's underlyings) to add the p&l to
+        """
+        if len(self.stock) > 0:
+            pnl_by_underlying += (self.stock_value * np.expm1(log_moves[:, self.stock_index])) @ self.stock_columns
+
+        if len(self.options) == 0:
+            return
+        if self.log_grids is None:
+            pnl_by_underlying += self.option_pnl(np.exp(log_moves)) @ self.option_columns
+            return
+        for index, local in zip(self.grid_index, self.grid_local):
+            pnl_by_underlying[:, local] += np.interp(log_moves[:, index], self.log_grids[:, index], self.grid_pnl[:, local])
+
+
+def simulate_var(accounts, quote_adapter:QuoteAdapter=None, paths=10000, confidence=0.99, horizon_days=1, seed=None,
+                 volatilities=None, correlations=None, chunk_size=2000, grid_points=2001):
+    """
+    :param accounts: The accounts, they all see the same paths
+    :param quote_adapter: Quotes positions that don't have a quote attached
+    :param paths: How many paths to draw
+    :param horizon_days: Calendar days to move each underlying and to age each option by
+    :param seed: Seed for numpy's random generator, the same seed gives the same results
+    :param volatilities: {underlying: annual volatility}, 0.25 for 25%, for any of the defaults to replace
+    :param correlations: See correlation_root
+    :param chunk_size: Paths drawn and evaluated at once
+    :param grid_points: Points to price options on per underlying, None to price them on every path
+    :return: A RiskReport for each account, in order
+    """
+    books = [_Book(account, quote_adapter) for account in accounts]
+    underlyings = sorted(set(_ for book in books for _ in book.underlyings))
+    underlying_index = {_: i for i, _ in enumerate(underlyings)}
+
+    ivs = {}
+    for book in books:
+        for underlying, values in book.ivs.items():
+            ivs.setdefault(underlying, []).extend(values)
+    sigma = np.array([(volatilities or {}).get(_, np.mean(ivs[_]) if _ in ivs else DEFAULT_VOLATILITY) for _ in underlyings], dtype=float)
+
+    # nothing to move, every account is flat
+    if len(underlyings) == 0:
+        return [RiskReport(book.account_id, confidence, horizon_days, paths, 0.0, 0.0, {}, np.zeros(paths), book.unpriced)
+                for book in books]
+
+    root = correlation_root(underlyings, correlations)
+    dt = horizon_days / 365.0
+    drift = -0.5 * sigma * sigma * dt
+    scale = np.maximum(sigma * np.sqrt(dt), 1e-12)
+
+    log_grids = None
+    if grid_points is not None:
+        log_grids = drift + scale * np.linspace(-9.0, 9.0, grid_points)[:, None]
+    for book in books:
+        book.prepare(underlying_index, horizon_days, log_grids)
+
+    rng = np.random.default_rng(seed)
+    results = [np.zeros((paths, len(book.underlyings))) for book in books]
+    for start in range(0, paths, chunk_size):
+        count = min(chunk_size, paths - start)
+        log_moves = drift + scale * (rng.standard_normal((count, len(underlyings))) @ root.T)
+        for book, pnl_by_underlying in zip(books, results):
+            book.evaluate(log_moves, pnl_by_underlying[start:start + count])
+
+    reports = []
+    for book, pnl_by_underlying in zip(books, results):
+        pnl = pnl_by_underlying.sum(axis=1)
+        var, expected_shortfall = value_at_risk(pnl, confidence)
+        by_underlying = {}
+        for i, underlying in enumerate(book.underlyings):
+            _var, _expected_shortfall = value_at_risk(pnl_by_underlying[:, i], confidence)
+            by_underlying[underlying] = {'var': _var, 'expected_shortfall': _expected_shortfall}
+        reports.append(RiskReport(book.account_id, confidence, horizon_days, paths, var, expected_shortfall, by_underlying, pnl,
+                                  book.unpriced))
+    return reports
+
+
+def monte_carlo_var(account:Account, quote_adapter:QuoteAdapter=None, **kwargs):
+    """
+        simulate_var for one account
+    :return: A RiskReport
+    """
+    return simulate_var([account], quote_adapter=quote_adapter, **kwargs)[0]
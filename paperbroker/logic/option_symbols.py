@@ -0,0 +1,80 @@
+"""
+
+    Encoding and decoding of OCC option symbols without going through a date parsing library.
+
+    An OCC symbol is the underlying symbol followed by 15 fixed width characters:
+        AAL170203P00046500 = AAL + 170203 (YYMMDD expiration) + P (put/call) + 00046500 (strike * 1000)
+
+    Expiration dates are carried around as 'YYYY-MM-DD' strings (to match the rest of the code)
+      and as datetime.date ordinals so date math is plain integer subtraction.
+
+"""
+
+import arrow
+from datetime import date
+
+
+def date_to_ordinal(value):
+    """
+        Convert a date-like value into a datetime.date ordinal.
+        'YYYY-MM-DD' strings and date/datetime/arrow objects are handled directly,
+          anything else is handed to arrow to parse
+    :param value: A date string, date, datetime, arrow or integer ordinal
+    :return: int
+    """
+    if isinstance(value, int):
+        return value
+
+    if isinstance(value, str) and len(value) == 10 and value[4] == '-' and value[7] == '-':
+        return date(int(value[0:4]), int(value[5:7]), int(value[8:10])).toordinal()
+
+    if hasattr(value, 'toordinal'):
+        return value.toordinal()
+
+    return arrow.get(value).date().toordinal()
+
+
+def ordinal_to_date_string(ordinal):
+    """
+    :param ordinal: A datetime.date ordinal
+    :return: The date as 'YYYY-MM-DD'
+    """
+    return date.fromordinal(ordinal).isoformat()
+
+
+def decode_option_symbol(symbol):
+    """
+        Split an OCC option symbol into its parts
+    :param symbol: An upper case OCC option symbol
+    :return: (underlying_symbol, expiration_date as 'YYYY-MM-DD', expiration ordinal, option_type, strike)
+    """
+    strike = int(symbol[-8:]) / 1000
+    option_type = 'call' if symbol[-9] == 'C' else 'put'
+
+    # two digit years pivot the same way arrow's YY token does
+    year = int(symbol[-15:-13])
+    year += 1900 if year > 68 else 2000
+    expiration = date(year, int(symbol[-13:-11]), int(symbol[-11:-9]))
+
+    return symbol[:-15], expiration.isoformat(), expiration.toordinal(), option_type, strike
+
+
+def encode_expiration(expiration_date):
+    """
+    :param expiration_date: Anything date_to_ordinal() accepts
+    :return: The YYMMDD segment of an OCC symbol expiring on that date
+    """
+    expiration = date.fromordinal(date_to_ordinal(expiration_date))
+    return '{:02d}{:02d}{:02d}'.format(expiration.year % 100, expiration.month, expiration.day)
+
+
+def encode_option_symbol(underlying_symbol, expiration_date, option_type, strike):
+    """
+        Build an OCC option symbol from its parts
+    :param underlying_symbol: The symbol of the underlying asset
+    :param expiration_date: Anything date_to_ordinal() accepts
+    :param option_type: 'call' or 'put'
+    :param strike: The strike price
+    :return: The upper case OCC symbol
+    """
+    return (underlying_symbol + encode_expiration(expiration_date) + option_type[0] + str(int(round(strike, 2) * 1000)).zfill(8)).upper()
@@ -0,0 +1,236 @@
+"""
+
+    Broker-wide margin and risk for every account in an AccountAdapter, for an end of day margin call sweep.
+
+    Accounts are loaded and flattened into columns (account, underlying, option type, strike, quantity)
+      in shards, across a process pool with processes=N. Then every symbol is quoted in one request and
+      the margin, market value and net liquidation value of all the accounts are worked out together
+      with numpy, without grouping any positions into strategy objects.
+
+    The margin follows get_maintenance_margin: per underlying with options, short calls in order of strike
+      are covered by 100 long shares each, then spread against the long calls in order of strike, short
+      puts (from the highest strike) are spread against long puts, credit spreads need their width, and
+      short shares their repurchase cost. An account with a naked short option has no margin (NaN), as
+      does one with a spread of equal strikes, which get_maintenance_margin raises on.
+
+    usage: summary = get_portfolio_risk(account_adapter, quote_adapter, processes=4)
+           summary[summary['margin_call']]['account_id']
+
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ..adapters.accounts.AccountAdapter import AccountAdapter
+from ..adapters.quotes.QuoteAdapter import QuoteAdapter
+from ..assets import Option
+from .simulate_orders import quote_snapshot
+
+STOCK, CALL, PUT = 0, 1, 2
+
+SUMMARY_DTYPE = np.dtype([('account_id', object), ('cash', 'f8'), ('market_value', 'f8'), ('net_liquidation', 'f8'),
+                          ('maintenance_margin', 'f8'), ('excess_liquidity', 'f8'), ('margin_call', '?')])
+
+
+def flatten_accounts(accounts):
+    """
+    :return: A dict of the accounts as columns, one row per position
+               account_ids, cash: one per account
+               account: the row's index into account_ids
+               underlying, symbol, asset: the symbol of the underlying, of the position's asset, and the asset itself
+               kind: STOCK, CALL or PUT
+               strike, quantity, contracts: contracts is the whole contracts of an option, as grouping counts them
+    """
+    account_ids, cash = [], []
+    account, underlying, symbol, asset, kind, strike, quantity = [], [], [], [], [], [], []
+
+    for i, _account in enumerate(accounts):
+        account_ids.append(_account.account_id)
+        cash.append(_account.cash)
+        for position in _account.positions:
+            is_option = isinstance(position.asset, Option)
+            account.append(i)
+            underlying.append(position.asset.underlying.symbol if is_option else position.asset.symbol)
+            symbol.append(position.asset.symbol)
+            asset.append(position.asset)
+            kind.append(STOCK if not is_option else CALL if position.asset.option_type == 'call' else PUT)
+            strike.append(position.asset.strike if is_option else np.nan)
+            quantity.append(position.quantity)
+
+    quantity = np.array(quantity, dtype='f8')
+    kind = np.array(kind, dtype='i1')
+    return {
+        'account_ids': account_ids,
+        'cash': np.array(cash, dtype='f8'),
+        'account': np.array(account, dtype='i8'),
+        'underlying': underlying,
+        'symbol': symbol,
+        'asset': asset,
+        'kind': kind,
+        'strike': np.array(strike, dtype='f8'),
+        'quantity': quantity,
+        'contracts': np.where(kind == STOCK, 0.0, np.abs(np.trunc(quantity))),
+    }
+
+
+def _load_and_flatten(account_adapter, account_ids):
+    return flatten_accounts([account_adapter.get_account(_) for _ in account_ids])
+
+
+def concatenate_flattened(shards):
+    """:return: The flattened shards as one, with account indexes running on from shard to shard"""
+    shards = list(shards)
+    offsets = np.cumsum([0] + [len(_['account_ids']) for _ in shards])
+    flattened = {'account_ids': [_ for shard in shards for _ in shard['account_ids']]}
+    for key in ('underlying', 'symbol', 'asset'):
+        flattened[key] = [_ for shard in shards for _ in shard[key]]
+    for key, dtype in (('cash', 'f8'), ('kind', 'i1'), ('strike', 'f8'), ('quantity', 'f8'), ('contracts', 'f8')):
+        flattened[key] = np.concatenate([np.array([], dtype=dtype)] + [_[key] for _ in shards])
+    flattened['account'] = np.concatenate([np.array([], dtype='i8')] + [shard['account'] + offset for shard, offset in zip(shards, offsets)])
+    return flattened
+
+
+def _local_ends(groups, counts, n_groups):
+    """:return: The end of each row within its group, counting contracts, rows sorted by group"""
+    ends = np.cumsum(counts)
+    group_starts = np.cumsum(np.bincount(groups, weights=counts, minlength=n_groups)) - np.bincount(groups, weights=counts, minlength=n_groups)
+    return ends - group_starts[groups]
+
+
+def pair_short_options(groups, is_short, strikes, contracts, covered, n_groups, descending=False):
+    """
+        The margin of pairing the short contracts of each group against its long ones, in order of strike,
+          after the first covered[group] short contracts are covered. Works on every group at once by laying
+          the groups end to end on one line of contracts and intersecting the short and long runs.
+    :param descending: Pair from the highest strike down (puts)
+    :return: (margin per group, naked per group, equal strikes per group)
+    """
+    sort_strikes = -strikes if descending else strikes
+    short, long = np.nonzero(is_short)[0], np.nonzero(~is_short)[0]
+    short = short[np.lexsort((sort_strikes[short], groups[short]))]
+    long = long[np.lexsort((sort_strikes[long], groups[long]))]
+
+    short_total = np.bincount(groups[short], weights=contracts[short], minlength=n_groups)
+    long_total = np.bincount(groups[long], weights=contracts[long], minlength=n_groups)
+    covered = np.minimum(covered, short_total)
+    naked = short_total - covered > long_total
+
+    # each group gets a stretch of the line long enough for its shorts and its (shifted) longs
+    extent = np.maximum(short_total, covered + long_total)
+    base = np.cumsum(extent) - extent
+
+    short_end = base[groups[short]] + _local_ends(groups[short], contracts[short], n_groups)
+    short_start = short_end - contracts[short]
+    long_end = base[groups[long]] + covered[groups[long]] + _local_ends(groups[long], contracts[long], n_groups)
+    long_start = long_end - contracts[long]
+
+    margin = np.zeros(n_groups)
+    equal = np.zeros(n_groups, dtype=bool)
+    points = np.unique(np.concatenate([short_start, short_end, long_start, long_end]))
+    if len(points) < 2 or len(short) == 0 or len(long) == 0:
+        return margin, naked, equal
+
+    # the stretches between consecutive points, and the short and long contract over each one
+    lengths = np.diff(points)
+    middles = points[:-1] + lengths / 2
+    i = np.minimum(np.searchsorted(short_end, middles, side='right'), len(short) - 1)
+    j = np.minimum(np.searchsorted(long_end, middles, side='right'), len(long) - 1)
+    paired = (short_start[i] <= middles) & (middles < short_end[i]) & (long_start[j] <= middles) & (middles < long_end[j])
+
+    sell, buy = strikes[short[i[paired]]], strikes[long[j[paired]]]
+    paired_groups = groups[short[i[paired]]]
+    width = (sell - buy) if descending else (buy - sell)
+    np.add.at(margin, paired_groups, np.maximum(width, 0.0) * 100 * lengths[paired])
+    equal[paired_groups[sell == buy]] = True
+    return margin, naked, equal
+
+
+def get_margin_columns(flattened, prices):
+    """
+    :param prices: The price of each row's asset, NaN if it couldn't be quoted
+    :return: The maintenance margin of each account, NaN where it can't be calculated
+    """
+    n_accounts = len(flattened['account_ids'])
+    account, kind, quantity, contracts, strikes = (flattened[_] for _ in ('account', 'kind', 'quantity', 'contracts', 'strike'))
+    if len(account) == 0:
+        return np.zeros(n_accounts)
+
+    # a group is the positions of one account in or of one underlying
+    underlyings = np.unique(np.array(flattened['underlying'], dtype=object), return_inverse=True)[1].reshape(-1)
+    keys, groups = np.unique(account * (underlyings.max() + 1) + underlyings, return_inverse=True)
+    groups = groups.reshape(-1)
+    n_groups = len(keys)
+    group_accounts = np.zeros(n_groups, dtype='i8')
+    group_accounts[groups] = account
+
+    # only underlyings with options get grouped into strategies
+    has_options = np.bincount(groups, weights=(kind != STOCK), minlength=n_groups) > 0
+    stock = kind == STOCK
+    long_shares = np.bincount(groups, weights=np.where(stock & (quantity > 0), quantity, 0.0), minlength=n_groups)
+
+    margin = np.zeros(n_groups)
+    naked = np.zeros(n_groups, dtype=bool)
+    equal = np.zeros(n_groups, dtype=bool)
+    for option_kind, covered, descending in ((CALL, np.floor(long_shares / 100), False), (PUT, np.zeros(n_groups), True)):
+        rows = (kind == option_kind) & (contracts > 0)
+        _margin, _naked, _equal = pair_short_options(groups[rows], quantity[rows] < 0, strikes[rows], contracts[rows],
+                                                     covered, n_groups, descending=descending)
+        margin += _margin
+        naked |= _naked
+        equal |= _equal
+
+    # short shares need the cost to buy them back
+    short_stock = stock & (quantity < 0) & has_options[groups]
+    np.add.at(margin, groups[short_stock], -quantity[short_stock] * prices[short_stock])
+
+    margin[(naked | equal) & has_options] = np.nan
+    return np.bincount(group_accounts[has_options], weights=margin[has_options], minlength=n_accounts)
+
+
+def summarize(flattened, quote_adapter:QuoteAdapter):
+    """
+    :return: A SUMMARY_DTYPE array, one row per account sorted by excess liquidity (margin calls first)
+    """
+    n_accounts = len(flattened['account_ids'])
+    snapshot = quote_snapshot(quote_adapter, flattened['asset'])
+
+    quoted = {symbol: quote.price for symbol, quote in snapshot.quotes.items() if quote.is_priceable()}
+    prices = np.array([quoted.get(_, np.nan) for _ in flattened['symbol']], dtype='f8')
+
+    # positions that can't be priced are worth nothing, as with Position.total_close_cost
+    multipliers = np.where(flattened['kind'] == STOCK, 1.0, 100.0)
+    values = np.nan_to_num(flattened['quantity'] * prices * multipliers)
+    market_value = np.bincount(flattened['account'], weights=values, minlength=n_accounts)
+
+    margin = get_margin_columns(flattened, prices)
+
+    summary = np.zeros(n_accounts, dtype=SUMMARY_DTYPE)
+    summary['account_id'] = flattened['account_ids']
+    summary['cash'] = flattened['cash']
+    summary['market_value'] = market_value
+    summary['net_liquidation'] = flattened['cash'] + market_value
+    summary['maintenance_margin'] = margin
+    summary['excess_liquidity'] = flattened['cash'] - margin
+    summary['margin_call'] = np.isnan(margin) | (flattened['cash'] < np.nan_to_num(margin)) | (flattened['cash'] < 0)
+
+    excess = np.where(summary['margin_call'], -np.inf, summary['excess_liquidity'])
+    return summary[np.argsort(excess, kind='stable')]
+
+
+def get_portfolio_risk(account_adapter:AccountAdapter, quote_adapter:QuoteAdapter, account_ids=None, processes=None, shard_size=500):
+    """
+    :param account_ids: The accounts to sweep, None for every account the adapter has
+    :param processes: Load and flatten the accounts across a pool of this many processes, None to do it here
+    :param shard_size: Accounts per shard
+    :return: A SUMMARY_DTYPE array, see summarize()
+    """
+    account_ids = list(account_ids) if account_ids is not None else list(account_adapter.get_account_ids())
+    shards = [account_ids[i:i + shard_size] for i in range(0, len(account_ids), shard_size)]
+
+    if processes is None or processes <= 1 or len(shards) <= 1:
+        flattened = [_load_and_flatten(account_adapter, shard) for shard in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            flattened = list(executor.map(_load_and_flatten, [account_adapter] * len(shards), shards))
+
+    return summarize(concatenate_flattened(flattened), quote_adapter)
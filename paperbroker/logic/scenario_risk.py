@@ -0,0 +1,163 @@
+"""
+
+    What an account is worth, and what margin it needs, if the underlyings move and implied volatility changes.
+
+    Every option position is repriced with Black-Scholes on a whole grid of spot and volatility shocks at
+      once, starting from the implied volatility its quote already has (OptionQuote.iv, solved by
+      get_option_greeks). Positions in the same option are added up first, so the work is one row per
+      option the account holds. Options whose volatility can't be solved move by their intrinsic value, as
+      do options quoted without an underlying price, at the underlying's own quote. Positions that can't be
+      priced at all are left out of every surface and listed in ScenarioGrid.unpriced.
+    The margin only changes with the spot shock, through short shares, and uses the same rules as
+      portfolio_risk.
+
+    usage: grid = scenario_grid(account, spot_shocks=np.linspace(-0.1, 0.1, 21), vol_shocks=[-5, 0, 5])
+           grid.pnl[grid.spot_index(-0.1), grid.vol_index(5)]
+
+"""
+import numpy as np
+
+from ..accounts import Account
+from ..adapters.quotes.QuoteAdapter import QuoteAdapter
+from ..assets import Asset, Option
+from .portfolio_risk import flatten_accounts, get_margin_columns
+from .simulate_orders import quote_snapshot
+from .vectorized_option_greeks import norm_cdf
+
+
+class ScenarioGrid():
+    """
+    The result of scenario_grid, surfaces are indexed [spot shock, vol shock]
+
+    spot_shocks - the relative moves of every underlying, -0.1 is down 10%
+    vol_shocks - the moves of implied volatility in points, 5 is up 5 (OptionQuote.iv is in points)
+    value - the market value of the positions with no shock
+    pnl - the change in value of the positions
+    net_liquidation - cash plus the value of the positions
+    margin - the maintenance margin, NaN where it can't be calculated
+    unpriced - the symbols of the positions that couldn't be priced, and so aren't in value or pnl
+    """
+    def __init__(self, spot_shocks, vol_shocks, value, pnl, net_liquidation, margin, unpriced=None):
+        self.spot_shocks = spot_shocks
+        self.vol_shocks = vol_shocks
+        self.value = value
+        self.pnl = pnl
+        self.net_liquidation = net_liquidation
+        self.margin = margin
+        self.unpriced = unpriced if unpriced is not None else []
+
+    def spot_index(self, spot_shock):
+        return int(np.argmin(np.abs(self.spot_shocks - spot_shock)))
+
+    def vol_index(self, vol_shock):
+        return int(np.argmin(np.abs(self.vol_shocks - vol_shock)))
+
+
+def black_scholes_premiums(is_call, s, k, r, t, sigma):
+    """
+        European option premiums without dividends, vectorized over every argument.
+        Only the call is priced, puts come from put-call parity, which is half the work of
+          vectorized_option_greeks.black_scholes_price on a big grid
+    """
+    sqrt_t = np.sqrt(t)
+    d1 = (np.log(s / k) + (r + 0.5 * sigma * sigma) * t) / (sigma * sqrt_t)
+    discounted_k = k * np.exp(-r * t)
+    call = s * norm_cdf(d1) - discounted_k * norm_cdf(d1 - sigma * sqrt_t)
+    return call - np.where(is_call, 0.0, s - discounted_k)
+
+
+def position_quotes(positions, quote_adapter):
+    """The quote of each position, from the position or else from one quote_adapter request"""
+    missing = [_.asset for _ in positions if _.quote is None]
+    if len(missing) == 0:
+        return [_.quote for _ in positions]
+    if quote_adapter is None:
+        raise Exception("logic.scenario_grid: positions without quotes need a quote_adapter")
+    snapshot = quote_snapshot(quote_adapter, missing).quotes
+    return [_.quote if _.quote is not None else snapshot.get(_.asset.symbol) for _ in positions]
+
+
+def scenario_grid(account:Account, spot_shocks, vol_shocks, quote_adapter:QuoteAdapter=None):
+    """
+    :param spot_shocks: Relative moves of every underlying, -0.1 for down 10%
+    :param vol_shocks: Moves of implied volatility in points, 5 for up 5
+    :param quote_adapter: Quotes positions that don't have a quote attached
+    :return: A ScenarioGrid
+    """
+    spot_shocks = np.asarray(spot_shocks, dtype=float).reshape(-1)
+    vol_shocks = np.asarray(vol_shocks, dtype=float).reshape(-1)
+    shape = (len(spot_shocks), len(vol_shocks))
+
+    positions = list(account.positions)
+    quotes = position_quotes(positions, quote_adapter)
+
+    # add up the positions in each asset, and price the ones that can be
+    quantities, quoted = {}, {}
+    for position, quote in zip(positions, quotes):
+        symbol = position.asset.symbol
+        quantities[symbol] = quantities.get(symbol, 0.0) + position.quantity
+        if quote is not None and quote.is_priceable():
+            quoted[symbol] = quote
+
+    # options quoted without their underlying's price move with the underlying's own quote
+    spots = {symbol: quote.price for symbol, quote in quoted.items() if not isinstance(quote.asset, Option)}
+    missing = sorted(set(quote.asset.underlying.symbol for quote in quoted.values()
+                         if isinstance(quote.asset, Option) and quote.underlying_price is None) - set(spots))
+    if len(missing) > 0 and quote_adapter is not None:
+        snapshot = quote_snapshot(quote_adapter, [Asset(_) for _ in missing]).quotes
+        spots.update((_, snapshot[_].price) for _ in missing if _ in snapshot and snapshot[_].is_priceable())
+
+    stock_value, option_rows, unpriced = 0.0, [], []
+    for symbol, quantity in quantities.items():
+        quote = quoted.get(symbol)
+        if quantity == 0:
+            continue
+        if quote is None:
+            unpriced.append(symbol)
+        elif isinstance(quote.asset, Option):
+            spot = quote.underlying_price if quote.underlying_price is not None else spots.get(quote.asset.underlying.symbol)
+            if spot is None:
+                unpriced.append(symbol)
+                continue
+            iv = quote.iv if quote.underlying_price is not None else None
+            option_rows.append((quote.asset.option_type == 'call', quote.asset.strike, spot,
+                                quote.days_to_expiration, iv if iv is not None else np.nan, quote.price, quantity * 100))
+        else:
+            stock_value += quantity * quote.price
+
+    moves = 1.0 + spot_shocks[:, None]
+    pnl = np.zeros(shape) + stock_value * spot_shocks[:, None]
+    value = stock_value + sum(_[5] * _[6] for _ in option_rows)
+
+    if len(option_rows) > 0:
+        is_call, k, s, days, iv, price, multiplier = (np.array(_) for _ in zip(*option_rows))
+        solved = np.isfinite(iv) & np.isfinite(s) & (days > 0)
+
+        # repriced at each shock, less the price with no shock, so unshocked p&l is zero
+        if solved.any():
+            t = days[solved] / 365.0
+            r = t * 0.02
+            sigma = np.maximum((iv[solved] + vol_shocks[None, :, None]) / 100.0, 1e-6)
+            with np.errstate(all='ignore'):
+                shocked = black_scholes_premiums(is_call[solved], s[solved] * moves[:, :, None], k[solved], r, t, sigma)
+                unshocked = black_scholes_premiums(is_call[solved], s[solved], k[solved], r, t, iv[solved] / 100.0)
+            pnl += np.sum((shocked - unshocked) * multiplier[solved], axis=2)
+
+        # the rest move with their intrinsic value
+        if (~solved).any():
+            is_call, k, s, multiplier = is_call[~solved], k[~solved], s[~solved], multiplier[~solved]
+            intrinsic = lambda spot: np.where(is_call, np.maximum(spot - k, 0.0), np.maximum(k - spot, 0.0))
+            change = np.nan_to_num(intrinsic(s * moves) - intrinsic(s)) * multiplier
+            pnl += np.sum(change, axis=1)[:, None]
+
+    # margin at each spot shock, the same across vol shocks. Only short shares are priced and their
+    #   margin is linear in the price, so it's the margin with free shares plus the shares' part times the move
+    flattened = flatten_accounts([account])
+    prices = np.array([quoted[_].price if _ in quoted else np.nan for _ in flattened['symbol']], dtype=float)
+    is_stock = np.array([not isinstance(_, Option) for _ in flattened['asset']], dtype=bool)
+    margin = get_margin_columns(flattened, prices)[0]
+    options_margin = get_margin_columns(flattened, np.where(is_stock, 0.0, prices))[0]
+    margin = np.broadcast_to(options_margin + (margin - options_margin) * moves, shape).copy()
+
+    return ScenarioGrid(spot_shocks, vol_shocks, value=value, pnl=pnl, net_liquidation=account.cash + value + pnl, margin=margin,
+                        unpriced=unpriced)
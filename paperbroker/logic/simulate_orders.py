@@ -0,0 +1,133 @@
+"""
+
+    What-if simulation of many candidate orders against the same account.
+
+    Everything the candidates have in common is done once:
+        one quote snapshot of every leg and every short position the margin needs
+        the maintenance margin of each of the account's underlyings
+    Then each candidate is filled into its own AccountOverlay, and only the underlyings its legs are in
+      are grouped into strategies again. A candidate costs about the same however big the account is.
+
+    Candidates run in this process, or split across a process pool with processes=N.
+    Candidates that can't fill or fail validate_account come back with the exception in
+      OrderImpact.validation_error, or with fail_fast=True the first one (in order) is raised.
+
+    usage: impacts = simulate_orders(account, orders, quote_adapter)
+           best = min([_ for _ in impacts if _.validation_error is None], key=lambda _: _.change_in_maintenance_margin)
+
+"""
+from concurrent.futures import ProcessPoolExecutor
+from copy import copy, deepcopy
+
+from ..accounts import Account, AccountOverlay
+from ..adapters.quotes.QuoteAdapter import QuoteAdapter
+from ..adapters.quotes.SnapshotQuoteAdapter import SnapshotQuoteAdapter
+from ..assets import Option
+from ..estimators import Estimator
+from ..OrderImpact import OrderImpact
+from .fill_order import fill_order
+from .maintenance_margin import get_maintenance_margin_by_underlying, total_maintenance_margin
+from .validate_account import validate_account
+
+
+def quote_snapshot(quote_adapter:QuoteAdapter, assets):
+    """
+    :return: A SnapshotQuoteAdapter of assets from one get_quotes request. If that fails the assets are
+               quoted one by one and the ones that can't be are left out
+    """
+    assets = list({_.symbol: _ for _ in assets}.values())
+    try:
+        quotes = quote_adapter.get_quotes(assets)
+    except Exception:
+        quotes = []
+        for asset in assets:
+            try:
+                quotes.append(quote_adapter.get_quote(asset))
+            except Exception:
+                pass
+    return SnapshotQuoteAdapter(quotes)
+
+
+def underlying_symbol(asset):
+    return asset.underlying.symbol if isinstance(asset, Option) else asset.symbol
+
+
+def simulate_order_impact(account:Account, order, quote_adapter:QuoteAdapter, margins, estimator:Estimator=None):
+    """
+        Fill one candidate into an overlay of account
+    :param margins: {underlying: margin requirement} of account, from get_maintenance_margin_by_underlying
+    :return: An OrderImpact, with the exception in validation_error if the order can't go through
+    """
+    account_after = AccountOverlay(account)
+    order = copy(order)
+    try:
+        fill_order(account=account_after, order=order, quote_adapter=quote_adapter, estimator=estimator, update_margin=False)
+
+        margins = dict(margins)
+        margins.update(get_maintenance_margin_by_underlying(account_after.positions, quote_adapter=quote_adapter,
+                                                            underlyings=set(underlying_symbol(_.asset) for _ in order.legs)))
+        account_after.margin_by_underlying = margins
+        account_after.maintenance_margin = total_maintenance_margin(margins)
+
+        validate_account(account_after)
+        validation_error = None
+    except Exception as e:
+        validation_error = e
+
+    return OrderImpact(account0=account, account1=account_after, order=order, validation_error=validation_error)
+
+
+def _simulate_chunk(account, orders, quote_adapter, margins, estimator, fail_fast):
+    impacts = []
+    for order in orders:
+        impacts.append(simulate_order_impact(account, order, quote_adapter, margins, estimator=estimator))
+        if fail_fast and impacts[-1].validation_error is not None:
+            break
+    return impacts
+
+
+def simulate_orders(account:Account, orders, quote_adapter:QuoteAdapter, estimator:Estimator=None, fail_fast=False,
+                    processes=None, pending_orders=None):
+    """
+    :param orders: The candidate orders, none of them are changed
+    :param fail_fast: Raise the first validation_error instead of returning it
+    :param processes: Split the candidates across a pool of this many processes, None to run them here
+    :param pending_orders: Orders to fill into (a copy of) the account before every candidate
+    :return: An OrderImpact for each order, in order
+    """
+    estimator = estimator if estimator is not None else Estimator()
+    orders = list(orders)
+
+    base = account
+    if pending_orders:
+        base = deepcopy(account)
+        for pending_order in pending_orders:
+            fill_order(account=base, order=copy(pending_order), quote_adapter=quote_adapter, estimator=estimator)
+
+    # the quotes every candidate needs, then the margin of every underlying before any of them
+    assets = [leg.asset for order in orders for leg in order.legs]
+    assets += [_.asset for _ in base.positions if _.quantity < 0 and not isinstance(_.asset, Option)]
+    snapshot = quote_snapshot(quote_adapter, assets)
+    margins = get_maintenance_margin_by_underlying(base.positions, quote_adapter=snapshot)
+
+    if processes is None or processes <= 1 or len(orders) <= 1:
+        impacts = _simulate_chunk(base, orders, snapshot, margins, estimator, fail_fast)
+    else:
+        chunk_size = max(1, -(-len(orders) // (processes * 4)))
+        chunks = [orders[i:i + chunk_size] for i in range(0, len(orders), chunk_size)]
+        impacts = []
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(_simulate_chunk, base, chunk, snapshot, margins, estimator, fail_fast) for chunk in chunks]
+            for future in futures:
+                impacts += future.result()
+                if fail_fast and any(_.validation_error is not None for _ in impacts):
+                    for _ in futures:
+                        _.cancel()
+                    break
+
+    for impact in impacts:
+        impact.account0 = account
+        if fail_fast and impact.validation_error is not None:
+            raise impact.validation_error
+
+    return impacts
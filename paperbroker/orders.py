@@ -7,8 +7,12 @@
 from math import copysign
 from .assets import Asset, asset_factory
 from .quotes import Quote
+from .slotted import Slotted
+
+class Leg(Slotted):
+
+    __slots__ = ('asset', 'quantity', 'order_type', 'price')
 
-class Leg(object):
     def __init__(self, asset: Asset, quantity: int, order_type: str, price: float = None):
 
         # automatically correct the signs of the quantity and price
@@ -6,9 +6,13 @@
 
 from .quotes import Quote
 from .assets import asset_factory, Option
+from .slotted import Slotted
+from array import array
+from bisect import bisect_left, bisect_right
+from copy import copy, deepcopy
 from math import copysign
 
-class Position(object):
+class Position(Slotted):
     """
     A Position represents an asset that you are long/short. Each Position object can
     represent one or more quantities of the asset along with a common cost basis
@@ -21,7 +25,15 @@ class Position(object):
     so not in per asset amounts but in total dollar impact to cash.
     """
 
-    def __init__(self, asset, quantity: int, cost_basis: float=0.0, quote=None, position_id=None, open_date=None):
+    __slots__ = ('id', 'open_date', 'asset', 'quantity', 'cost_basis', 'quote', 'multiplier', 'lots')
+
+    # positions pickled before lots existed are single lots
+    _slot_defaults = {'lots': None}
+
+    def __init__(self, asset, quantity: int, cost_basis: float=0.0, quote=None, position_id=None, open_date=None, lots=None):
+        """
+        :param lots: The Lots making up this position when the account keeps FIFO or LIFO lots, None otherwise
+        """
         self.id = position_id or ('position' + str(id(self)))
         self.open_date = open_date
         self.asset = asset_factory(asset)
@@ -29,6 +41,7 @@ class Position(object):
         self.cost_basis = cost_basis
         self.quote = quote
         self.multiplier = 100 if isinstance(self.asset, Option) else 1
+        self.lots = lots
 
     @property
     def total_cost_basis(self):
@@ -108,3 +121,346 @@ class Position(object):
 
     @property
     def days_to_expiration(self): return self.quote.days_to_expiration if isinstance(self.asset, Option) and self.quote is not None else None
+
+
+class Lots(Slotted):
+    """
+    The lots of a position, closed first in first out ('fifo') or last in first out ('lifo').
+
+    Lots are kept as running totals in two arrays of doubles: the absolute quantity and the cost
+      (quantity * cost basis) of every lot up to and including each one. Adding a lot appends to them,
+      and closing any quantity is a binary search for the lot it ends in:
+        fifo moves a consumed offset forward from the front (and drops consumed lots once they are half the arrays)
+        lifo truncates the arrays from the back
+    """
+
+    __slots__ = ('policy', 'quantities', 'costs', 'consumed', 'consumed_cost')
+
+    def __init__(self, policy='fifo'):
+        if policy not in ('fifo', 'lifo'):
+            raise Exception("Lots: policy must be fifo or lifo")
+        self.policy = policy
+        self.quantities = array('d')
+        self.costs = array('d')
+        self.consumed = 0.0
+        self.consumed_cost = 0.0
+
+    def __len__(self):
+        """:return: The number of lots with something left in them"""
+        return len(self.quantities) - bisect_right(self.quantities, self.consumed)
+
+    @property
+    def quantity(self):
+        """:return: The absolute quantity left"""
+        return (self.quantities[-1] - self.consumed) if len(self.quantities) > 0 else 0.0
+
+    @property
+    def cost_basis(self):
+        """:return: The average cost basis of what is left"""
+        quantity = self.quantity
+        return ((self.costs[-1] - self.consumed_cost) / quantity) if quantity > 0 else 0.0
+
+    def add(self, quantity, cost_basis):
+        """Add a lot of abs(quantity) at cost_basis"""
+        quantity = abs(quantity)
+        if quantity == 0:
+            return
+        total_quantity = self.quantities[-1] if len(self.quantities) > 0 else 0.0
+        total_cost = self.costs[-1] if len(self.costs) > 0 else 0.0
+        self.quantities.append(total_quantity + quantity)
+        self.costs.append(total_cost + quantity * cost_basis)
+
+    def _cost_to(self, quantity, i):
+        """:return: The running cost at quantity, which is in lot i"""
+        previous_quantity = self.quantities[i - 1] if i > 0 else 0.0
+        previous_cost = self.costs[i - 1] if i > 0 else 0.0
+        unit_cost = (self.costs[i] - previous_cost) / (self.quantities[i] - previous_quantity)
+        return previous_cost + (quantity - previous_quantity) * unit_cost
+
+    def close(self, quantity):
+        """
+            Take abs(quantity) out of the lots per the policy
+        :return: The cost basis * quantity of what was closed
+        """
+        quantity = min(abs(quantity), self.quantity)
+        if quantity == 0:
+            return 0.0
+
+        before = self.costs[-1] - self.consumed_cost
+
+        if self.policy == 'fifo':
+            consumed = self.consumed + quantity
+            i = bisect_left(self.quantities, consumed)
+            self.consumed = consumed
+            self.consumed_cost = self._cost_to(consumed, i) if i < len(self.quantities) else self.costs[-1]
+            if i > 32 and i * 2 > len(self.quantities):
+                self._compact(i)
+        else:
+            remaining = self.quantities[-1] - quantity
+            i = bisect_left(self.quantities, remaining)
+            if remaining <= self.consumed:
+                del self.quantities[:]
+                del self.costs[:]
+                self.consumed = self.consumed_cost = 0.0
+            else:
+                cost = self._cost_to(remaining, i)
+                del self.quantities[i + 1:]
+                del self.costs[i + 1:]
+                self.quantities[i] = remaining
+                self.costs[i] = cost
+
+        return before - ((self.costs[-1] - self.consumed_cost) if len(self.costs) > 0 else 0.0)
+
+    def _compact(self, i):
+        """Drop the first i lots, which are used up"""
+        base_quantity, base_cost = self.quantities[i - 1], self.costs[i - 1]
+        self.quantities = array('d', (_ - base_quantity for _ in self.quantities[i:]))
+        self.costs = array('d', (_ - base_cost for _ in self.costs[i:]))
+        self.consumed -= base_quantity
+        self.consumed_cost -= base_cost
+
+    def to_list(self):
+        """:return: [(quantity, cost_basis)] of the lots left, in the order they were opened"""
+        out = []
+        previous_quantity, previous_cost = self.consumed, self.consumed_cost
+        for quantity, cost in zip(self.quantities, self.costs):
+            if quantity > previous_quantity:
+                out.append((quantity - previous_quantity, (cost - previous_cost) / (quantity - previous_quantity)))
+                previous_quantity, previous_cost = quantity, cost
+        return out
+
+
+def position_keys(position):
+    """:return: (symbol, underlying symbol, expiration ordinal or None) a position is indexed under"""
+    asset = position.asset
+    if isinstance(asset, Option):
+        return asset.symbol, asset.underlying.symbol, asset.expiration_ordinal
+    return asset.symbol, asset.symbol, None
+
+
+class PositionList(list):
+    """
+    The positions of an Account. A list, plus an index of the positions by symbol (the lots of an asset),
+      by underlying (the underlying's own positions and its options) and by option expiration,
+      kept up to date as positions are added and removed.
+
+    The index doesn't depend on quantities, so positions can be closed in place. prune() drops the ones
+      that reached zero.
+
+    Each index keeps positions in the order they were added, and is a dict of {id(position): position}
+      so a position comes out of it in constant time.
+    """
+
+    def __init__(self, positions=()):
+        super(PositionList, self).__init__(positions)
+        self._reindex()
+
+    def __reduce_ex__(self, protocol):
+        # the index is keyed by id(), rebuild it rather than copy or pickle it
+        return self.__class__, (list(self),)
+
+    def _reindex(self):
+        self.by_symbol = {}
+        self.by_underlying = {}
+        self.by_expiration = {}
+        self.option_counts = {}
+        for position in self:
+            self._index(position)
+
+    def _index(self, position):
+        symbol, underlying, expiration = position_keys(position)
+        self.by_symbol.setdefault(symbol, {})[id(position)] = position
+        self.by_underlying.setdefault(underlying, {})[id(position)] = position
+        if expiration is not None:
+            self.by_expiration.setdefault(expiration, {})[id(position)] = position
+            self.option_counts[underlying] = self.option_counts.get(underlying, 0) + 1
+
+    def _unindex(self, position):
+        keys = position_keys(position)
+        if keys[2] is not None and id(position) in self.by_expiration.get(keys[2], {}):
+            self.option_counts[keys[1]] -= 1
+            if self.option_counts[keys[1]] == 0:
+                del self.option_counts[keys[1]]
+
+        for index, key in zip((self.by_symbol, self.by_underlying, self.by_expiration), keys):
+            if key is None or key not in index:
+                continue
+            index[key].pop(id(position), None)
+            if len(index[key]) == 0:
+                del index[key]
+
+    # lookups
+
+    def for_symbol(self, asset):
+        """:return: The positions (lots) of asset in the order they were opened"""
+        return list(self.by_symbol.get(asset_factory(asset).symbol, {}).values())
+
+    def in_underlying(self, underlying):
+        """:return: The positions of underlying and of the options on it"""
+        return list(self.by_underlying.get(asset_factory(underlying).symbol, {}).values())
+
+    def expiring_on(self, expiration_ordinal):
+        """:return: The option positions expiring on the date with this ordinal"""
+        return list(self.by_expiration.get(expiration_ordinal, {}).values())
+
+    def expired_before(self, ordinal):
+        """:return: The option positions expiring before the date with this ordinal"""
+        return [position for expiration in sorted(self.by_expiration) if expiration < ordinal
+                for position in self.by_expiration[expiration].values()]
+
+    def option_underlyings(self):
+        """:return: The symbols of the underlyings with option positions"""
+        return sorted(self.option_counts)
+
+    def prune(self):
+        """Remove the positions with zero quantity"""
+        closed = [_ for _ in self if _.quantity == 0]
+        if len(closed) > 0:
+            list.__setitem__(self, slice(None), [_ for _ in self if _.quantity != 0])
+            for position in closed:
+                self._unindex(position)
+        return self
+
+    # list methods that add or remove positions
+
+    def append(self, position):
+        super(PositionList, self).append(position)
+        self._index(position)
+
+    def extend(self, positions):
+        positions = list(positions)
+        super(PositionList, self).extend(positions)
+        for position in positions:
+            self._index(position)
+
+    def __iadd__(self, positions):
+        self.extend(positions)
+        return self
+
+    def insert(self, i, position):
+        super(PositionList, self).insert(i, position)
+        self._index(position)
+
+    def remove(self, position):
+        super(PositionList, self).remove(position)
+        self._unindex(position)
+
+    def pop(self, i=-1):
+        position = super(PositionList, self).pop(i)
+        self._unindex(position)
+        return position
+
+    def clear(self):
+        super(PositionList, self).clear()
+        self._reindex()
+
+    def __setitem__(self, i, value):
+        super(PositionList, self).__setitem__(i, value)
+        self._reindex()
+
+    def __delitem__(self, i):
+        super(PositionList, self).__delitem__(i)
+        self._reindex()
+
+
+class PositionOverlay(object):
+    """
+    The positions of an AccountOverlay: a base PositionList seen through the changes made on top of it.
+
+    The base is never changed. A base position is copied the first time for_symbol() returns it, which is
+      how fill_order and the lot policies find the positions they change, so only the positions an order
+      touches are copied. Positions from the other lookups, or from iterating, are read only.
+    New positions go in a PositionList of their own.
+    """
+
+    def __init__(self, base: PositionList):
+        self.base = base
+
+        # id(base position) -> its copy, or None once it is pruned, and id(base position) -> base position
+        self.changed = {}
+        self.originals = {}
+        self.added = PositionList()
+
+    def _view(self, positions):
+        """The overlay's version of base positions, leaving out pruned ones"""
+        changed = self.changed
+        if len(changed) == 0:
+            return list(positions)
+        out = []
+        for position in positions:
+            position = changed.get(id(position), position)
+            if position is not None:
+                out.append(position)
+        return out
+
+    def _touched_underlyings(self):
+        return set(position_keys(_)[1] for _ in self.originals.values()) | set(self.added.by_underlying)
+
+    # lookups
+
+    def for_symbol(self, asset):
+        """:return: The positions (lots) of asset, base positions are copied so they can be changed"""
+        out = []
+        for position in self.base.for_symbol(asset):
+            key = id(position)
+            if key not in self.changed:
+                self.changed[key] = copy_position(position)
+                self.originals[key] = position
+            if self.changed[key] is not None:
+                out.append(self.changed[key])
+        return out + self.added.for_symbol(asset)
+
+    def in_underlying(self, underlying):
+        return self._view(self.base.in_underlying(underlying)) + self.added.in_underlying(underlying)
+
+    def expiring_on(self, expiration_ordinal):
+        return self._view(self.base.expiring_on(expiration_ordinal)) + self.added.expiring_on(expiration_ordinal)
+
+    def expired_before(self, ordinal):
+        return self._view(self.base.expired_before(ordinal)) + self.added.expired_before(ordinal)
+
+    def option_underlyings(self):
+        underlyings = set(self.base.option_underlyings()) | set(self.added.option_counts)
+        if len(self.changed) > 0:
+            # an underlying whose options were all pruned doesn't have any anymore
+            for underlying in self._touched_underlyings():
+                if not any(isinstance(_.asset, Option) for _ in self.in_underlying(underlying)):
+                    underlyings.discard(underlying)
+        return sorted(underlyings)
+
+    # changes
+
+    def append(self, position):
+        self.added.append(position)
+
+    def extend(self, positions):
+        self.added.extend(positions)
+
+    def prune(self):
+        for key, position in self.changed.items():
+            if position is not None and position.quantity == 0:
+                self.changed[key] = None
+        self.added.prune()
+        return self
+
+    # read only list behavior
+
+    def __iter__(self):
+        for position in self._view(self.base):
+            yield position
+        for position in self.added:
+            yield position
+
+    def __len__(self):
+        return len(self.base) - sum(1 for _ in self.changed.values() if _ is None) + len(self.added)
+
+    def __getitem__(self, i):
+        return list(self)[i]
+
+
+def copy_position(position):
+    """:return: A copy of position that can be changed without changing it, the quote is shared"""
+    copied = copy(position)
+    if position.lots is not None:
+        copied.lots = deepcopy(position.lots)
+    return copied
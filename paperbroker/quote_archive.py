@@ -0,0 +1,310 @@
+"""
+
+    A compact binary file of historical quotes that is read through mmap.
+
+    Opening an archive only reads its header. The symbol table, date index and records are memory mapped,
+      so pages are read from disk when a lookup touches them and Quote/OptionQuote objects are only built
+      for the rows that are asked for.
+
+    Layout, little endian, every section starts on an 8 byte boundary:
+
+        header    HEADER_FORMAT: magic, version, symbol width, symbol count, date count, record count
+        symbols   symbol_dtype(), one per symbol ordered by (underlying, expiration, symbol) so each
+                    underlying is followed by its options and every chain is a contiguous range of ids
+        names     name_dtype(), (symbol, id) sorted by symbol to find an id with a binary search
+        dates     DATE_DTYPE, (date ordinal, first record) sorted by date
+        records   RECORD_DTYPE, (symbol id, bid, ask) sorted by (date, symbol id)
+
+    The records of a date are the range between its first record and the next date's. Within it,
+      the ids of a chain (or of one expiration) select a range with a binary search.
+
+    usage: convert_csv_to_archive('data.csv.gz', 'data.pbqa')
+           QuoteArchive('data.pbqa').get_options('AAL', '2017-01-27')
+
+    or from the command line: python -m paperbroker.quote_archive data.csv.gz data.pbqa
+
+"""
+import struct
+import sys
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from .assets import asset_factory, Option
+from .quotes import Quote, OptionQuote
+from .quote_store import ColumnarQuoteStore, OPTION_TYPE_CODES
+from .logic.option_symbols import date_to_ordinal, ordinal_to_date_string
+
+MAGIC = b'PBQA'
+VERSION = 1
+HEADER_FORMAT = '<4sIIIIQ'
+
+RECORD_DTYPE = np.dtype([('symbol_id', '<u4'), ('bid', '<f8'), ('ask', '<f8')])
+DATE_DTYPE = np.dtype([('date', '<i8'), ('start', '<i8')])
+
+
+def symbol_dtype(width):
+    return np.dtype([('symbol', 'S{}'.format(width)), ('underlying_id', '<u4'), ('expiration', '<i4'), ('strike', '<f8'), ('option_type', 'i1')])
+
+
+def name_dtype(width):
+    return np.dtype([('symbol', 'S{}'.format(width)), ('symbol_id', '<u4')])
+
+
+def _aligned(offset):
+    return (offset + 7) // 8 * 8
+
+
+def _section_offsets(width, symbol_count, date_count):
+    """:return: The byte offsets of the symbols, names, dates and records sections"""
+    symbols = _aligned(struct.calcsize(HEADER_FORMAT))
+    names = _aligned(symbols + symbol_count * symbol_dtype(width).itemsize)
+    dates = _aligned(names + symbol_count * name_dtype(width).itemsize)
+    records = _aligned(dates + date_count * DATE_DTYPE.itemsize)
+    return symbols, names, dates, records
+
+
+def write_quote_archive(store, filename):
+    """
+        Write the quotes in a ColumnarQuoteStore to an archive
+    :param store: A ColumnarQuoteStore
+    :param filename: The archive to create
+    """
+
+    # every symbol plus underlyings that only appear through their options
+    assets = [asset_factory(_) for _ in store.symbols]
+    names = set(_.symbol for _ in assets) | set(_.underlying.symbol for _ in assets if isinstance(_, Option))
+    assets = [asset_factory(_) for _ in names]
+
+    def sort_key(asset):
+        if isinstance(asset, Option):
+            return asset.underlying.symbol, asset.expiration_ordinal, asset.symbol
+        return asset.symbol, -1, asset.symbol
+
+    assets.sort(key=sort_key)
+    width = max([len(_.symbol) for _ in assets] + [1])
+    ids = {asset.symbol: i for i, asset in enumerate(assets)}
+
+    symbols = np.zeros(len(assets), dtype=symbol_dtype(width))
+    symbols['symbol'] = [_.symbol.encode('ascii') for _ in assets]
+    symbols['expiration'] = -1
+    symbols['strike'] = np.nan
+    for i, asset in enumerate(assets):
+        if isinstance(asset, Option):
+            symbols['underlying_id'][i] = ids[asset.underlying.symbol]
+            symbols['expiration'][i] = asset.expiration_ordinal
+            symbols['strike'][i] = asset.strike
+            symbols['option_type'][i] = OPTION_TYPE_CODES[asset.option_type]
+        else:
+            symbols['underlying_id'][i] = i
+
+    by_name = np.argsort(symbols['symbol'], kind='stable')
+    name_table = np.zeros(len(assets), dtype=name_dtype(width))
+    name_table['symbol'] = symbols['symbol'][by_name]
+    name_table['symbol_id'] = by_name
+
+    # the store's symbol ids to archive ids
+    archive_ids = np.asarray([ids[_] for _ in store.symbols], dtype=np.uint32)
+    record_ids = archive_ids[store.symbol_ids]
+    order = np.lexsort((record_ids, store.dates))
+
+    records = np.zeros(len(order), dtype=RECORD_DTYPE)
+    records['symbol_id'] = record_ids[order]
+    records['bid'] = store.bids[order]
+    records['ask'] = store.asks[order]
+
+    record_dates = store.dates[order]
+    unique_dates, starts = np.unique(record_dates, return_index=True)
+    dates = np.zeros(len(unique_dates), dtype=DATE_DTYPE)
+    dates['date'] = unique_dates
+    dates['start'] = starts
+
+    offsets = _section_offsets(width, len(symbols), len(dates))
+    with open(filename, 'wb') as f:
+        f.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, width, len(symbols), len(dates), len(records)))
+        for offset, section in zip(offsets, (symbols, name_table, dates, records)):
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(section.tobytes())
+
+
+def convert_csv_to_archive(csv_filename, archive_filename, delimiter='\t', underlyings=None):
+    """
+        Build an archive from a file of [symbol],[date],[bid],[ask] rows (the layout of tests/test_data/data.csv.gz)
+    :param underlyings: Only keep these underlyings and their options
+    """
+    write_quote_archive(ColumnarQuoteStore.from_csv(csv_filename, delimiter=delimiter, underlyings=underlyings), archive_filename)
+
+
+class QuoteArchive(object):
+    """
+        Reads an archive written by write_quote_archive. Has the same lookups as ColumnarQuoteStore
+          so it can be used anywhere a store is
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+
+        with open(filename, 'rb') as f:
+            header = f.read(struct.calcsize(HEADER_FORMAT))
+        if len(header) < struct.calcsize(HEADER_FORMAT):
+            raise Exception("QuoteArchive: {} is not a quote archive".format(filename))
+
+        magic, version, width, symbol_count, date_count, record_count = struct.unpack(HEADER_FORMAT, header)
+        if magic != MAGIC:
+            raise Exception("QuoteArchive: {} is not a quote archive".format(filename))
+        if version != VERSION:
+            raise Exception("QuoteArchive: {} is version {}, expected {}".format(filename, version, VERSION))
+
+        symbols_offset, names_offset, dates_offset, records_offset = _section_offsets(width, symbol_count, date_count)
+        self.symbols = self._map(symbol_dtype(width), symbols_offset, symbol_count)
+        self.names = self._map(name_dtype(width), names_offset, symbol_count)
+        self.dates = self._map(DATE_DTYPE, dates_offset, date_count)
+        self.records = self._map(RECORD_DTYPE, records_offset, record_count)
+
+    def _map(self, dtype, offset, count):
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self.filename, dtype=dtype, mode='r', offset=offset, shape=(count,))
+
+    def __len__(self):
+        return len(self.records)
+
+    def get_dates(self):
+        """
+        :return: Every date with quotes as a sorted list of 'YYYY-MM-DD'
+        """
+        return [ordinal_to_date_string(int(_)) for _ in self.dates['date']]
+
+    # lookups bisect the mapped columns element by element (rather than np.searchsorted, which copies
+    #   the column) so they only touch the pages they land on
+
+    def _symbol_id(self, symbol):
+        key = symbol.encode('ascii')
+        i = bisect_left(self.names['symbol'], key)
+        if i < len(self.names) and self.names['symbol'][i] == key:
+            return int(self.names['symbol_id'][i])
+        return None
+
+    def _date_range(self, quote_date):
+        """:return: (start, stop) of the records on quote_date, or None"""
+        date = date_to_ordinal(quote_date)
+        i = bisect_left(self.dates['date'], date)
+        if i == len(self.dates) or self.dates['date'][i] != date:
+            return None
+        stop = int(self.dates['start'][i + 1]) if i + 1 < len(self.dates) else len(self.records)
+        return int(self.dates['start'][i]), stop
+
+    def _record_range(self, date_range, first_id, last_id):
+        """:return: (start, stop) of the records on a date with first_id <= symbol id < last_id"""
+        start, stop = date_range
+        symbol_ids = self.records['symbol_id']
+        return bisect_left(symbol_ids, first_id, start, stop), bisect_left(symbol_ids, last_id, start, stop)
+
+    def _underlying_price(self, date_range, underlying_id):
+        start, stop = self._record_range(date_range, underlying_id, underlying_id + 1)
+        if start == stop:
+            return None
+        bid, ask = float(self.records[start]['bid']), float(self.records[start]['ask'])
+        return ((bid + ask) / 2) if bid + ask != 0.0 else None
+
+    def _build_quote(self, record, quote_date, underlying_price=None):
+        symbol = self.symbols[int(record['symbol_id'])]
+        if symbol['option_type'] == 0:
+            return Quote(quote_date=quote_date, asset=symbol['symbol'].decode('ascii'), bid=float(record['bid']), ask=float(record['ask']))
+        return OptionQuote(quote_date=quote_date, asset=symbol['symbol'].decode('ascii'), bid=float(record['bid']), ask=float(record['ask']), underlying_price=underlying_price)
+
+    def _get_quote(self, symbol, date_range, quote_date):
+        symbol_id = self._symbol_id(symbol)
+        if symbol_id is None:
+            return None
+
+        start, stop = self._record_range(date_range, symbol_id, symbol_id + 1)
+        if start == stop:
+            return None
+
+        underlying_price = None
+        if self.symbols['option_type'][symbol_id] != 0:
+            underlying_price = self._underlying_price(date_range, int(self.symbols['underlying_id'][symbol_id]))
+        return self._build_quote(self.records[start], quote_date, underlying_price=underlying_price)
+
+    def get_quote(self, asset, quote_date):
+        """
+        :return: The Quote or OptionQuote of asset on quote_date, or None if there isn't one
+        """
+        return self.get_quotes([asset], quote_date)[0]
+
+    def get_quotes(self, assets, quote_date):
+        """
+        :return: A list of the quotes of assets on quote_date in the same order, None where there isn't one
+        """
+        date_range = self._date_range(quote_date)
+        if date_range is None:
+            return [None for _ in assets]
+
+        quote_date = ordinal_to_date_string(date_to_ordinal(quote_date))
+        return [self._get_quote(asset_factory(asset).symbol, date_range, quote_date) for asset in assets]
+
+    def _chain_ids(self, underlying_id, expiration_date=None):
+        """:return: (first id, last id + 1) of the options on underlying_id"""
+        underlying_ids = self.symbols['underlying_id']
+        first, last = bisect_left(underlying_ids, underlying_id), bisect_right(underlying_ids, underlying_id)
+
+        # the underlying itself sorts first
+        if first < last and self.symbols['option_type'][first] == 0:
+            first += 1
+
+        if expiration_date is not None:
+            expiration = date_to_ordinal(expiration_date)
+            expirations = self.symbols['expiration']
+            first, last = bisect_left(expirations, expiration, first, last), bisect_right(expirations, expiration, first, last)
+
+        return first, last
+
+    def _underlying_ids(self, underlying_asset):
+        if underlying_asset is not None:
+            underlying_id = self._symbol_id(asset_factory(underlying_asset).symbol)
+            return [] if underlying_id is None else [underlying_id]
+        return np.flatnonzero(self.symbols['option_type'] == 0).tolist()
+
+    def get_options(self, underlying_asset, quote_date, expiration_date=None):
+        """
+        :param underlying_asset: Only options on this underlying, or None for all of them
+        :param quote_date: The date of the chain
+        :param expiration_date: Only options expiring on this date, or None for every expiration
+        :return: A list of OptionQuotes ordered by expiration and symbol
+        """
+        date_range = self._date_range(quote_date)
+        if date_range is None:
+            return []
+
+        quote_date = ordinal_to_date_string(date_to_ordinal(quote_date))
+        out = []
+        for underlying_id in self._underlying_ids(underlying_asset):
+            start, stop = self._record_range(date_range, *self._chain_ids(underlying_id, expiration_date))
+            if start == stop:
+                continue
+            underlying_price = self._underlying_price(date_range, underlying_id)
+            out.extend(self._build_quote(record, quote_date, underlying_price=underlying_price) for record in self.records[start:stop])
+        return out
+
+    def get_expiration_dates(self, underlying_asset, quote_date):
+        """
+        :return: A sorted list of the expiration dates ('YYYY-MM-DD') with options on quote_date
+        """
+        date_range = self._date_range(quote_date)
+        if date_range is None:
+            return []
+
+        expirations = set()
+        for underlying_id in self._underlying_ids(underlying_asset):
+            start, stop = self._record_range(date_range, *self._chain_ids(underlying_id))
+            symbol_ids = self.records['symbol_id'][start:stop]
+            expirations.update(np.unique(self.symbols['expiration'][symbol_ids]).tolist())
+        return [ordinal_to_date_string(_) for _ in sorted(expirations)]
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print('usage: python -m paperbroker.quote_archive [quotes.csv(.gz)] [archive]')
+        sys.exit(1)
+    convert_csv_to_archive(sys.argv[1], sys.argv[2])
@@ -0,0 +1,276 @@
+"""
+
+    Historical quotes held as numpy columns instead of one object per quote.
+
+    ColumnarQuoteStore keeps one row per (symbol, date) with these columns:
+        symbol_ids, dates (date ordinals), bids, asks, strikes, expirations (date ordinals),
+        option_types (0 not an option, 1 call, 2 put) and underlying_ids
+
+    Rows are sorted by (date, underlying, expiration, symbol) so every option chain, and every expiration
+      within it, is a contiguous slice. The slice bounds are indexed by (date, underlying) and
+      (date, underlying, expiration) so a chain lookup only touches the rows in that chain.
+    Single quotes are found with a binary search over a (symbol, date) key.
+
+    Quote and OptionQuote objects are only built for the rows that are asked for. OptionQuotes get the
+      underlying's price on the same date so their greeks can be solved when they are read.
+
+    usage: store = ColumnarQuoteStore.from_csv('data.csv.gz')
+           store.get_options('AAL', '2017-01-27', expiration_date='2017-02-03')
+
+"""
+import csv
+import gzip
+
+import numpy as np
+
+from .assets import asset_factory, Option
+from .quotes import Quote, OptionQuote
+from .logic.option_symbols import date_to_ordinal, ordinal_to_date_string
+
+OPTION_TYPE_CODES = {'call': 1, 'put': 2}
+
+# ordinals fit well inside this, so symbol_id * DATE_KEY_SPAN + date is unique
+DATE_KEY_SPAN = 2 ** 22
+
+
+def filter_underlyings(rows, underlyings):
+    """
+        Generate the [symbol, ...] rows for underlyings and their options
+    """
+    wanted = set(asset_factory(_).symbol for _ in underlyings)
+    keep = {}
+    for row in rows:
+        if row[0] not in keep:
+            asset = asset_factory(row[0])
+            keep[row[0]] = (asset.underlying.symbol if isinstance(asset, Option) else asset.symbol) in wanted
+        if keep[row[0]]:
+            yield row
+
+
+class ColumnarQuoteStore(object):
+
+    def __init__(self, symbols, dates, bids, asks):
+        """
+        :param symbols: The symbol of each row
+        :param dates: The date of each row, anything date_to_ordinal() accepts
+        :param bids: The bid of each row
+        :param asks: The ask of each row
+        """
+        symbols = [str(_).upper() for _ in symbols]
+        self.symbols = sorted(set(symbols))
+        self.symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        symbol_ids = np.asarray([self.symbol_index[_] for _ in symbols], dtype=np.int32)
+
+        # decode each symbol once, not once per row
+        assets = [asset_factory(_) for _ in self.symbols]
+        symbol_underlyings = np.empty(len(assets), dtype=np.int32)
+        symbol_strikes = np.full(len(assets), np.nan)
+        symbol_expirations = np.full(len(assets), -1, dtype=np.int32)
+        symbol_option_types = np.zeros(len(assets), dtype=np.int8)
+        for i, asset in enumerate(assets):
+            if isinstance(asset, Option):
+                symbol_underlyings[i] = self._symbol_id(asset.underlying.symbol)
+                symbol_strikes[i] = asset.strike
+                symbol_expirations[i] = asset.expiration_ordinal
+                symbol_option_types[i] = OPTION_TYPE_CODES[asset.option_type]
+            else:
+                symbol_underlyings[i] = i
+
+        date_cache = {}
+        dates = np.asarray([date_cache[_] if _ in date_cache else date_cache.setdefault(_, date_to_ordinal(_)) for _ in dates], dtype=np.int32)
+        bids = np.asarray([float(_) if _ is not None else 0.0 for _ in bids], dtype=float)
+        asks = np.asarray([float(_) if _ is not None else 0.0 for _ in asks], dtype=float)
+
+        order = np.lexsort((symbol_ids, symbol_expirations[symbol_ids], symbol_underlyings[symbol_ids], dates))
+        self.symbol_ids = symbol_ids[order]
+        self.dates = dates[order]
+        self.bids = bids[order]
+        self.asks = asks[order]
+        self.underlying_ids = symbol_underlyings[self.symbol_ids]
+        self.strikes = symbol_strikes[self.symbol_ids]
+        self.expirations = symbol_expirations[self.symbol_ids]
+        self.option_types = symbol_option_types[self.symbol_ids]
+
+        self._build_indexes()
+
+    def _symbol_id(self, symbol):
+        """Underlyings that never have a quote of their own still need an id"""
+        if symbol not in self.symbol_index:
+            self.symbol_index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return self.symbol_index[symbol]
+
+    def _build_indexes(self):
+
+        # (date, underlying) -> (start, stop) of its option rows, (date, underlying, expiration) -> (start, stop)
+        self.chain_index = {}
+        self.expiration_index = {}
+
+        # (date, underlying) -> expiration ordinals, date -> underlying ids with options
+        self.chain_expirations = {}
+        self.chain_underlyings = {}
+
+        if len(self.dates) > 0:
+            boundaries = np.flatnonzero((np.diff(self.dates) != 0) | (np.diff(self.underlying_ids) != 0) | (np.diff(self.expirations) != 0)) + 1
+            starts = np.concatenate(([0], boundaries)).tolist()
+            stops = np.concatenate((boundaries, [len(self.dates)])).tolist()
+            for start, stop in zip(starts, stops):
+                expiration = int(self.expirations[start])
+                if expiration < 0:
+                    continue
+                date, underlying_id = int(self.dates[start]), int(self.underlying_ids[start])
+                self.expiration_index[(date, underlying_id, expiration)] = (start, stop)
+                if (date, underlying_id) not in self.chain_index:
+                    self.chain_index[(date, underlying_id)] = (start, stop)
+                    self.chain_expirations[(date, underlying_id)] = []
+                    self.chain_underlyings.setdefault(date, []).append(underlying_id)
+                self.chain_index[(date, underlying_id)] = (self.chain_index[(date, underlying_id)][0], stop)
+                self.chain_expirations[(date, underlying_id)].append(expiration)
+
+        # sorted (symbol, date) keys for single quote lookups
+        keys = self.symbol_ids.astype(np.int64) * DATE_KEY_SPAN + self.dates
+        self._key_order = np.argsort(keys, kind='stable')
+        self._keys = keys[self._key_order]
+
+        self.date_strings = {int(_): ordinal_to_date_string(int(_)) for _ in np.unique(self.dates)}
+
+    @classmethod
+    def from_rows(cls, rows, underlyings=None):
+        """
+        :param rows: An iterable of (symbol, date, bid, ask)
+        :param underlyings: Only keep rows for these underlyings and their options
+        """
+        columns = ([], [], [], [])
+        for row in (rows if underlyings is None else filter_underlyings(rows, underlyings)):
+            for column, value in zip(columns, row):
+                column.append(value)
+        return cls(*columns)
+
+    @classmethod
+    def from_csv(cls, filename, delimiter='\t', underlyings=None):
+        """
+            Load a file of [symbol],[date],[bid],[ask] rows, gzipped if the name ends in .gz
+        """
+        opener = gzip.open if filename.endswith('.gz') else open
+        with opener(filename, 'rt') as f:
+            return cls.from_rows(csv.reader(f, delimiter=delimiter), underlyings=underlyings)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def get_dates(self):
+        """
+        :return: Every date with quotes as a sorted list of 'YYYY-MM-DD'
+        """
+        return [self.date_strings[_] for _ in sorted(self.date_strings)]
+
+    def _find_row(self, symbol_id, date):
+        key = symbol_id * DATE_KEY_SPAN + date
+        i = int(np.searchsorted(self._keys, key))
+        if i < len(self._keys) and self._keys[i] == key:
+            return int(self._key_order[i])
+        return None
+
+    def _price(self, row):
+        bid, ask = float(self.bids[row]), float(self.asks[row])
+        return ((bid + ask) / 2) if bid + ask != 0.0 else None
+
+    def _build_quote(self, row, underlying_price=None):
+        quote_date = self.date_strings[int(self.dates[row])]
+        symbol = self.symbols[int(self.symbol_ids[row])]
+        if self.option_types[row] == 0:
+            return Quote(quote_date=quote_date, asset=symbol, bid=float(self.bids[row]), ask=float(self.asks[row]))
+        return OptionQuote(quote_date=quote_date, asset=symbol, bid=float(self.bids[row]), ask=float(self.asks[row]), underlying_price=underlying_price)
+
+    def _underlying_price(self, underlying_id, date):
+        row = self._find_row(underlying_id, date)
+        return self._price(row) if row is not None else None
+
+    def get_quote(self, asset, quote_date):
+        """
+        :return: The Quote or OptionQuote of asset on quote_date, or None if there isn't one
+        """
+        asset = asset_factory(asset)
+        symbol_id = self.symbol_index.get(asset.symbol)
+        if symbol_id is None:
+            return None
+
+        date = date_to_ordinal(quote_date)
+        row = self._find_row(symbol_id, date)
+        if row is None:
+            return None
+
+        underlying_price = None
+        if self.option_types[row] != 0:
+            underlying_price = self._underlying_price(int(self.underlying_ids[row]), date)
+        return self._build_quote(row, underlying_price=underlying_price)
+
+    def get_quotes(self, assets, quote_date):
+        """
+        :return: A list of the quotes of assets on quote_date in the same order, None where there isn't one
+        """
+        assets = [asset_factory(_) for _ in assets]
+        date = date_to_ordinal(quote_date)
+        symbol_ids = [self.symbol_index.get(_.symbol) for _ in assets]
+
+        # one binary search for every asset
+        known = [i for i, symbol_id in enumerate(symbol_ids) if symbol_id is not None]
+        keys = np.asarray([symbol_ids[i] for i in known], dtype=np.int64) * DATE_KEY_SPAN + date
+        positions = np.minimum(np.searchsorted(self._keys, keys), max(len(self._keys) - 1, 0))
+
+        out = [None] * len(assets)
+        underlying_prices = {}
+        for i, position, key in zip(known, positions.tolist(), keys.tolist()):
+            if len(self._keys) == 0 or self._keys[position] != key:
+                continue
+            row = int(self._key_order[position])
+            underlying_price = None
+            if self.option_types[row] != 0:
+                underlying_id = int(self.underlying_ids[row])
+                if underlying_id not in underlying_prices:
+                    underlying_prices[underlying_id] = self._underlying_price(underlying_id, date)
+                underlying_price = underlying_prices[underlying_id]
+            out[i] = self._build_quote(row, underlying_price=underlying_price)
+        return out
+
+    def _chain_slices(self, underlying_asset, date, expiration_date):
+        """The (start, stop) slices of every chain row that matches"""
+        if underlying_asset is not None:
+            underlying_id = self.symbol_index.get(asset_factory(underlying_asset).symbol)
+            if underlying_id is None:
+                return []
+            underlying_ids = [underlying_id]
+        else:
+            underlying_ids = self.chain_underlyings.get(date, [])
+
+        if expiration_date is not None:
+            expiration = date_to_ordinal(expiration_date)
+            slices = [self.expiration_index.get((date, _, expiration)) for _ in underlying_ids]
+        else:
+            slices = [self.chain_index.get((date, _)) for _ in underlying_ids]
+
+        return [(underlying_id, _) for underlying_id, _ in zip(underlying_ids, slices) if _ is not None]
+
+    def get_options(self, underlying_asset, quote_date, expiration_date=None):
+        """
+        :param underlying_asset: Only options on this underlying, or None for all of them
+        :param quote_date: The date of the chain
+        :param expiration_date: Only options expiring on this date, or None for every expiration
+        :return: A list of OptionQuotes ordered by expiration and symbol
+        """
+        date = date_to_ordinal(quote_date)
+        out = []
+        for underlying_id, (start, stop) in self._chain_slices(underlying_asset, date, expiration_date):
+            underlying_price = self._underlying_price(underlying_id, date)
+            out.extend(self._build_quote(row, underlying_price=underlying_price) for row in range(start, stop))
+        return out
+
+    def get_expiration_dates(self, underlying_asset, quote_date):
+        """
+        :return: A sorted list of the expiration dates ('YYYY-MM-DD') with options on quote_date
+        """
+        date = date_to_ordinal(quote_date)
+        expirations = set()
+        for underlying_id, _ in self._chain_slices(underlying_asset, date, None):
+            expirations.update(self.chain_expirations[(date, underlying_id)])
+        return [ordinal_to_date_string(_) for _ in sorted(expirations)]
@@ -6,7 +6,8 @@
 import arrow
 import math
 from .assets import asset_factory, Option
-from .logic.ivolat3_option_greeks import get_option_greeks
+from .logic.ivolat3_option_greeks import get_cached_option_greeks
+from .slotted import Slotted
 
 
 def quote_factory(quote_date, asset, price=None, bid=0.0, ask=0.0, bid_size=0, ask_size=0, underlying_price=None):
@@ -17,7 +18,9 @@ def quote_factory(quote_date, asset, price=None, bid=0.0, ask=0.0, bid_size=0, a
         return Quote(quote_date, asset, price=price, bid=bid, ask=ask, bid_size=bid_size, ask_size=ask_size)
 
 
-class Quote(object):
+class Quote(Slotted):
+
+    __slots__ = ('asset', 'quote_date', 'bid', 'ask', 'bid_size', 'ask_size', 'price', 'delta')
 
     def __init__(self, quote_date, asset, price=None, bid=0.0, ask=0.0, bid_size=0, ask_size=0):
         self.asset = asset_factory(asset)
@@ -41,6 +44,21 @@ class Quote(object):
 
 
 class OptionQuote(Quote):
+    """
+        Greeks (iv, delta, gamma, vega, theta, rho) are only solved the first time one of them is read,
+        and only if the quote is priceable and has an underlying_price. They are kept on the quote after that.
+        Greeks passed to the constructor are set right away and are never solved.
+        Set OptionQuote.greek_orders to choose which orders of greeks get solved, gamma is second order.
+    """
+
+    __slots__ = ('quote_type', 'days_to_expiration', 'underlying_price', 'iv', 'gamma', 'vega', 'theta', 'rho')
+
+    # the greeks OptionQuote exposes, delta is a slot on Quote
+    greek_names = ('iv', 'delta', 'gamma', 'vega', 'theta', 'rho')
+
+    # the orders of greeks to solve, see logic.ivolat3_option_greeks.GREEK_ORDERS
+    greek_orders = (1, 2)
+
     def __init__(self, quote_date, asset, price=None, bid=0.0, ask=0.0, bid_size=0, ask_size=0, delta=None, iv=None, gamma=None, vega=None, theta=None, rho=None, underlying_price=None):
         super(OptionQuote, self).__init__(quote_date=quote_date, asset=asset, price=price, bid=bid, ask=ask, bid_size=bid_size, ask_size=ask_size)
         if not isinstance(self.asset, Option):
@@ -49,24 +67,40 @@ class OptionQuote(Quote):
         self.days_to_expiration = self.asset.get_days_to_expiration(quote_date)
         self.underlying_price = underlying_price
 
-        self.delta = None
-
+        # the greeks that weren't given stay unset until they are read, see __getattr__
+        del self.delta
+        for name, value in (('delta', delta), ('iv', iv), ('gamma', gamma), ('vega', vega), ('theta', theta), ('rho', rho)):
+            if value is not None:
+                object.__setattr__(self, name, value)
+
+    def __setstate__(self, state):
+        # quotes pickled while the given greeks were kept in a _greek_defaults dict
+        if isinstance(state, dict) and '_greek_defaults' in state:
+            state = dict(state)
+            for name, value in (state.pop('_greek_defaults') or {}).items():
+                if value is not None:
+                    state.setdefault(name, value)
+        super(OptionQuote, self).__setstate__(state)
+
+    def __getattr__(self, name):
+        """Only called for attributes that aren't set, which is how an unsolved greek gets solved"""
+        if name not in OptionQuote.greek_names:
+            raise AttributeError("'OptionQuote' object has no attribute '{}'".format(name))
+        self._solve_greeks()
+        return object.__getattribute__(self, name)
+
+    def _solve_greeks(self):
+        greeks = {}
         if self.is_priceable() and self.underlying_price is not None:
-            greeks = get_option_greeks(self.asset.option_type, self.asset.strike, self.underlying_price, self.days_to_expiration, self.price, dividend=0.0)
-
-            self.delta = (greeks['delta'] * 100) if greeks['delta'] is not None and not math.isnan(greeks['delta']) else delta
-            self.iv = (greeks['iv'] * 100) if greeks['iv'] is not None and not math.isnan(greeks['iv']) else iv
-            self.gamma = (greeks['gamma'] * 100) if greeks['gamma'] is not None and not math.isnan(greeks['gamma']) else gamma
-            self.vega = (greeks['vega'] * 100) if greeks['vega'] is not None and not math.isnan(greeks['vega']) else vega
-            self.theta = (greeks['theta'] * 100) if greeks['theta'] is not None and not math.isnan(greeks['theta']) else theta
-            self.rho = (greeks['rho'] * 100) if greeks['rho'] is not None and not math.isnan(greeks['rho']) else rho
-        else:
-            self.delta = delta
-            self.iv = iv
-            self.gamma = gamma
-            self.vega = vega
-            self.theta = theta
-            self.rho = rho
+            greeks = get_cached_option_greeks(self.asset.option_type, self.asset.strike, self.underlying_price, self.days_to_expiration, self.price, dividend=0.0, orders=self.greek_orders)
+
+        for name in OptionQuote.greek_names:
+            try:
+                # anything given or set directly (by an adapter) wins
+                object.__getattribute__(self, name)
+            except AttributeError:
+                value = greeks.get(name)
+                object.__setattr__(self, name, (value * 100) if value is not None and not math.isnan(value) else None)
 
     def has_greeks(self):
         return self.iv is not None
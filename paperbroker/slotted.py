@@ -0,0 +1,57 @@
+"""
+
+    Base class for the small objects we create by the hundreds of thousands (quotes, positions, legs).
+
+    Subclasses declare __slots__ so instances don't carry a __dict__. Pickled state stays a plain
+      {attribute: value} dict, which is what these objects pickled as before they had __slots__,
+      so accounts stored by LocalFileSystemAccountAdapter load either way.
+
+    Slots that were never set are left out of the pickle and stay unset when it is loaded.
+    Slots added after an object was pickled get their value from the class' _slot_defaults.
+
+"""
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def slot_names(cls):
+    """
+    :return: Every slot declared by cls and its bases
+    """
+    names = []
+    for klass in reversed(cls.__mro__):
+        for name in klass.__dict__.get('__slots__', ()):
+            if name not in names:
+                names.append(name)
+    return tuple(names)
+
+
+class Slotted(object):
+
+    __slots__ = ()
+
+    # {slot name: value} for slots that may be missing from older pickles
+    _slot_defaults = {}
+
+    def __getstate__(self):
+        state = {}
+        for name in slot_names(self.__class__):
+            # object.__getattribute__ so unset slots don't trigger a subclass' __getattr__
+            try:
+                state[name] = object.__getattribute__(self, name)
+            except AttributeError:
+                pass
+        return state
+
+    def __setstate__(self, state):
+
+        # (dict state, slot state) is how the default protocol pickles objects with both
+        if isinstance(state, tuple):
+            state = dict(state[0] or {}, **(state[1] or {}))
+
+        for name, value in self._slot_defaults.items():
+            if name not in state:
+                object.__setattr__(self, name, value)
+
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
@@ -1,11 +1,6 @@
-import arrow
-from ..assets import asset_factory, Option
-from ..quotes import Quote, OptionQuote
-from ..adapters.quotes.QuoteAdapter import QuoteAdapter
-import gzip
 import os
-import csv
-from ..logic.ivolat3_option_greeks import get_option_greeks
+from ..quote_store import ColumnarQuoteStore
+from ..adapters.quotes.HistoricalQuoteAdapter import HistoricalQuoteAdapter
 
 """
     An adapter that uses the included test dataset at /tests/test_data/data.csv.gz
@@ -47,79 +42,25 @@ from ..logic.ivolat3_option_greeks import get_option_greeks
 
     Set the date you would like quotes for by setting the self.current_date property
 
-"""
-
-if 'testdata_keyvalue_cache' not in globals():
-    testdata_keyvalue_cache = None
-
-
+    Quotes are held in a ColumnarQuoteStore (see HistoricalQuoteAdapter) that is loaded by the first
+      adapter created and shared after that. Greeks are solved when they are read unless
+      vectorized_greeks is set, then every chain is solved at once with logic.vectorized_option_greeks.
 
-class TestDataQuoteAdapter(QuoteAdapter):
+"""
 
-    def __init__(self, current_date='2017-03-24'):
-        self.current_date = arrow.get(current_date).format('YYYY-MM-DD')
+if 'testdata_quote_store' not in globals():
+    testdata_quote_store = None
 
 
-    def load_testdata_cache(self):
-        global testdata_keyvalue_cache
-        testdata_keyvalue_cache = {}
+def load_testdata_store():
+    global testdata_quote_store
+    if testdata_quote_store is None:
         filename = os.path.join(os.path.dirname(__file__), 'test_data/data.csv.gz')
-        with gzip.open(filename, 'rt') as f:
-            reader = csv.reader(f, delimiter='\t')
-            for row in reader:
-                if 'AAL' in row[0]:
-                    asset = asset_factory(row[0])
-                    if isinstance(asset, Option):
-                        oq = OptionQuote(quote_date = row[1], asset = row[0], bid=row[2], ask=row[3])
-                        if oq.price:
-                            underlying = oq.asset.underlying
-                            greeks = get_option_greeks(option_type=oq.asset.option_type,
-                                                       underlying_price=testdata_keyvalue_cache.get(underlying.symbol + arrow.get(oq.quote_date).format('YYYY-MM-DD')).price,
-                                                       days_to_expiration=oq.days_to_expiration,
-                                                       strike=oq.asset.strike,
-                                                       price=oq.price,
-                                                       dividend=0.0)
-                            greeks = greeks if greeks is not None else {}
-                            oq.iv = greeks.get('iv', None)
-                            oq.delta = greeks.get('delta', None)
-                            oq.gamma = greeks.get('gamma', None)
-                            oq.vega = greeks.get('vega', None)
-                            oq.theta = greeks.get('theta', None)
-                            oq.rho = greeks.get('rho', None)
-
-                        testdata_keyvalue_cache[row[0] + row[1]] = oq
-
-                    else:
-                        testdata_keyvalue_cache[row[0] + row[1]] = Quote(quote_date=row[1], asset=row[0], bid=row[2], ask=row[3])
-
-    def get_quote(self, asset):
-        global testdata_keyvalue_cache
-
-        asset = asset_factory(asset)
-
-        if testdata_keyvalue_cache is None:
-            self.load_testdata_cache()
-
-        if testdata_keyvalue_cache.get(asset.symbol + arrow.get(self.current_date).format('YYYY-MM-DD'), None) is not None:
-            return testdata_keyvalue_cache.get(asset.symbol + arrow.get(self.current_date).format('YYYY-MM-DD'))
-
-        return None
-
-    def get_options(self, underlying_asset=None, expiration_date=None):
-        global testdata_keyvalue_cache
-
-        if testdata_keyvalue_cache is None:
-            self.load_testdata_cache()
-
-        return [quote for quote in testdata_keyvalue_cache.values()
-                if isinstance(quote, OptionQuote)
-                and quote.quote_date == self.current_date
-                and quote.asset.underlying == (underlying_asset if underlying_asset is not None else quote.asset.underlying)
-                and quote.asset.expiration_date == (expiration_date if expiration_date is not None else quote.asset.expiration_date)
-        ]
-
+        testdata_quote_store = ColumnarQuoteStore.from_csv(filename, underlyings=['AAL'])
+    return testdata_quote_store
 
-    def get_expiration_dates(self, underlying_asset=None):
-        return sorted(list(set([quote.asset.expiration_date for quote in self.get_options(underlying_asset)])))
 
+class TestDataQuoteAdapter(HistoricalQuoteAdapter):
 
+    def __init__(self, current_date='2017-03-24', vectorized_greeks=False):
+        super(TestDataQuoteAdapter, self).__init__(store=load_testdata_store(), current_date=current_date, vectorized_greeks=vectorized_greeks)
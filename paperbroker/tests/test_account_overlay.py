@@ -0,0 +1,84 @@
+import pickle
+import unittest
+from copy import deepcopy
+
+from .TestDataQuoteAdapter import TestDataQuoteAdapter
+from ..accounts import Account, AccountOverlay
+from ..adapters.markets.PaperMarketAdapter import PaperMarketAdapter
+from ..logic.fill_order import fill_order
+from ..orders import Order
+from ..positions import Position
+
+
+def state(account):
+    return round(account.cash, 6), account.maintenance_margin, sorted((_.asset.symbol, _.quantity, round(_.cost_basis, 6)) for _ in account.positions)
+
+
+class TestAccountOverlay(unittest.TestCase):
+
+    def setUp(self):
+        self.quote_adapter = TestDataQuoteAdapter(current_date='2017-01-27')
+
+    def order(self, *legs):
+        order = Order()
+        for asset, quantity, order_type in legs:
+            order.add_leg(asset=asset, quantity=quantity, order_type=order_type)
+        return order
+
+    def account(self, lot_policy='separate'):
+        account = Account(lot_policy=lot_policy)
+        for legs in ([('AAL', 200, 'bto')], [('AAL', 100, 'bto')], [('AAL170203P00046500', -2, 'sto')],
+                     [('AAL170203C00047000', -1, 'sto')], [('AAL170203P00046000', 1, 'bto')]):
+            fill_order(account=account, order=self.order(*legs), quote_adapter=self.quote_adapter)
+        return account
+
+    def test_matches_filling_a_deep_copy(self):
+        orders = [
+            [('AAL', -250, 'stc')],
+            [('AAL170203P00046500', 2, 'btc'), ('AAL170203P00046000', -1, 'stc')],
+            [('AAL170203C00047000', 1, 'btc'), ('AAL170203C00048000', -1, 'sto')],
+            [('AAL170203P00045500', 3, 'bto')],
+        ]
+        for lot_policy in ('separate', 'fifo'):
+            for legs in orders:
+                account = self.account(lot_policy)
+                before = state(account)
+
+                expected = fill_order(account=deepcopy(account), order=self.order(*legs), quote_adapter=self.quote_adapter)
+                overlay = fill_order(account=AccountOverlay(account), order=self.order(*legs), quote_adapter=self.quote_adapter)
+
+                self.assertEqual(state(overlay), state(expected))
+                self.assertEqual(state(account), before)
+                self.assertEqual(sorted(overlay.positions.option_underlyings()), sorted(expected.positions.option_underlyings()))
+
+    def test_only_touched_positions_are_copied(self):
+        account = Account(positions=[Position('AAL170203P00046500', 1, 0.5) for _ in range(2500)] +
+                                    [Position('AAL', 1, 47.0) for _ in range(2500)])
+        overlay = AccountOverlay(account)
+        fill_order(account=overlay, order=self.order(('AAL170203C00047000', 1, 'bto')), quote_adapter=self.quote_adapter)
+
+        self.assertEqual(len(overlay.positions.changed), 0)
+        self.assertEqual(len(overlay.positions), 5001)
+        self.assertEqual(len(account.positions), 5000)
+
+    def test_simulate_order_leaves_the_account_alone(self):
+        account = self.account()
+        before = state(account)
+        market_adapter = PaperMarketAdapter(self.quote_adapter)
+
+        impact = market_adapter.simulate_order(account, self.order(('AAL', -300, 'stc')))
+        self.assertEqual(state(account), before)
+        self.assertEqual([_.asset.symbol for _ in impact.account1.positions if _.asset.symbol == 'AAL'], [])
+        self.assertAlmostEqual(impact.change_in_cash, 300 * 47.36, places=2)
+
+        # pickled and copied overlays are plain accounts
+        for copied in (pickle.loads(pickle.dumps(impact.account1)), deepcopy(impact.account1)):
+            self.assertIs(type(copied), Account)
+            self.assertEqual(state(copied), state(impact.account1))
+
+        with self.assertRaises(Exception):
+            impact.account1.positions = []
+
+
+if __name__ == '__main__':
+    unittest.main()
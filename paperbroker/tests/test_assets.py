@@ -0,0 +1,44 @@
+import unittest
+import pickle
+from copy import deepcopy
+
+from ..assets import asset_factory, Asset, Option, Put, Call
+
+
+class TestAssets(unittest.TestCase):
+
+    def test_asset_factory_interns_symbols(self):
+        self.assertIs(asset_factory('AAL'), asset_factory('aal'))
+        self.assertIs(asset_factory('AAL170203P00046500'), asset_factory('aal170203p00046500'))
+        self.assertIs(asset_factory('AAL170203P00046500').underlying, asset_factory('AAL'))
+
+    def test_asset_factory_types(self):
+        self.assertIsInstance(asset_factory('AAL170203P00046500'), Put)
+        self.assertIsInstance(asset_factory('AAL170203C00046500'), Call)
+        self.assertEqual(type(asset_factory('AAL')), Asset)
+
+    def test_hash_matches_eq(self):
+        option = Put(underlying='AAL', strike=46.5, expiration_date='2017-02-03')
+        self.assertEqual(option, asset_factory('AAL170203P00046500'))
+        self.assertEqual(hash(option), hash(asset_factory('AAL170203P00046500')))
+        self.assertEqual(len({option, asset_factory('AAL170203P00046500'), asset_factory('AAL')}), 2)
+
+        quantities = {asset_factory('AAL'): 100}
+        self.assertEqual(quantities[Asset('aal')], 100)
+
+    def test_assets_are_immutable(self):
+        asset = asset_factory('AAL170203P00046500')
+        with self.assertRaises(AttributeError):
+            asset.strike = 50.0
+        with self.assertRaises(AttributeError):
+            asset_factory('AAL').symbol = 'GOOG'
+
+    def test_copies_share_the_interned_instance(self):
+        asset = asset_factory('AAL170203P00046500')
+        self.assertIs(deepcopy(asset), asset)
+        self.assertIs(pickle.loads(pickle.dumps(asset)), asset)
+        self.assertIsInstance(pickle.loads(pickle.dumps(Option('AAL170203P00046500'))), Put)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+import asyncio
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from .TestDataQuoteAdapter import TestDataQuoteAdapter
+from .test_google_option_chain import OptionChainServer, google_finance
+from ..AsyncPaperBroker import AsyncPaperBroker
+from ..PaperBroker import PaperBroker
+from ..adapters.accounts import LocalFileSystemAccountAdapter
+from ..adapters.quotes import ThreadedAsyncQuoteAdapter, AsyncGoogleFinanceQuoteAdapter, SnapshotQuoteAdapter
+from ..orders import Order
+
+
+class SlowQuoteAdapter(TestDataQuoteAdapter):
+    """Every get_quotes call takes delay seconds, so concurrent calls overlap"""
+
+    def __init__(self, delay=0.05):
+        super(SlowQuoteAdapter, self).__init__(current_date='2017-01-27')
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.most_in_flight = 0
+        self.lock = threading.Lock()
+
+    def get_quotes(self, assets):
+        with self.lock:
+            self.calls.append([_ if isinstance(_, str) else _.symbol for _ in assets])
+            self.in_flight += 1
+            self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+        return super(SlowQuoteAdapter, self).get_quotes(assets)
+
+    def get_quote(self, asset):
+        return self.get_quotes([asset])[0]
+
+
+class TestThreadedAsyncQuoteAdapter(unittest.TestCase):
+
+    def test_calls_run_concurrently(self):
+        quote_adapter = ThreadedAsyncQuoteAdapter(SlowQuoteAdapter(), max_workers=4)
+
+        async def run():
+            return await asyncio.gather(*[quote_adapter.get_quote('AAL') for _ in range(4)])
+
+        quotes = asyncio.run(run())
+        self.assertEqual([_.price for _ in quotes], [47.36] * 4)
+        self.assertEqual(quote_adapter.quote_adapter.most_in_flight, 4)
+
+    def test_bulk_is_one_call(self):
+        quote_adapter = ThreadedAsyncQuoteAdapter(SlowQuoteAdapter())
+        quotes = asyncio.run(quote_adapter.get_quotes(['AAL', 'AAL170203P00046500']))
+        self.assertEqual(len(quote_adapter.quote_adapter.calls), 1)
+        self.assertAlmostEqual(quotes[1].price, 0.51, places=2)
+
+    def test_chains(self):
+        quote_adapter = ThreadedAsyncQuoteAdapter(TestDataQuoteAdapter(current_date='2017-01-27'))
+        self.assertIn('2017-02-03', asyncio.run(quote_adapter.get_expiration_dates('AAL')))
+        options = asyncio.run(quote_adapter.get_options('AAL', '2017-02-03'))
+        self.assertIn('AAL170203P00046500', [_.asset.symbol for _ in options])
+
+
+class TestSnapshotQuoteAdapter(unittest.TestCase):
+
+    def test_snapshot(self):
+        quotes = TestDataQuoteAdapter(current_date='2017-01-27').get_quotes(['AAL', 'AAL170203P00046500'])
+        quote_adapter = SnapshotQuoteAdapter(quotes)
+        self.assertAlmostEqual(quote_adapter.get_quote('aal').price, 47.36, places=2)
+        self.assertEqual(quote_adapter.get_quotes(['AAL170203P00046500'])[0], quotes[1])
+        with self.assertRaises(Exception):
+            quote_adapter.get_quote('AAPL')
+
+
+class TestAsyncPaperBroker(unittest.TestCase):
+
+    def setUp(self):
+        self.account_adapter = LocalFileSystemAccountAdapter(root=tempfile.mkdtemp())
+
+    def test_order_legs_are_quoted_at_once(self):
+        quote_adapter = SlowQuoteAdapter()
+        broker = AsyncPaperBroker(quote_adapter=quote_adapter, account_adapter=self.account_adapter)
+
+        order = Order()
+        order.add_leg(asset='AAL170203P00046500', quantity=-1, order_type='sto')
+        order.add_leg(asset='AAL170203P00046000', quantity=1, order_type='bto')
+
+        async def run():
+            account = await broker.open_account()
+            await broker.enter_order(account, order)
+            return await broker.get_account(account.account_id)
+
+        account = asyncio.run(run())
+        self.assertEqual(quote_adapter.calls, [['AAL170203P00046500', 'AAL170203P00046000']])
+        self.assertEqual(len(account.positions), 2)
+
+    def test_matches_paper_broker(self):
+        sync_broker = PaperBroker(quote_adapter=TestDataQuoteAdapter(current_date='2017-01-27'), account_adapter=self.account_adapter)
+        async_broker = AsyncPaperBroker(quote_adapter=TestDataQuoteAdapter(current_date='2017-01-27'), account_adapter=self.account_adapter)
+
+        sync_account = sync_broker.open_account()
+        sync_broker.buy_to_open(sync_account, 'AAL', 100)
+        sync_broker.sell_to_open(sync_account, 'AAL170203P00046500', 2)
+
+        async def run():
+            account = await async_broker.open_account()
+            await async_broker.buy_to_open(account, 'AAL', 100)
+            await async_broker.sell_to_open(account, 'AAL170203P00046500', 2)
+            simulated = await async_broker.simulate_order(account, order=self.close_order(account))
+            return account, simulated
+
+        async_account, simulated = asyncio.run(run())
+        self.assertAlmostEqual(async_account.cash, sync_account.cash)
+        self.assertAlmostEqual(async_account.maintenance_margin, sync_account.maintenance_margin)
+        self.assertTrue(simulated.account_id.endswith('_simulated_order'))
+        self.assertEqual(len(async_account.positions), 2)
+
+    def close_order(self, account):
+        order = Order()
+        order.add_leg(asset='AAL170203P00046500', quantity=2, order_type='btc')
+        return order
+
+    def test_failed_quote_raises(self):
+        broker = AsyncPaperBroker(quote_adapter=TestDataQuoteAdapter(current_date='2017-01-27'), account_adapter=self.account_adapter)
+
+        async def run():
+            account = await broker.open_account()
+            await broker.buy_to_open(account, 'AAPL', 1)
+
+        with self.assertRaises(Exception):
+            asyncio.run(run())
+
+
+class TestAsyncGoogleFinanceQuoteAdapter(unittest.TestCase):
+
+    def setUp(self):
+        self.server = OptionChainServer(delay=0.05)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_chains_are_fetched_together(self):
+        quote_adapter = AsyncGoogleFinanceQuoteAdapter(option_chain_url=self.server.url)
+
+        async def run():
+            return await quote_adapter.get_quotes(['AAL170203P00046500', 'AAL170210P00046500'])
+
+        last_trade = [{'LastTradeWithCurrency': '47.36'}]
+        with mock.patch.object(google_finance, 'getQuotes', return_value=last_trade):
+            quotes = asyncio.run(run())
+
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.server.most_in_flight, 2)
+        self.assertEqual([_.asset.symbol for _ in quotes], ['AAL170203P00046500', 'AAL170210P00046500'])
+        self.assertAlmostEqual(quotes[0].underlying_price, 47.36, places=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
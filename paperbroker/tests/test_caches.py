@@ -0,0 +1,76 @@
+import unittest
+from unittest import mock
+
+from ..caches import LRUCache, SingleFlight
+from ..logic import ivolat3_option_greeks
+from ..logic.ivolat3_option_greeks import OptionGreeksCache
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.put('c', 3)
+
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIsNone(cache.get('b'))
+
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_maxsize_must_be_positive(self):
+        with self.assertRaises(Exception):
+            LRUCache(maxsize=0)
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_do_many(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do_many(['a', 'b', 'a'], lambda keys: [_.upper() for _ in keys]), ['A', 'B', 'A'])
+
+    def test_too_few_values_raise(self):
+        flight = SingleFlight()
+        with self.assertRaises(Exception):
+            flight.do_many(['a', 'b'], lambda keys: ['A'])
+
+        # and nothing is left in flight
+        self.assertEqual(flight.do_many(['a', 'b'], lambda keys: [_.upper() for _ in keys]), ['A', 'B'])
+
+
+class TestOptionGreeksCache(unittest.TestCase):
+
+    def test_rounded_inputs_share_an_entry(self):
+        cache = OptionGreeksCache(maxsize=8, price_digits=2, underlying_price_digits=2)
+        with mock.patch.object(ivolat3_option_greeks, 'get_option_greeks', wraps=ivolat3_option_greeks.get_option_greeks) as get_option_greeks:
+            first = cache.get_option_greeks('put', 46.5, 47.36, 7, 0.51)
+            second = cache.get_option_greeks('put', 46.5, 47.361, 7, 0.5099)
+            self.assertEqual(get_option_greeks.call_count, 1)
+
+        self.assertEqual(first, second)
+        self.assertAlmostEqual(first['delta'] * 100, -33.86, places=2)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_results_are_copies(self):
+        cache = OptionGreeksCache(maxsize=8)
+        cache.get_option_greeks('put', 46.5, 47.36, 7, 0.51)['delta'] = 1
+        self.assertNotEqual(cache.get_option_greeks('put', 46.5, 47.36, 7, 0.51)['delta'], 1)
+
+    def test_orders_are_part_of_the_key(self):
+        cache = OptionGreeksCache(maxsize=1)
+        self.assertIsNone(cache.get_option_greeks('put', 46.5, 47.36, 7, 0.51, orders=(1,))['gamma'])
+        self.assertIsNotNone(cache.get_option_greeks('put', 46.5, 47.36, 7, 0.51, orders=(1, 2))['gamma'])
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
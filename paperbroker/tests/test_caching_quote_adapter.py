@@ -0,0 +1,124 @@
+import threading
+import time
+import unittest
+
+from .TestDataQuoteAdapter import TestDataQuoteAdapter
+from ..adapters.quotes.CachingQuoteAdapter import CachingQuoteAdapter
+from ..caches import ExpiringLRUCache
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingQuoteAdapter(TestDataQuoteAdapter):
+    """Test data that counts upstream requests and can hold them until released"""
+
+    def __init__(self):
+        super(CountingQuoteAdapter, self).__init__(current_date='2017-01-27')
+        self.requests = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def get_quotes(self, assets):
+        self.requests.append([_.symbol for _ in assets])
+        self.release.wait()
+        return super(CountingQuoteAdapter, self).get_quotes(assets)
+
+    def get_options(self, underlying_asset=None, expiration_date=None):
+        self.requests.append(('chain', underlying_asset, expiration_date))
+        return super(CountingQuoteAdapter, self).get_options(underlying_asset, expiration_date)
+
+
+class TestCachingQuoteAdapter(unittest.TestCase):
+
+    def setUp(self):
+        self.upstream = CountingQuoteAdapter()
+        self.clock = Clock()
+        self.quote_adapter = CachingQuoteAdapter(self.upstream, equity_ttl=15, option_ttl=60, clock=self.clock)
+
+    def test_equities_expire(self):
+        self.assertAlmostEqual(self.quote_adapter.get_quote('AAL').price, 47.36, places=2)
+        self.quote_adapter.get_quote('AAL')
+        self.assertEqual(len(self.upstream.requests), 1)
+
+        self.clock.now = 15
+        self.quote_adapter.get_quote('AAL')
+        self.assertEqual(len(self.upstream.requests), 2)
+
+        stats = self.quote_adapter.stats()
+        self.assertEqual(stats['equities'], {'hits': 1, 'misses': 2, 'fetches': 2})
+        self.assertEqual(stats['cache']['expirations'], 1)
+
+    def test_chains_fill_the_option_cache(self):
+        options = self.quote_adapter.get_options('AAL', '2017-02-03')
+        self.quote_adapter.get_options('AAL', '2017-02-03')
+        quotes = self.quote_adapter.get_quotes([options[0].asset, options[1].asset, 'AAL'])
+
+        self.assertEqual(self.upstream.requests, [('chain', 'AAL', '2017-02-03'), ['AAL']])
+        self.assertIs(quotes[0], options[0])
+        self.assertEqual(self.quote_adapter.stats()['chains']['hits'], 1)
+        self.assertEqual(self.quote_adapter.stats()['options']['hits'], 2)
+
+    def test_bulk_requests_only_fetch_what_is_missing(self):
+        self.quote_adapter.get_quote('AAL170203P00046500')
+        quotes = self.quote_adapter.get_quotes(['AAL170203P00046500', 'AAL', 'AAL170203P00046000', 'AAL'])
+        self.assertEqual(self.upstream.requests, [['AAL170203P00046500'], ['AAL', 'AAL170203P00046000']])
+        self.assertEqual([_.asset.symbol for _ in quotes], ['AAL170203P00046500', 'AAL', 'AAL170203P00046000', 'AAL'])
+
+    def test_max_entries(self):
+        quote_adapter = CachingQuoteAdapter(self.upstream, max_entries=2)
+        quote_adapter.get_quotes(['AAL', 'AAL170203P00046500', 'AAL170203P00046000'])
+        self.assertEqual(quote_adapter.stats()['cache']['evictions'], 1)
+        quote_adapter.get_quote('AAL')
+        self.assertEqual(self.upstream.requests[-1], ['AAL'])
+
+    def test_concurrent_requests_share_one_fetch(self):
+        self.upstream.release.clear()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.quote_adapter.get_quote('AAL'))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+
+        # wait for every thread to be waiting on the first one's fetch
+        while self.quote_adapter.stats()['coalesced'] < len(threads) - 1:
+            time.sleep(0.001)
+        self.upstream.release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(self.upstream.requests), 1)
+        self.assertEqual(len(results), len(threads))
+        self.assertTrue(all(_ is results[0] for _ in results))
+        self.assertEqual(self.quote_adapter.stats()['coalesced'], len(threads) - 1)
+
+    def test_errors_reach_every_caller(self):
+        class FailingQuoteAdapter(CountingQuoteAdapter):
+            def get_quotes(self, assets):
+                raise Exception("FailingQuoteAdapter: down")
+
+        quote_adapter = CachingQuoteAdapter(FailingQuoteAdapter())
+        with self.assertRaises(Exception):
+            quote_adapter.get_quote('AAL')
+        self.assertEqual(quote_adapter.stats()['cache']['size'], 0)
+
+
+class TestExpiringLRUCache(unittest.TestCase):
+
+    def test_ttl(self):
+        clock = Clock()
+        cache = ExpiringLRUCache(maxsize=4, clock=clock)
+        cache.put('a', 1, ttl=10)
+        cache.put('b', 2)
+        clock.now = 10
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('b'), 2)
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
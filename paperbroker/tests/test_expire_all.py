@@ -0,0 +1,175 @@
+import random
+import tempfile
+import unittest
+from copy import deepcopy
+
+from .TestDataQuoteAdapter import TestDataQuoteAdapter
+from ..PaperBroker import PaperBroker
+from ..accounts import Account
+from ..adapters.accounts import LocalFileSystemAccountAdapter
+from ..assets import Asset, asset_factory
+from ..logic.close_expired_options import close_expired_options
+from ..logic.expire_all import expire_all
+from ..logic.maintenance_margin import get_maintenance_margin
+from ..positions import Position
+from ..quotes import Quote
+
+
+class CountingQuoteAdapter(TestDataQuoteAdapter):
+    """Test data that counts the assets it's asked for, plus extra {symbol: quote or exception to raise}"""
+
+    def __init__(self, current_date, extra=None):
+        super(CountingQuoteAdapter, self).__init__(current_date=current_date)
+        self.requests = []
+        self.extra = extra if extra is not None else {}
+
+    def _extra(self, symbol):
+        if isinstance(self.extra[symbol], Exception):
+            raise self.extra[symbol]
+        return self.extra[symbol]
+
+    def get_quote(self, asset):
+        symbol = asset_factory(asset).symbol
+        self.requests.append([symbol])
+        return self._extra(symbol) if symbol in self.extra else super(CountingQuoteAdapter, self).get_quote(asset)
+
+    def get_quotes(self, assets):
+        symbols = [asset_factory(_).symbol for _ in assets]
+        self.requests.append(symbols)
+        quotes = iter(super(CountingQuoteAdapter, self).get_quotes([_ for _ in symbols if _ not in self.extra]))
+        return [self._extra(_) if _ in self.extra else next(quotes) for _ in symbols]
+
+
+class TestExpireAll(unittest.TestCase):
+
+    def setUp(self):
+        self.quote_adapter = CountingQuoteAdapter(current_date='2017-01-28')
+        self.account_adapter = LocalFileSystemAccountAdapter(root=tempfile.mkdtemp())
+
+        rng = random.Random(3)
+        expiring = ['AAL170127{}000{}000'.format(option_type, strike) for option_type in 'CP' for strike in (46, 47, 48)]
+        later = ['AAL170203C00047000', 'AAL170203P00046000']
+        self.accounts = []
+        for i in range(30):
+            positions = [Position(asset_factory(rng.choice(expiring)), rng.choice([-2, -1, 1, 2]), cost_basis=0.5)
+                         for _ in range(rng.randint(0, 3))]
+            positions += [Position(asset_factory(rng.choice(later)), rng.randint(1, 3)) for _ in range(rng.randint(0, 1))]
+            if rng.random() < 0.5:
+                positions.append(Position(Asset('AAL'), rng.choice([-300, 100, 200]), cost_basis=47.0))
+            account = Account(positions=positions, account_id='account{:02d}'.format(i))
+            account.cash = 10000
+            self.account_adapter.put_account(account)
+            self.accounts.append(account)
+
+    def test_matches_each_account(self):
+        expected = {}
+        for account in self.accounts:
+            account = deepcopy(account)
+            close_expired_options(account, TestDataQuoteAdapter(current_date='2017-01-28'), None)
+            expected[account.account_id] = account
+
+        results = expire_all(self.account_adapter, self.quote_adapter, '2017-01-28', batch_size=7, workers=3)
+        self.assertEqual([_.account_id for _ in results], self.account_adapter.get_account_ids())
+        self.assertEqual(set(_.status for _ in results), {'expired', 'unchanged'})
+
+        for result, stored in zip(results, [self.account_adapter.get_account(_.account_id) for _ in results]):
+            account = expected[result.account_id]
+            original = [_ for _ in self.accounts if _.account_id == result.account_id][0]
+            self.assertAlmostEqual(stored.cash, account.cash)
+            self.assertAlmostEqual(result.cash_change, account.cash - original.cash)
+            self.assertEqual(sorted((_.asset.symbol, _.quantity) for _ in stored.positions),
+                             sorted((_.asset.symbol, _.quantity) for _ in account.positions))
+            self.assertEqual(result.status == 'expired', len(result.expired) > 0)
+            self.assertTrue(all(_.startswith('AAL170127') for _ in result.expired))
+
+            # stored with the margin of what's left, at the settlement price
+            try:
+                margin = get_maintenance_margin(positions=stored.positions, quote_adapter=TestDataQuoteAdapter(current_date='2017-01-28'))
+            except Exception:
+                margin = None
+            if margin is None:
+                self.assertIsNone(stored.maintenance_margin)
+            else:
+                self.assertAlmostEqual(stored.maintenance_margin, margin)
+
+        # AAL settles every account from one quote, and nothing is quoted to find out what day it is
+        self.assertEqual(self.quote_adapter.requests, [['AAL']])
+
+        # running it again has nothing left to do
+        self.assertTrue(all(_.status == 'unchanged' for _ in expire_all(self.account_adapter, self.quote_adapter, '2017-01-28')))
+
+    def test_margin_after_expiry(self):
+        spread = Account(positions=[Position(asset_factory('AAL170127P00047000'), -1), Position(asset_factory('AAL170127P00046000'), 1),
+                                    Position(asset_factory('AAL170203P00047000'), -1), Position(asset_factory('AAL170203P00045000'), 1)],
+                         account_id='spread')
+        spread.maintenance_margin = 300.0
+        self.account_adapter.put_account(spread)
+
+        expire_all(self.account_adapter, self.quote_adapter, '2017-01-28', account_ids=['spread'])
+        stored = self.account_adapter.get_account('spread')
+        self.assertEqual(len(stored.positions), 2)
+        self.assertEqual(stored.margin_by_underlying, {'AAL': 200.0})
+        self.assertEqual(stored.maintenance_margin, 200.0)
+
+        # and nothing left once the other spread expires
+        expire_all(self.account_adapter, self.quote_adapter, '2017-02-04', account_ids=['spread'])
+        stored = self.account_adapter.get_account('spread')
+        self.assertEqual(len(stored.positions), 0)
+        self.assertEqual((stored.maintenance_margin, stored.margin_by_underlying), (0.0, {}))
+
+    def test_each_underlying_settles_at_its_own_price(self):
+        self.quote_adapter.extra['BBB'] = Quote('2017-01-28', 'BBB', price=20.0)
+        account = Account(positions=[Position(asset_factory('AAL170127P00048000'), 1), Position(asset_factory('BBB170127C00015000'), 1),
+                                     Position(asset_factory('BBB170127C00030000'), 1)], account_id='two')
+        account.cash = 10000
+        self.account_adapter.put_account(account)
+
+        result = expire_all(self.account_adapter, self.quote_adapter, '2017-01-28', account_ids=['two'])[0]
+        stored = self.account_adapter.get_account('two')
+
+        # the AAL put is exercised at 48 and the BBB 15 call at 15, the BBB 30 call is out of the money at 20
+        self.assertEqual(sorted((_.asset.symbol, _.quantity) for _ in stored.positions), [('AAL', -100), ('BBB', 100)])
+        self.assertAlmostEqual(stored.cash, 10000 + 4800 - 1500)
+        self.assertAlmostEqual(result.cash_change, 4800 - 1500)
+
+    def test_margin_errors(self):
+        # a calendar spread of equal strikes can't be margined, the options still expire
+        calendar = Account(positions=[Position(asset_factory('AAL170127C00048000'), 1), Position(asset_factory('AAL170203P00047000'), -1),
+                                      Position(asset_factory('AAL170210P00047000'), 1)], account_id='calendar')
+        # and a quote that can't be had for the margin of what's left fails the account
+        self.quote_adapter.extra['CCC'] = Exception('no quote for CCC')
+        unquoted = Account(positions=[Position(asset_factory('AAL170127C00048000'), 1), Position(asset_factory('CCC170203C00010000'), 1),
+                                      Position(Asset('CCC'), -100)], account_id='unquoted')
+        for account in (calendar, unquoted):
+            self.account_adapter.put_account(account)
+
+        results = {_.account_id: _ for _ in expire_all(self.account_adapter, self.quote_adapter, '2017-01-28', account_ids=['calendar', 'unquoted'])}
+        self.assertEqual(results['calendar'].status, 'expired')
+        stored = self.account_adapter.get_account('calendar')
+        self.assertEqual(len(stored.positions), 2)
+        self.assertIsNone(stored.maintenance_margin)
+
+        self.assertEqual(results['unquoted'].status, 'failed')
+        self.assertEqual(str(results['unquoted'].error), 'no quote for CCC')
+        self.assertEqual(len(self.account_adapter.get_account('unquoted').positions), 3)
+
+    def test_failures_are_per_account(self):
+        broken = Account(positions=[Position(asset_factory('XXX170127C00010000'), 1)], account_id='broken')
+        self.account_adapter.put_account(broken)
+        broker = PaperBroker(quote_adapter=self.quote_adapter, account_adapter=self.account_adapter)
+
+        results = {_.account_id: _ for _ in broker.expire_all('2017-01-28', account_ids=['broken', 'account00', 'missing'],
+                                                                 workers=2, batch_size=2)}
+        self.assertEqual(results['broken'].status, 'failed')
+        self.assertEqual(results['missing'].status, 'failed')
+        self.assertNotEqual(results['account00'].status, 'failed')
+
+        # the broken account is left as it was
+        self.assertEqual(self.account_adapter.get_account('broken').positions[0].quantity, 1)
+
+        # nothing expired before the 27th
+        self.assertTrue(all(_.status == 'unchanged' for _ in broker.expire_all('2017-01-27')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -107,6 +107,24 @@ class TestFillOrder(unittest.TestCase):
         assert a.positions[0].asset == option2
         assert a.positions[0].quantity == -1
 
+    def test_simulate_order(self):
+        self.quote_adapter.current_date = '2017-01-27'
+        broker = PaperBroker(quote_adapter=self.quote_adapter)
+        account = broker.open_account()
+        account.cash = 10000
+
+        o = Order()
+        o.add_leg(asset='AAL170203P00046500', quantity=1, order_type='bto')
+        a = broker.simulate_order(account, o, estimator=MidpointEstimator())
+
+        # the account after the order comes back, the broker's account is left alone
+        self.assertIsInstance(a, Account)
+        assert a.account_id == account.account_id + '_simulated_order'
+        self.assertAlmostEqual(a.cash, 10000 - 0.51 * 100, places=2)
+        assert len(a.positions) == 1
+        assert account.cash == 10000
+        assert len(account.positions) == 0
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,7 +1,15 @@
+import sys
 import unittest
 
+from unittest import mock
+
 from .TestDataQuoteAdapter import TestDataQuoteAdapter
 from ..PaperBroker import PaperBroker
+from ..adapters.quotes.QuoteAdapter import QuoteAdapter
+from ..adapters.quotes.GoogleFinanceQuoteAdapter import GoogleFinanceQuoteAdapter
+from ..orders import Order
+from ..logic.fill_order import fill_order
+from ..accounts import Account
 
 """
     A selection of data is included below for easy reference to prevent needing to
@@ -85,8 +93,71 @@ class TestGetQuotes(unittest.TestCase):
 
         self.assertIn('AAL170203P00046000', [_.asset for _ in quotes])
 
+    def test_get_quotes(self):
+        self.quote_adapter.current_date = '2017-01-27'
+        broker = PaperBroker(quote_adapter=self.quote_adapter)
+        quotes = broker.get_quotes(['AAL170203P00045500', 'AAL', 'GOOG', 'AAL170203P00045500'])
+
+        self.assertEqual(quotes[0].asset, 'AAL170203P00045500')
+        self.assertAlmostEqual(quotes[0].price, 0.255, places=3)
+        self.assertAlmostEqual(quotes[0].underlying_price, 47.36, places=2)
+        self.assertAlmostEqual(quotes[1].price, 47.36, places=2)
+        self.assertIsNone(quotes[2])
+        self.assertEqual(quotes[3].asset, 'AAL170203P00045500')
+
+        self.assertEqual(broker.get_quotes([]), [])
+
+    def test_default_get_quotes_calls_get_quote(self):
+        class SingleQuoteAdapter(QuoteAdapter):
+            def get_quote(self, asset):
+                return asset
+
+        self.assertEqual(SingleQuoteAdapter().get_quotes(['AAL', 'GOOG']), ['AAL', 'GOOG'])
+
+    def test_fill_order_quotes_in_bulk(self):
+        self.quote_adapter.current_date = '2017-01-27'
+        order = Order()
+        order.add_leg(asset='AAL170203P00046500', quantity=-1, order_type='sto')
+        order.add_leg(asset='AAL170203P00045500', quantity=1, order_type='bto')
+
+        with mock.patch.object(self.quote_adapter, 'get_quote') as get_quote, \
+                mock.patch.object(self.quote_adapter, 'get_quotes', wraps=self.quote_adapter.get_quotes) as get_quotes:
+            account = fill_order(account=Account(), order=order, quote_adapter=self.quote_adapter)
+            get_quote.assert_not_called()
+            self.assertEqual(get_quotes.call_count, 1)
+
+        self.assertEqual(len(account.positions), 2)
+        self.assertAlmostEqual(account.positions[0].quote.price, 0.51, places=2)
+
+
+class FakeOptionChain(object):
+    """Two puts in each expiration of any underlying"""
+
+    def __init__(self, q, *args, **kwargs):
+        underlying = q.split(':')[-1]
+        self.calls = []
+        self.puts = [{'s': underlying + expiration + 'P00046500', 'b': '0.49', 'a': '0.53'} for expiration in ('170203', '170210')]
+        self.puts += [{'s': underlying + expiration + 'P00047000', 'b': '0.68', 'a': '0.72'} for expiration in ('170203', '170210')]
+        self.expiration_dates = ['2017-02-03', '2017-02-10']
+
+
+class TestGoogleFinanceGetQuotes(unittest.TestCase):
+
+    def test_one_get_quotes_request(self):
+        google_finance = sys.modules[GoogleFinanceQuoteAdapter.__module__]
+        last_trades = lambda symbols: [{'LastTradeWithCurrency': {'AAL': '47.36', 'UAL': '73.50'}[_]} for _ in symbols]
+        quote_adapter = GoogleFinanceQuoteAdapter()
 
+        with mock.patch.object(google_finance, 'getQuotes', side_effect=last_trades) as getQuotes, \
+                mock.patch.object(google_finance, 'OptionChain', FakeOptionChain):
+            quotes = quote_adapter.get_quotes(['AAL170203P00046500', 'AAL', 'AAL170210P00047000', 'UAL170203P00046500'])
 
+        # the equities and the underlyings of all three chains, in one request
+        self.assertEqual(getQuotes.call_args_list, [mock.call(['AAL', 'UAL'])])
+        self.assertEqual([_.asset.symbol for _ in quotes], ['AAL170203P00046500', 'AAL', 'AAL170210P00047000', 'UAL170203P00046500'])
+        self.assertAlmostEqual(quotes[0].underlying_price, 47.36)
+        self.assertAlmostEqual(quotes[1].price, 47.36)
+        self.assertAlmostEqual(quotes[3].underlying_price, 73.50)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+import sys
+from unittest import mock
+from urllib.parse import urlparse, parse_qs
+
+from ..adapters.quotes.GoogleFinanceQuoteAdapter import GoogleFinanceQuoteAdapter, OptionChain
+
+# the module, paperbroker.adapters.quotes exports the class under the same name
+google_finance = sys.modules[GoogleFinanceQuoteAdapter.__module__]
+
+RECORDED = os.path.join(os.path.dirname(__file__), 'test_data', 'google_option_chain')
+
+
+class OptionChainServer(ThreadingMixIn, HTTPServer):
+    """
+        Stands in for the Google Finance option chain endpoint, serving the recorded
+          responses in test_data/google_option_chain
+    """
+    daemon_threads = True
+
+    def __init__(self, delay=0.0):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), OptionChainHandler)
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.most_in_flight = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}/finance/option_chain'.format(self.server_address[1])
+
+
+class OptionChainHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        with server.lock:
+            server.requests.append(params)
+            server.in_flight += 1
+            server.most_in_flight = max(server.most_in_flight, server.in_flight)
+
+        time.sleep(server.delay)
+
+        name = params['q'].split(':')[-1]
+        if 'expy' in params:
+            name += '_{:04d}-{:02d}-{:02d}'.format(int(params['expy']), int(params['expm']), int(params['expd']))
+        filename = os.path.join(RECORDED, name + '.json')
+
+        with server.lock:
+            server.in_flight -= 1
+
+        if not os.path.exists(filename):
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        with open(filename, 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestGoogleOptionChain(unittest.TestCase):
+
+    def setUp(self):
+        self.server = OptionChainServer(delay=0.05)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_fetches_expirations_in_parallel(self):
+        oc = OptionChain('NASDAQ:AAL', url=self.server.url, max_workers=4)
+        self.assertEqual(oc.expiration_dates, ['2017-01-27', '2017-02-03', '2017-02-10'])
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.server.most_in_flight, 2)
+        self.assertEqual(len(oc.calls), 27)
+        self.assertIn('AAL170210P00046500', [_['s'] for _ in oc.puts])
+
+    def test_fetches_one_expiration(self):
+        oc = OptionChain('NASDAQ:AAL', expiration_date='2017-02-03', url=self.server.url)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertTrue(all('170203' in _['s'] for _ in oc.calls + oc.puts))
+
+    def test_adapter(self):
+        quote_adapter = GoogleFinanceQuoteAdapter(option_chain_url=self.server.url)
+
+        self.assertEqual(quote_adapter.get_expiration_dates('AAL'), ['2017-01-27', '2017-02-03', '2017-02-10'])
+        self.assertEqual(quote_adapter.get_expiration_dates('AAL'), ['2017-01-27', '2017-02-03', '2017-02-10'])
+        self.assertEqual(len(self.server.requests), 1)
+
+        last_trade = [{'LastTradeWithCurrency': '47.36'}]
+        with mock.patch.object(google_finance, 'getQuotes', return_value=last_trade):
+            options = quote_adapter.get_options('AAL', '2017-02-03')
+
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.server.requests[-1]['expd'], '3')
+        put = [_ for _ in options if _.asset == 'AAL170203P00046500'][0]
+        self.assertAlmostEqual(put.price, 0.51, places=2)
+        self.assertAlmostEqual(put.underlying_price, 47.36, places=2)
+
+    def test_missing_chain(self):
+        with self.assertRaises(Exception):
+            OptionChain('NASDAQ:MSFT', url=self.server.url)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import random
+import unittest
+
+from .TestDataQuoteAdapter import TestDataQuoteAdapter
+from ..assets import Asset, Option, asset_factory
+from ..logic.group_into_basic_strategies import group_into_basic_strategies, AssetStrategy, CoveredStrategy, SpreadStrategy
+from ..logic.maintenance_margin import get_maintenance_margin
+from ..positions import Position
+
+
+def naive_margin(positions):
+    """The margin of positions in one underlying, grouped a contract at a time (without short stock)"""
+    shares = sum(_.quantity for _ in positions if not isinstance(_.asset, Option) and _.quantity > 0)
+    contracts = {}
+    for position in positions:
+        if isinstance(position.asset, Option):
+            key = (position.asset.option_type, position.quantity < 0)
+            contracts.setdefault(key, []).extend([position.asset] * abs(int(position.quantity)))
+
+    margin, naked = 0.0, False
+    for option_type, reverse in (('call', False), ('put', True)):
+        short = sorted(contracts.get((option_type, True), []), key=lambda k: k.strike, reverse=reverse)
+        long = sorted(contracts.get((option_type, False), []), key=lambda k: k.strike, reverse=reverse)
+        for option in short:
+            if option_type == 'call' and shares >= 100:
+                shares -= 100
+            elif len(long) > 0:
+                bought = long.pop(0)
+                if bought.strike == option.strike:
+                    raise Exception('equal strikes')
+                margin += max(0.0, (option.strike - bought.strike) * (1 if option_type == 'put' else -1)) * 100
+            else:
+                naked = True
+    return None if naked else margin
+
+
+class TestGroupIntoBasicStrategies(unittest.TestCase):
+
+    def setUp(self):
+        self.quote_adapter = TestDataQuoteAdapter(current_date='2017-01-27')
+
+    def test_matches_grouping_a_contract_at_a_time(self):
+        rng = random.Random(11)
+        symbols = ['AAL1702{}{}000{}000'.format(expiration, option_type, strike) for expiration in ('03', '10')
+                   for option_type in ('C', 'P') for strike in (44, 45, 46, 47, 48, 49)]
+
+        for _ in range(300):
+            positions = [Position(asset_factory(rng.choice(symbols)), rng.choice([-1, 1]) * rng.randint(1, 6))
+                         for _ in range(rng.randint(1, 8))]
+            if rng.random() < 0.5:
+                positions.append(Position(Asset('AAL'), rng.choice([50, 100, 250, 400])))
+
+            try:
+                expected = naive_margin(positions)
+            except Exception:
+                with self.assertRaises(Exception):
+                    get_maintenance_margin(positions=positions, quote_adapter=self.quote_adapter)
+                continue
+
+            margin = get_maintenance_margin(positions=positions, quote_adapter=self.quote_adapter)
+            if expected is None:
+                self.assertIsNone(margin)
+            else:
+                self.assertAlmostEqual(margin, expected)
+
+    def test_strategies_carry_quantities(self):
+        positions = [Position(Asset('AAL'), 250),
+                     Position(asset_factory('AAL170203C00048000'), -5000),
+                     Position(asset_factory('AAL170203C00049000'), 4000),
+                     Position(asset_factory('AAL170203P00047000'), -5000),
+                     Position(asset_factory('AAL170203P00046000'), 3000),
+                     Position(asset_factory('AAL170203P00046000'), 2000)]
+        strategies = group_into_basic_strategies(positions)
+
+        described = [(type(_).__name__, _.quantity) for _ in strategies]
+        self.assertEqual(described, [('CoveredStrategy', 2), ('SpreadStrategy', 4000), ('AssetStrategy', -998),
+                                     ('SpreadStrategy', 5000), ('AssetStrategy', 50), ('AssetStrategy', 0)])
+        self.assertIsInstance(strategies[0], CoveredStrategy)
+        self.assertIsInstance(strategies[3], SpreadStrategy)
+        self.assertIsInstance(strategies[2], AssetStrategy)
+
+        # without the naked calls it's the put spreads' width for each contract
+        self.assertIsNone(get_maintenance_margin(strategies=strategies, quote_adapter=self.quote_adapter))
+        self.assertEqual(get_maintenance_margin(positions=positions[3:], quote_adapter=self.quote_adapter), 5000 * 100.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
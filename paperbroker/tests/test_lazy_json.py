@@ -0,0 +1,44 @@
+import glob
+import math
+import os
+import unittest
+
+from ..adapters.quotes.lazy_json import json_decode, lazy_json_to_json
+
+RECORDED = os.path.join(os.path.dirname(__file__), 'test_data', 'google_option_chain')
+
+
+class TestLazyJson(unittest.TestCase):
+
+    def test_lazy_json(self):
+        text = b"""{expiry:{y:2017,m:2,d:3},puts:[{s:"AAL170203P00046500",b:'0.49',a:"0.53",note:'say "hi"',},],
+                    e:1.5e3,neg:-Infinity,ok:true,missing:null,key_2:"it's, {fine}",}"""
+        self.assertEqual(json_decode(text), {
+            'expiry': {'y': 2017, 'm': 2, 'd': 3},
+            'puts': [{'s': 'AAL170203P00046500', 'b': '0.49', 'a': '0.53', 'note': 'say "hi"'}],
+            'e': 1500.0, 'neg': float('-inf'), 'ok': True, 'missing': None,
+            'key_2': "it's, {fine}"})
+
+    def test_nan(self):
+        self.assertTrue(math.isnan(json_decode('{a:NaN}')['a']))
+
+    def test_strings_are_untouched(self):
+        self.assertEqual(json_decode('{a:"b: c, ]",d:[1,2,]}'), {'a': 'b: c, ]', 'd': [1, 2]})
+        self.assertEqual(json_decode("{a:'escaped \\' quote'}"), {'a': "escaped ' quote"})
+
+    def test_strict_json_is_unchanged(self):
+        text = '{"a": [1, 2.5, "x"], "b": {"c": false}}'
+        self.assertEqual(lazy_json_to_json(text), text)
+
+    def test_recorded_chains(self):
+        filenames = glob.glob(os.path.join(RECORDED, '*.json'))
+        self.assertGreater(len(filenames), 0)
+        for filename in filenames:
+            with open(filename, 'rb') as f:
+                chain = json_decode(f.read())
+            self.assertEqual(len(chain['expirations']), 3)
+            self.assertTrue(all(_['s'].startswith('AAL') for _ in chain['calls'] + chain['puts']))
+
+
+if __name__ == '__main__':
+    unittest.main()
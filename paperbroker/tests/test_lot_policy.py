@@ -0,0 +1,128 @@
+import pickle
+import random
+import unittest
+
+from .TestDataQuoteAdapter import TestDataQuoteAdapter
+from ..accounts import Account
+from ..logic.fill_order import fill_order
+from ..orders import Order
+from ..positions import Lots
+
+
+def naive_close(lots, quantity, policy):
+    """The same close done on a plain [[quantity, cost_basis]] list"""
+    lots = [list(_) for _ in lots]
+    while quantity > 0 and len(lots) > 0:
+        lot = lots[0] if policy == 'fifo' else lots[-1]
+        taken = min(quantity, lot[0])
+        lot[0] -= taken
+        quantity -= taken
+        if lot[0] == 0:
+            lots.remove(lot)
+    return [tuple(_) for _ in lots]
+
+
+class TestLots(unittest.TestCase):
+
+    def test_matches_a_list_of_lots(self):
+        rng = random.Random(7)
+        for policy in ('fifo', 'lifo'):
+            lots = Lots(policy)
+            expected = []
+            for _ in range(2000):
+                if rng.random() < 0.6 or len(expected) == 0:
+                    quantity, cost_basis = rng.randint(1, 10), round(rng.uniform(1, 100), 2)
+                    lots.add(quantity, cost_basis)
+                    expected.append((quantity, cost_basis))
+                else:
+                    quantity = rng.randint(1, 25)
+                    lots.close(quantity)
+                    expected = naive_close(expected, quantity, policy)
+
+                self.assertEqual(len(lots), len(expected))
+                self.assertAlmostEqual(lots.quantity, sum(_[0] for _ in expected))
+                for (quantity, cost_basis), (expected_quantity, expected_cost_basis) in zip(lots.to_list(), expected):
+                    self.assertAlmostEqual(quantity, expected_quantity)
+                    self.assertAlmostEqual(cost_basis, expected_cost_basis)
+
+            # consumed fifo lots get dropped from the arrays
+            if policy == 'fifo':
+                self.assertLess(len(lots.quantities), 2000)
+
+    def test_close_returns_cost(self):
+        lots = Lots('fifo')
+        lots.add(10, 1.0)
+        lots.add(10, 2.0)
+        self.assertAlmostEqual(lots.close(15), 20.0)
+        self.assertAlmostEqual(lots.cost_basis, 2.0)
+
+        lots = Lots('lifo')
+        lots.add(10, 1.0)
+        lots.add(10, 2.0)
+        self.assertAlmostEqual(lots.close(15), 25.0)
+        self.assertAlmostEqual(lots.cost_basis, 1.0)
+
+        with self.assertRaises(Exception):
+            Lots('hifo')
+
+
+class TestLotPolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.quote_adapter = TestDataQuoteAdapter(current_date='2017-01-27')
+
+    def trade(self, account, order_type, quantity, asset='AAL'):
+        order = Order()
+        order.add_leg(asset=asset, quantity=quantity, order_type=order_type)
+        fill_order(account=account, order=order, quote_adapter=self.quote_adapter)
+
+    def test_policies(self):
+        results = {}
+        for lot_policy in ('separate', 'aggregate', 'fifo', 'lifo'):
+            account = Account(lot_policy=lot_policy)
+            self.trade(account, 'bto', 10)
+            self.quote_adapter.current_date = '2017-01-28'
+            self.trade(account, 'bto', 30)
+            self.trade(account, 'stc', -15)
+            self.quote_adapter.current_date = '2017-01-27'
+            results[lot_policy] = account
+
+        # the cash is the same however the lots are kept
+        self.assertEqual(len(set(round(_.cash, 6) for _ in results.values())), 1)
+
+        for lot_policy in ('separate', 'aggregate', 'fifo', 'lifo'):
+            self.assertEqual([_.quantity for _ in results[lot_policy].positions], [25])
+
+        # bought 10 at 47.36 and 30 at 46.95
+        self.assertAlmostEqual(results['aggregate'].positions[0].cost_basis, (10 * 47.36 + 30 * 46.95) / 40, places=4)
+        self.assertAlmostEqual(results['fifo'].positions[0].cost_basis, 46.95, places=4)
+        self.assertAlmostEqual(results['lifo'].positions[0].cost_basis, (10 * 47.36 + 15 * 46.95) / 25, places=4)
+
+    def test_short_lots_and_pickling(self):
+        account = Account(lot_policy='fifo')
+        for _ in range(50):
+            self.trade(account, 'sto', -1, asset='AAL170203P00046500')
+        self.trade(account, 'btc', 20, asset='AAL170203P00046500')
+
+        self.assertEqual(len(account.positions), 1)
+        position = account.positions[0]
+        self.assertEqual(position.quantity, -30)
+        self.assertEqual(len(position.lots), 30)
+        self.assertAlmostEqual(position.cost_basis, -0.51, places=4)
+
+        loaded = pickle.loads(pickle.dumps(account))
+        self.assertEqual(loaded.lot_policy, 'fifo')
+        self.assertEqual(loaded.positions[0].lots.to_list(), position.lots.to_list())
+
+        with self.assertRaises(Exception):
+            Account(lot_policy='average')
+
+    def test_legacy_accounts_keep_separate_lots(self):
+        account = Account()
+        del account.__dict__['lot_policy']
+        loaded = pickle.loads(pickle.dumps(account))
+        self.assertEqual(loaded.lot_policy, 'separate')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,16 @@
+import pickle
 import unittest
 import arrow
 from .TestDataQuoteAdapter import TestDataQuoteAdapter
 from ..PaperBroker import PaperBroker
 from ..accounts import Account
-from ..logic.maintenance_margin import get_maintenance_margin
+from ..adapters.quotes.SnapshotQuoteAdapter import SnapshotQuoteAdapter
+from ..logic.fill_order import fill_order
+from ..logic.maintenance_margin import get_maintenance_margin, invalidate_maintenance_margin
+from ..orders import Order
 from ..positions import Position
-from ..assets import Asset, Option, Call, Put
+from ..assets import Asset, Option, Call, Put, asset_factory
+from ..quotes import Quote, OptionQuote
 
 
 class TestMaintenanceMargins(unittest.TestCase):
@@ -35,5 +40,82 @@ class TestMaintenanceMargins(unittest.TestCase):
         assert get_maintenance_margin(positions=positions, quote_adapter=self.quote_adapter) == 2500
 
 
+class TestIncrementalMaintenanceMargin(unittest.TestCase):
+
+    def setUp(self):
+        # the AAL quotes of 2017-01-27, and the same quotes again for BBB
+        test_data = TestDataQuoteAdapter(current_date='2017-01-27')
+        quotes = test_data.get_quotes(['AAL', 'AAL170203C00047000', 'AAL170203C00048000', 'AAL170203P00046000',
+                                       'AAL170203P00046500', 'AAL170203P00047000'])
+        for quote in list(quotes):
+            asset = asset_factory('BBB' + quote.asset.symbol[3:])
+            if isinstance(quote, OptionQuote):
+                quotes.append(OptionQuote(quote.quote_date, asset, bid=quote.bid, ask=quote.ask, underlying_price=quote.underlying_price))
+            else:
+                quotes.append(Quote(quote.quote_date, asset, bid=quote.bid, ask=quote.ask))
+        self.quote_adapter = SnapshotQuoteAdapter(quotes)
+
+    def fill(self, account, *legs):
+        order = Order()
+        for asset, quantity, order_type in legs:
+            order.add_leg(asset=asset, quantity=quantity, order_type=order_type)
+        return fill_order(account=account, order=order, quote_adapter=self.quote_adapter)
+
+    def test_matches_the_whole_account(self):
+        account = Account()
+        account.cash = 100000
+        fills = [
+            [('AAL', 100, 'bto')],
+            [('BBB170203P00047000', -2, 'sto'), ('BBB170203P00046000', 2, 'bto')],
+            [('AAL170203C00047000', -1, 'sto')],
+            [('AAL170203P00047000', -1, 'sto'), ('AAL170203P00046500', 1, 'bto')],
+            [('AAL170203C00048000', -1, 'sto')],
+            [('AAL170203C00048000', 1, 'btc')],
+            [('BBB170203P00047000', 2, 'btc'), ('BBB170203P00046000', -2, 'stc')],
+            [('AAL170203C00047000', 1, 'btc'), ('AAL170203P00047000', 1, 'btc')],
+        ]
+        margins = []
+        for legs in fills:
+            self.fill(account, *legs)
+            self.assertEqual(account.maintenance_margin, get_maintenance_margin(positions=account.positions, quote_adapter=self.quote_adapter))
+            self.assertEqual(sorted(account.margin_by_underlying), account.positions.option_underlyings())
+            margins.append(account.maintenance_margin)
+
+        # the naked short call can't be margined, and can again once it's closed
+        self.assertEqual(margins, [0.0, 200.0, 200.0, 250.0, None, 250.0, 50.0, 0.0])
+
+    def test_only_the_order_underlyings_are_regrouped(self):
+        account = Account()
+        self.fill(account, ('BBB170203P00047000', -1, 'sto'), ('BBB170203P00046000', 1, 'bto'))
+        self.assertEqual(account.margin_by_underlying, {'BBB': 100.0})
+
+        account.margin_by_underlying = {'BBB': 1000.0}
+        self.fill(account, ('AAL170203P00047000', -1, 'sto'), ('AAL170203P00046500', 1, 'bto'))
+        self.assertEqual(account.maintenance_margin, 1050.0)
+
+        invalidate_maintenance_margin(account, ['BBB'])
+        self.fill(account, ('AAL', 1, 'bto'))
+        self.assertEqual(account.maintenance_margin, 150.0)
+
+        # pickled accounts keep their margins, replacing the positions forgets them
+        self.assertEqual(pickle.loads(pickle.dumps(account)).margin_by_underlying, {'AAL': 50.0, 'BBB': 100.0})
+        account.positions = list(account.positions)
+        self.assertEqual(account.margin_by_underlying, {})
+
+    def test_expiring_options_forgets_their_margin(self):
+        quote_adapter = TestDataQuoteAdapter(current_date='2017-01-27')
+        broker = PaperBroker(quote_adapter=quote_adapter)
+        account = Account()
+        order = Order()
+        order.add_leg(asset='AAL170127P00048000', quantity=-1, order_type='sto')
+        order.add_leg(asset='AAL170127P00047000', quantity=1, order_type='bto')
+        fill_order(account=account, order=order, quote_adapter=quote_adapter)
+        self.assertEqual(account.margin_by_underlying, {'AAL': 100.0})
+
+        quote_adapter.current_date = '2017-01-28'
+        broker.market_adapter.expire_options(account, quote_adapter)
+        self.assertEqual(account.margin_by_underlying, {})
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
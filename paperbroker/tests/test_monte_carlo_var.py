@@ -0,0 +1,118 @@
+import math
+import tempfile
+import unittest
+
+import numpy as np
+
+from .TestDataQuoteAdapter import TestDataQuoteAdapter
+from ..PaperBroker import PaperBroker
+from ..accounts import Account
+from ..adapters.accounts import LocalFileSystemAccountAdapter
+from ..assets import Asset, asset_factory
+from ..logic.monte_carlo_var import monte_carlo_var, simulate_var
+from ..positions import Position
+from ..quotes import OptionQuote, Quote
+
+
+class TestMonteCarloVaR(unittest.TestCase):
+
+    def setUp(self):
+        self.quote_adapter = TestDataQuoteAdapter(current_date='2017-01-27')
+        self.price = self.quote_adapter.get_quote('AAL').price
+
+    def account(self, *positions, account_id=None):
+        return Account(positions=[Position(asset_factory(symbol), quantity) for symbol, quantity in positions], account_id=account_id)
+
+    def test_stock_matches_the_lognormal_quantile(self):
+        report = monte_carlo_var(self.account(('AAL', 100)), self.quote_adapter, paths=200000, seed=1, volatilities={'AAL': 0.3})
+
+        scale = 0.3 * math.sqrt(1 / 365.0)
+        expected = 100 * self.price * (1 - math.exp(-0.5 * scale ** 2 - 2.326348 * scale))
+        self.assertAlmostEqual(report.var / expected, 1.0, delta=0.02)
+        self.assertGreater(report.expected_shortfall, report.var)
+        self.assertEqual(list(report.by_underlying), ['AAL'])
+        self.assertAlmostEqual(report.by_underlying['AAL']['var'], report.var)
+
+    def test_seeds_and_chunks(self):
+        account = self.account(('AAL', 100), ('AAL170203C00047000', -1), ('AAL170203P00046000', 2))
+        first = monte_carlo_var(account, self.quote_adapter, paths=5000, seed=3, chunk_size=700)
+        second = monte_carlo_var(account, self.quote_adapter, paths=5000, seed=3, chunk_size=5000)
+        other = monte_carlo_var(account, self.quote_adapter, paths=5000, seed=4)
+
+        self.assertTrue(np.allclose(first.pnl, second.pnl))
+        self.assertEqual(first.var, second.var)
+        self.assertNotEqual(first.var, other.var)
+
+        # interpolating the options' grid is as good as repricing them on every path
+        exact = monte_carlo_var(account, self.quote_adapter, paths=5000, seed=3, grid_points=None)
+        self.assertTrue(np.allclose(first.pnl, exact.pnl, atol=0.01))
+
+    def test_correlations(self):
+        # BBB moves like AAL, and at the same price
+        bbb = Position(Asset('BBB'), -100, quote=Quote('2017-01-27', Asset('BBB'), price=self.price))
+        account = self.account(('AAL', 100))
+        account.positions.append(bbb)
+        volatilities = {'AAL': 0.3, 'BBB': 0.3}
+
+        hedged = monte_carlo_var(account, self.quote_adapter, paths=20000, seed=5, volatilities=volatilities, correlations={('AAL', 'BBB'): 1.0})
+        independent = monte_carlo_var(account, self.quote_adapter, paths=20000, seed=5, volatilities=volatilities, correlations=0.0)
+
+        self.assertAlmostEqual(hedged.var, 0.0, places=6)
+        self.assertAlmostEqual(independent.var / independent.by_underlying['AAL']['var'], math.sqrt(2), delta=0.1)
+
+        with self.assertRaises(Exception):
+            monte_carlo_var(account, self.quote_adapter, correlations=[[1.0, 2.0], [2.0, 1.0]])
+
+    def test_options_and_every_account(self):
+        account_adapter = LocalFileSystemAccountAdapter(root=tempfile.mkdtemp())
+        broker = PaperBroker(quote_adapter=self.quote_adapter, account_adapter=account_adapter)
+        accounts = [self.account(('AAL170203C00047000', 10), account_id='calls'),
+                    self.account(('AAL170203P00047000', -10), ('AAL170203P00046000', 10), account_id='spread')]
+        for account in accounts:
+            account_adapter.put_account(account)
+
+        reports = {_.account_id: _ for _ in broker.get_value_at_risk(paths=20000, seed=9)}
+        self.assertEqual(sorted(reports), ['calls', 'spread'])
+
+        # long calls can't lose more than they're worth, a spread no more than its width less its credit
+        calls_value = 10 * 100 * self.quote_adapter.get_quote('AAL170203C00047000').price
+        self.assertTrue(0 < reports['calls'].var < calls_value)
+        self.assertTrue(0 < reports['spread'].var <= reports['spread'].expected_shortfall < 10 * 100 * 1.0)
+
+        # the same paths as simulating them together here
+        together = simulate_var(accounts, self.quote_adapter, paths=20000, seed=9)
+        self.assertEqual([_.var for _ in together], [reports['calls'].var, reports['spread'].var])
+
+    def test_flat_accounts(self):
+        report = monte_carlo_var(Account(), self.quote_adapter, paths=1000, seed=1)
+        self.assertEqual((report.var, report.expected_shortfall, report.by_underlying), (0.0, 0.0, {}))
+        self.assertEqual(len(report.pnl), 1000)
+        self.assertEqual(simulate_var([], self.quote_adapter), [])
+
+        account_adapter = LocalFileSystemAccountAdapter(root=tempfile.mkdtemp())
+        account_adapter.put_account(Account(account_id='cash'))
+        broker = PaperBroker(quote_adapter=self.quote_adapter, account_adapter=account_adapter)
+        self.assertEqual(broker.get_value_at_risk(account_ids=[]), [])
+        self.assertEqual([(_.account_id, _.var) for _ in broker.get_value_at_risk(paths=1000)], [('cash', 0.0)])
+
+    def test_options_without_an_underlying_price(self):
+        # priced at intrinsic value off AAL's own quote, rather than left out
+        quote = OptionQuote('2017-01-27', 'AAL170203C00045000', price=2.5)
+        account = Account(positions=[Position(quote.asset, 10, quote=quote)])
+        report = monte_carlo_var(account, self.quote_adapter, paths=5000, seed=2, volatilities={'AAL': 0.3})
+        self.assertEqual(report.unpriced, [])
+        self.assertEqual(list(report.by_underlying), ['AAL'])
+
+        # moving with the shares, as the call is in the money
+        shares = monte_carlo_var(self.account(('AAL', 1000)), self.quote_adapter, paths=5000, seed=2, volatilities={'AAL': 0.3})
+        self.assertAlmostEqual(report.var / shares.var, 1.0, delta=0.05)
+
+        # and listed when the underlying can't be priced either
+        quote = OptionQuote('2017-01-27', 'ZZZ170203C00045000', price=2.5)
+        account.positions.append(Position(quote.asset, 1, quote=quote))
+        report = monte_carlo_var(account, self.quote_adapter, paths=5000, seed=2, volatilities={'AAL': 0.3})
+        self.assertEqual(report.unpriced, ['ZZZ170203C00045000'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import pickle
+from unittest import mock
+
+from .. import quotes
+from ..quotes import OptionQuote
+from ..positions import Position
+from ..slotted import slot_names
+
+
+class TestOptionQuotes(unittest.TestCase):
+
+    def create_quote(self, **kwargs):
+        return OptionQuote('2017-01-27', 'AAL170203P00046500', bid=0.49, ask=0.53, underlying_price=47.36, **kwargs)
+
+    def test_greeks_are_solved_once_on_first_read(self):
+        with mock.patch.object(quotes, 'get_cached_option_greeks', wraps=quotes.get_cached_option_greeks) as get_cached_option_greeks:
+            quote = self.create_quote()
+            self.assertAlmostEqual(quote.price, 0.51)
+            self.assertEqual(get_cached_option_greeks.call_count, 0)
+
+            self.assertAlmostEqual(quote.delta, -33.86, places=2)
+            self.assertAlmostEqual(quote.iv, 33.70, places=2)
+            self.assertIsNotNone(quote.gamma)
+            self.assertIsNotNone(quote.theta)
+            self.assertEqual(get_cached_option_greeks.call_count, 1)
+
+    def test_position_greeks(self):
+        position = Position('AAL170203P00046500', -2, 0.51, quote=self.create_quote())
+        self.assertAlmostEqual(position.delta, 33.86 * 2 * 100, delta=1)
+        self.assertLess(position.gamma, 0)
+
+    def test_greek_orders(self):
+        with mock.patch.object(OptionQuote, 'greek_orders', (1,)):
+            quote = self.create_quote(gamma=1.5)
+            self.assertIsNotNone(quote.delta)
+            self.assertEqual(quote.gamma, 1.5)
+
+    def test_defaults_when_greeks_cannot_be_solved(self):
+        quote = OptionQuote('2017-01-27', 'AAL170203P00046500', bid=0.49, ask=0.53, delta=-30.0)
+        self.assertEqual(quote.delta, -30.0)
+        self.assertIsNone(quote.iv)
+        self.assertFalse(quote.has_greeks())
+
+    def test_given_greeks_are_kept(self):
+        quote = self.create_quote(iv=40.0)
+        self.assertEqual(quote.iv, 40.0)
+        self.assertAlmostEqual(quote.delta, -33.86, places=2)
+        self.assertEqual(quote.iv, 40.0)
+
+        # with nothing extra on each quote to hold them
+        self.assertNotIn('_greek_defaults', slot_names(OptionQuote))
+
+    def test_set_greeks_are_kept(self):
+        quote = self.create_quote()
+        quote.iv = 50.0
+        self.assertEqual(quote.iv, 50.0)
+        self.assertAlmostEqual(quote.delta, -33.86, places=2)
+        self.assertEqual(quote.iv, 50.0)
+
+    def test_pickle_before_solving(self):
+        quote = pickle.loads(pickle.dumps(self.create_quote()))
+        self.assertAlmostEqual(quote.delta, -33.86, places=2)
+
+        with self.assertRaises(AttributeError):
+            quote.not_an_attribute
+
+
+if __name__ == '__main__':
+    unittest.main()
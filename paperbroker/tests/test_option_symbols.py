@@ -0,0 +1,43 @@
+import unittest
+import arrow
+
+from ..assets import asset_factory, Option, Put, Call
+from ..logic.option_symbols import decode_option_symbol, encode_option_symbol, date_to_ordinal, ordinal_to_date_string
+
+
+class TestOptionSymbols(unittest.TestCase):
+
+    def test_decode(self):
+        underlying, expiration_date, expiration_ordinal, option_type, strike = decode_option_symbol('AAL170203P00046500')
+        self.assertEqual(underlying, 'AAL')
+        self.assertEqual(expiration_date, '2017-02-03')
+        self.assertEqual(ordinal_to_date_string(expiration_ordinal), '2017-02-03')
+        self.assertEqual(option_type, 'put')
+        self.assertEqual(strike, 46.5)
+
+        self.assertEqual(decode_option_symbol('GOOG180119C00960000')[1:], ('2018-01-19', date_to_ordinal('2018-01-19'), 'call', 960.0))
+
+    def test_encode(self):
+        self.assertEqual(encode_option_symbol('AAL', '2017-02-03', 'put', 46.5), 'AAL170203P00046500')
+        self.assertEqual(encode_option_symbol('goog', arrow.get('2018-01-19'), 'call', 960), 'GOOG180119C00960000')
+
+    def test_matches_arrow(self):
+        for symbol in ['AAL170203P00046500', 'SPY991231C00100000', 'SPY000101P00100000', 'SPY680229C00001500']:
+            r = symbol[::-1]
+            self.assertEqual(decode_option_symbol(symbol)[1], arrow.get(r[9:15][::-1], 'YYMMDD').format('YYYY-MM-DD'))
+
+        for as_of in ['2017-01-27', arrow.get('2017-01-27'), arrow.get('2017-01-27').date()]:
+            self.assertEqual(asset_factory('AAL170203P00046500').get_days_to_expiration(as_of), 7)
+
+    def test_option_from_parts(self):
+        option = Put(underlying='AAL', strike=46.5, expiration_date='2017-02-03')
+        self.assertEqual(option.symbol, 'AAL170203P00046500')
+        self.assertEqual(option.expiration_date, '2017-02-03')
+        self.assertEqual(option.expiration_ordinal, asset_factory('AAL170203P00046500').expiration_ordinal)
+
+        with self.assertRaises(Exception):
+            Call(underlying='AAL', strike=46.5, expiration_date='not a date')
+
+
+if __name__ == '__main__':
+    unittest.main()
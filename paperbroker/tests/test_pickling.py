@@ -0,0 +1,69 @@
+import unittest
+import os
+import pickle
+import tempfile
+from copy import deepcopy
+
+from ..adapters.accounts import LocalFileSystemAccountAdapter
+from ..assets import asset_factory
+from ..orders import Leg
+from ..quotes import OptionQuote
+
+"""
+    test_data/legacy_account.pickle was written by LocalFileSystemAccountAdapter before assets,
+      quotes and positions had __slots__. It holds 100 AAL and -2 AAL170203P00046500 with quotes from 2017-01-27
+"""
+
+LEGACY_ACCOUNT = os.path.join(os.path.dirname(__file__), 'test_data/legacy_account.pickle')
+
+
+class TestPickling(unittest.TestCase):
+
+    def load_legacy_account(self):
+        with open(LEGACY_ACCOUNT, 'rb') as f:
+            return pickle.load(f)
+
+    def test_load_legacy_account(self):
+        account = self.load_legacy_account()
+
+        self.assertEqual(account.account_id, 'legacy_account')
+        self.assertEqual(account.cash, 9500.0)
+        self.assertEqual([_.asset for _ in account.positions], ['AAL', 'AAL170203P00046500'])
+
+        stock, put = account.positions
+        self.assertFalse(hasattr(put, '__dict__'))
+        self.assertFalse(hasattr(put.quote, '__dict__'))
+        self.assertEqual(put.id, 'position2')
+        self.assertEqual(put.quantity, -2)
+        self.assertEqual(put.multiplier, 100)
+        self.assertIsInstance(put.quote, OptionQuote)
+        self.assertAlmostEqual(put.quote.price, 0.51)
+        self.assertEqual(put.quote.days_to_expiration, 7)
+        self.assertEqual(put.asset.get_days_to_expiration('2017-01-27'), 7)
+        self.assertEqual(put.asset.underlying, stock.asset)
+        self.assertEqual(hash(put.asset), hash(asset_factory('AAL170203P00046500')))
+        self.assertAlmostEqual(stock.total_close_cost, -4736.0)
+
+    def test_round_trip_through_account_adapter(self):
+        account = self.load_legacy_account()
+        account_adapter = LocalFileSystemAccountAdapter(root=tempfile.mkdtemp())
+        account_adapter.put_account(account)
+        loaded = account_adapter.get_account(account.account_id)
+
+        self.assertEqual([(_.asset, _.quantity, _.cost_basis) for _ in loaded.positions],
+                         [(_.asset, _.quantity, _.cost_basis) for _ in account.positions])
+        self.assertIs(loaded.positions[1].asset, asset_factory('AAL170203P00046500'))
+        self.assertAlmostEqual(loaded.positions[1].quote.delta, account.positions[1].quote.delta)
+
+    def test_deepcopy(self):
+        account = self.load_legacy_account()
+        copied = deepcopy(account)
+        copied.positions[0].quantity = 50
+        self.assertEqual(account.positions[0].quantity, 100)
+
+        leg = Leg(asset=asset_factory('AAL'), quantity=5, order_type='sto', price=1.0)
+        self.assertEqual(pickle.loads(pickle.dumps(leg)).quantity, -5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import math
+import random
+import tempfile
+import unittest
+
+from .TestDataQuoteAdapter import TestDataQuoteAdapter
+from ..PaperBroker import PaperBroker
+from ..accounts import Account
+from ..adapters.accounts import LocalFileSystemAccountAdapter
+from ..assets import Asset, asset_factory
+from ..logic.maintenance_margin import get_maintenance_margin
+from ..logic.portfolio_risk import get_portfolio_risk
+from ..positions import Position
+
+
+class TestPortfolioRisk(unittest.TestCase):
+
+    def setUp(self):
+        self.quote_adapter = TestDataQuoteAdapter(current_date='2017-01-27')
+        self.account_adapter = LocalFileSystemAccountAdapter(root=tempfile.mkdtemp())
+        self.broker = PaperBroker(quote_adapter=self.quote_adapter, account_adapter=self.account_adapter)
+
+        rng = random.Random(5)
+        symbols = ['AAL1702{}{}000{}000'.format(expiration, option_type, strike) for expiration in ('03', '10')
+                   for option_type in ('C', 'P') for strike in (44, 45, 46, 47, 48, 49)]
+        self.accounts = []
+        for i in range(40):
+            # some long options and a few naked short ones, then spreads
+            positions = [Position(asset_factory(rng.choice(symbols)), rng.choice([-1, 1, 1, 1, 1]) * rng.randint(1, 4))
+                         for _ in range(rng.randint(0, 2))]
+            for _ in range(rng.randint(0, 3)):
+                option_type = rng.choice('CP')
+                sell, buy = rng.sample([_ for _ in symbols if _[9] == option_type], 2)
+                quantity = rng.randint(1, 4)
+                positions += [Position(asset_factory(sell), -quantity), Position(asset_factory(buy), quantity)]
+            if rng.random() < 0.5:
+                positions.append(Position(Asset('AAL'), rng.choice([50, 100, 300])))
+            account = Account(positions=positions, account_id='account{:02d}'.format(i))
+            account.cash = rng.choice([0, 100, 1000, 100000])
+            self.account_adapter.put_account(account)
+            self.accounts.append(account)
+
+    def expected(self, account):
+        try:
+            margin = get_maintenance_margin(positions=account.positions, quote_adapter=self.quote_adapter)
+        except Exception:
+            margin = None
+        value = 0.0
+        for position in account.positions:
+            quote = self.quote_adapter.get_quote(position.asset)
+            if quote.is_priceable():
+                value += quote.price * position.quantity * position.multiplier
+        return margin, value
+
+    def test_matches_each_account(self):
+        summary = self.broker.get_portfolio_risk()
+        self.assertEqual(sorted(summary['account_id']), sorted(_.account_id for _ in self.accounts))
+
+        rows = {row['account_id']: row for row in summary}
+        for account in self.accounts:
+            row = rows[account.account_id]
+            margin, value = self.expected(account)
+            if margin is None:
+                self.assertTrue(math.isnan(row['maintenance_margin']))
+                self.assertTrue(row['margin_call'])
+            else:
+                self.assertAlmostEqual(row['maintenance_margin'], margin)
+                self.assertEqual(row['margin_call'], account.cash < margin)
+            self.assertAlmostEqual(row['net_liquidation'], account.cash + value, places=6)
+
+        # margin calls come first
+        calls = list(summary['margin_call'])
+        self.assertEqual(calls, sorted(calls, reverse=True))
+        self.assertTrue(any(calls) and not all(calls))
+
+    def test_process_pool_and_short_stock(self):
+        account = Account(positions=[Position(Asset('AAL'), -200), Position(asset_factory('AAL170203P00047000'), -1),
+                                     Position(asset_factory('AAL170203P00046000'), 1)], account_id='short')
+        self.account_adapter.put_account(account)
+
+        summary = get_portfolio_risk(self.account_adapter, self.quote_adapter, shard_size=7)
+        pooled = get_portfolio_risk(self.account_adapter, self.quote_adapter, shard_size=7, processes=2)
+        for field in ('account_id', 'cash', 'net_liquidation', 'margin_call'):
+            self.assertEqual(list(pooled[field]), list(summary[field]))
+
+        row = summary[summary['account_id'] == 'short'][0]
+        self.assertAlmostEqual(row['maintenance_margin'], 100.0 + 200 * self.quote_adapter.get_quote('AAL').price)
+
+
+if __name__ == '__main__':
+    unittest.main()
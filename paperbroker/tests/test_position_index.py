@@ -0,0 +1,101 @@
+import pickle
+import unittest
+from copy import deepcopy
+
+from .TestDataQuoteAdapter import TestDataQuoteAdapter
+from ..accounts import Account
+from ..adapters.quotes import SnapshotQuoteAdapter
+from ..logic.close_expired_options import close_expired_options
+from ..logic.fill_order import fill_order
+from ..logic.group_into_basic_strategies import group_into_basic_strategies
+from ..orders import Order
+from ..positions import Position, PositionList
+from ..quotes import Quote
+
+
+def symbols(positions):
+    return sorted(_.asset.symbol for _ in positions)
+
+
+class TestPositionIndex(unittest.TestCase):
+
+    def assertIndexed(self, positions):
+        """The index matches what scanning the list finds"""
+        for position in positions:
+            self.assertIn(position, positions.for_symbol(position.asset))
+        for symbol in set(_.asset.symbol for _ in positions):
+            self.assertEqual(positions.for_symbol(symbol), [_ for _ in positions if _.asset.symbol == symbol])
+        self.assertEqual(sum(len(_) for _ in positions.by_symbol.values()), len(positions))
+
+    def test_lookups(self):
+        positions = PositionList([Position('AAL', 100), Position('AAL170203P00046500', -1), Position('AAL170203P00046500', -2),
+                                  Position('AAL170210C00047000', 1), Position('GOOG', 10)])
+        self.assertEqual([_.quantity for _ in positions.for_symbol('AAL170203P00046500')], [-1, -2])
+        self.assertEqual(symbols(positions.in_underlying('AAL')), ['AAL', 'AAL170203P00046500', 'AAL170203P00046500', 'AAL170210C00047000'])
+        self.assertEqual(positions.option_underlyings(), ['AAL'])
+        self.assertEqual(symbols(positions.expired_before(positions[3].asset.expiration_ordinal)), ['AAL170203P00046500'] * 2)
+        self.assertEqual(symbols(positions.expiring_on(positions[3].asset.expiration_ordinal)), ['AAL170210C00047000'])
+
+        positions[1].quantity = 0
+        positions.prune()
+        self.assertEqual(len(positions), 4)
+        self.assertIndexed(positions)
+
+        positions.remove(positions[0])
+        positions.pop()
+        self.assertEqual(positions.in_underlying('GOOG'), [])
+        self.assertEqual(symbols(positions.in_underlying('AAL')), ['AAL170203P00046500', 'AAL170210C00047000'])
+        self.assertIndexed(positions)
+
+    def test_account_keeps_an_index(self):
+        account = Account(positions=[Position('AAL', 100)])
+        self.assertIsInstance(account.positions, PositionList)
+        account.positions = [Position('AAL170203P00046500', -1)]
+        self.assertEqual(symbols(account.positions.in_underlying('AAL')), ['AAL170203P00046500'])
+
+        for copied in (deepcopy(account), pickle.loads(pickle.dumps(account))):
+            self.assertIsInstance(copied.positions, PositionList)
+            self.assertIsNot(copied.positions.for_symbol('AAL170203P00046500')[0], account.positions[0])
+            self.assertIndexed(copied.positions)
+
+    def test_fill_order_opens_and_closes_lots(self):
+        quote_adapter = TestDataQuoteAdapter(current_date='2017-01-27')
+        account = Account()
+
+        for quantity in (-1, -2, -3):
+            order = Order()
+            order.add_leg(asset='AAL170203P00046500', quantity=quantity, order_type='sto')
+            fill_order(account=account, order=order, quote_adapter=quote_adapter)
+
+        order = Order()
+        order.add_leg(asset='AAL170203P00046500', quantity=4, order_type='btc')
+        fill_order(account=account, order=order, quote_adapter=quote_adapter)
+
+        # the oldest lots close first
+        self.assertEqual([_.quantity for _ in account.positions], [-2])
+        self.assertEqual(account.positions.for_symbol('AAL170203P00046500'), list(account.positions))
+        self.assertIndexed(account.positions)
+
+    def test_grouping_matches_a_plain_list(self):
+        positions = [Position('AAL', 100), Position('AAL170203C00047000', -1), Position('AAL170203P00046500', -1),
+                     Position('AAL170203P00046000', 1), Position('GOOG', 10)]
+
+        def describe(strategies):
+            return sorted(str((_.strategy_type, _.quantity, getattr(_, 'asset', None), getattr(_, 'sell_option', None))) for _ in strategies)
+
+        self.assertEqual(describe(group_into_basic_strategies(PositionList(positions))), describe(group_into_basic_strategies(positions)))
+
+    def test_expiring_each_underlying_at_its_own_price(self):
+        quote_adapter = SnapshotQuoteAdapter([Quote('2017-02-06', 'AAL', bid=46.99, ask=47.01),
+                                              Quote('2017-02-06', 'GOOG', bid=799.99, ask=800.01)])
+        account = Account(positions=[Position('AAL170203C00045000', 1), Position('GOOG170203C00700000', 1)])
+
+        close_expired_options(account=account, quote_adapter=quote_adapter, market_adapter=None)
+
+        self.assertEqual(sorted((_.asset.symbol, _.quantity) for _ in account.positions), [('AAL', 100), ('GOOG', 100)])
+        self.assertEqual(account.positions.expired_before(10 ** 6), [])
+        self.assertIndexed(account.positions)
+
+
+if __name__ == '__main__':
+    unittest.main()
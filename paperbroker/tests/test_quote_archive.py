@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from ..adapters.quotes.QuoteArchiveAdapter import QuoteArchiveAdapter
+from ..quote_archive import convert_csv_to_archive, QuoteArchive
+from ..quote_store import ColumnarQuoteStore
+from ..quotes import OptionQuote
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), 'test_data', 'data.csv.gz')
+
+
+class TestQuoteArchive(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.filename = os.path.join(cls.directory, 'data.pbqa')
+        convert_csv_to_archive(TEST_DATA, cls.filename)
+        cls.archive = QuoteArchive(cls.filename)
+        cls.store = ColumnarQuoteStore.from_csv(TEST_DATA)
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.archive
+        shutil.rmtree(cls.directory)
+
+    def test_matches_the_csv(self):
+        self.assertEqual(len(self.archive), len(self.store))
+        self.assertEqual(self.archive.get_dates(), self.store.get_dates())
+
+        for quote_date in self.store.get_dates():
+            for underlying in ['AAL', 'GOOG', None]:
+                expirations = self.store.get_expiration_dates(underlying, quote_date)
+                self.assertEqual(self.archive.get_expiration_dates(underlying, quote_date), expirations)
+
+                for expiration_date in expirations[:2] + [None]:
+                    expected = [(_.asset.symbol, _.bid, _.ask, _.underlying_price) for _ in self.store.get_options(underlying, quote_date, expiration_date)]
+                    options = [(_.asset.symbol, _.bid, _.ask, _.underlying_price) for _ in self.archive.get_options(underlying, quote_date, expiration_date)]
+                    self.assertEqual(sorted(options), sorted(expected))
+
+    def test_get_quote(self):
+        quote = self.archive.get_quote('AAL170203P00046500', '2017-01-27')
+        self.assertIsInstance(quote, OptionQuote)
+        self.assertEqual(quote.quote_date, '2017-01-27')
+        self.assertAlmostEqual(quote.price, 0.51, places=2)
+        self.assertAlmostEqual(quote.underlying_price, 47.36, places=2)
+
+        self.assertAlmostEqual(self.archive.get_quote('GOOG', '2017-01-27').bid, 828.57, places=2)
+        self.assertIsNone(self.archive.get_quote('AAL', '2017-01-29'))
+        self.assertIsNone(self.archive.get_quote('MSFT', '2017-01-27'))
+        self.assertEqual(self.archive.get_options('MSFT', '2017-01-27'), [])
+
+    def test_adapter(self):
+        adapter = QuoteArchiveAdapter(self.filename, current_date='2017-01-28')
+        self.assertAlmostEqual(adapter.get_quote('AAL').price, 46.95, places=2)
+        self.assertIn('AAL170203P00046000', [_.asset for _ in adapter.get_options('AAL', '2017-02-03')])
+
+    def test_not_an_archive(self):
+        with self.assertRaises(Exception):
+            QuoteArchive(TEST_DATA)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import unittest
+
+from ..adapters.quotes.HistoricalQuoteAdapter import HistoricalQuoteAdapter
+from ..quote_store import ColumnarQuoteStore
+from ..quotes import OptionQuote
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), 'test_data', 'data.csv.gz')
+
+
+class TestColumnarQuoteStore(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.store = ColumnarQuoteStore.from_csv(TEST_DATA)
+
+    def test_get_quote(self):
+        quote = self.store.get_quote('AAL', '2017-01-28')
+        self.assertAlmostEqual(quote.price, 46.95, places=2)
+
+        quote = self.store.get_quote('AAL170203P00046500', '2017-01-27')
+        self.assertIsInstance(quote, OptionQuote)
+        self.assertAlmostEqual(quote.bid, 0.49, places=2)
+        self.assertAlmostEqual(quote.underlying_price, 47.36, places=2)
+        self.assertAlmostEqual(quote.delta, -33.86, places=2)
+
+        self.assertIsNone(self.store.get_quote('AAL', '2017-01-29'))
+        self.assertIsNone(self.store.get_quote('MSFT', '2017-01-27'))
+
+    def test_chains(self):
+        options = self.store.get_options('AAL', '2017-01-27', expiration_date='2017-02-03')
+        self.assertIn('AAL170203P00046000', [_.asset.symbol for _ in options])
+        self.assertTrue(all(_.asset.expiration_date == '2017-02-03' and _.asset.underlying.symbol == 'AAL' for _ in options))
+
+        chain = self.store.get_options('AAL', '2017-01-27')
+        self.assertEqual(sorted(set(_.asset.expiration_date for _ in chain)), self.store.get_expiration_dates('AAL', '2017-01-27'))
+        self.assertTrue(all(_.quote_date == '2017-01-27' for _ in chain))
+
+        every_chain = self.store.get_options(None, '2017-01-27')
+        self.assertEqual(set(_.asset.underlying.symbol for _ in every_chain), {'AAL', 'GOOG'})
+
+        self.assertEqual(self.store.get_options('AAL', '2017-01-27', expiration_date='2017-02-04'), [])
+        self.assertEqual(self.store.get_options('MSFT', '2017-01-27'), [])
+
+    def test_underlyings_filter(self):
+        store = ColumnarQuoteStore.from_rows([('AAL', '2017-01-27', 47.35, 47.37),
+                                              ('AAL170203P00046500', '2017-01-27', 0.49, 0.53),
+                                              ('GOOG', '2017-01-27', 828.57, 829.10)], underlyings=['aal'])
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.get_dates(), ['2017-01-27'])
+
+
+class TestHistoricalQuoteAdapter(unittest.TestCase):
+
+    def test_current_date(self):
+        adapter = HistoricalQuoteAdapter.from_csv(TEST_DATA, underlyings=['GOOG'])
+        self.assertEqual(adapter.current_date, '2017-01-27')
+        self.assertIsNone(adapter.get_quote('AAL'))
+
+        adapter.current_date = '2017-03-24'
+        self.assertEqual(adapter.get_quote('GOOG').quote_date, '2017-03-24')
+        self.assertGreater(len(adapter.get_expiration_dates('GOOG')), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+
+from .TestDataQuoteAdapter import TestDataQuoteAdapter
+from .test_caching_quote_adapter import Clock, CountingQuoteAdapter
+from ..PaperBroker import PaperBroker
+from ..adapters.accounts import LocalFileSystemAccountAdapter
+from ..adapters.quotes import RecordingQuoteAdapter, ReplayQuoteAdapter
+from ..quotes import OptionQuote
+
+
+class TestReplayQuoteAdapter(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def record(self, filename, quote_adapter, clock=None):
+        return RecordingQuoteAdapter(quote_adapter, os.path.join(self.directory, filename), clock=clock or Clock())
+
+    def test_round_trip(self):
+        for filename in ('quotes.jsonl', 'quotes.jsonl.gz'):
+            upstream = TestDataQuoteAdapter(current_date='2017-01-27')
+            recorder = self.record(filename, upstream)
+            recorder.get_quote('AAL')
+            recorder.get_quotes(['AAL170203P00046500', 'AAL170203P00046000'])
+            chain = recorder.get_options('AAL', '2017-02-03')
+            recorder.get_expiration_dates('AAL')
+            recorder.close()
+            self.assertEqual(recorder.records, 4)
+
+            replay = ReplayQuoteAdapter(recorder.filename)
+            self.assertAlmostEqual(replay.get_quote('AAL').price, 47.36, places=2)
+            put = replay.get_quote('AAL170203P00046500')
+            self.assertIsInstance(put, OptionQuote)
+            self.assertAlmostEqual(put.price, 0.51, places=2)
+            self.assertAlmostEqual(put.underlying_price, 47.36, places=2)
+            self.assertAlmostEqual(put.delta, upstream.get_quote('AAL170203P00046500').delta, places=4)
+
+            # quotes that were only recorded as part of a chain
+            self.assertEqual([_.asset.symbol for _ in replay.get_options('AAL', '2017-02-03')], [_.asset.symbol for _ in chain])
+            self.assertIsNotNone(replay.get_quote(chain[-1].asset))
+            self.assertEqual(replay.get_expiration_dates('AAL'), upstream.get_expiration_dates('AAL'))
+
+            with self.assertRaises(Exception):
+                replay.get_quote('AAPL')
+            with self.assertRaises(Exception):
+                replay.get_options('AAL', '2017-02-10')
+
+    def test_sequential(self):
+        upstream = TestDataQuoteAdapter(current_date='2017-01-27')
+        recorder = self.record('days.jsonl', upstream)
+        recorder.get_quote('AAL')
+        upstream.current_date = '2017-01-28'
+        recorder.get_quote('AAL')
+        recorder.close()
+
+        self.assertAlmostEqual(ReplayQuoteAdapter(recorder.filename).get_quote('AAL').price, 46.95, places=2)
+
+        replay = ReplayQuoteAdapter(recorder.filename, sequential=True)
+        self.assertEqual([round(replay.get_quote('AAL').price, 2) for _ in range(3)], [47.36, 46.95, 46.95])
+        replay.rewind()
+        self.assertAlmostEqual(replay.get_quote('AAL').price, 47.36, places=2)
+
+    def test_replay_calls(self):
+        clock = Clock()
+        recorder = self.record('calls.jsonl', TestDataQuoteAdapter(current_date='2017-01-27'), clock=clock)
+        recorder.get_quote('AAL')
+        clock.now = 10
+        recorder.get_quotes(['AAL170203P00046500'])
+        clock.now = 30
+        recorder.get_options('AAL', '2017-02-03')
+        recorder.close()
+
+        replay = ReplayQuoteAdapter(recorder.filename)
+        self.assertEqual([_[0] for _ in replay.calls], [0, 10, 30])
+
+        upstream = CountingQuoteAdapter()
+        sleeps = []
+        replay_clock = Clock()
+        self.assertEqual(replay.replay(upstream, speed=10, sleep=sleeps.append, clock=replay_clock), 3)
+        self.assertEqual(sleeps, [1.0, 3.0])
+        self.assertEqual(upstream.requests, [['AAL170203P00046500'], ('chain', 'AAL', '2017-02-03')])
+
+    def test_broker_on_replay(self):
+        recorder = self.record('orders.jsonl', TestDataQuoteAdapter(current_date='2017-01-27'))
+        account_adapter = LocalFileSystemAccountAdapter(root=self.directory)
+
+        broker = PaperBroker(quote_adapter=recorder, account_adapter=account_adapter)
+        account = broker.open_account()
+        broker.sell_to_open(account, 'AAL170203P00046500', 2)
+        recorder.close()
+
+        replay_broker = PaperBroker(quote_adapter=ReplayQuoteAdapter(recorder.filename), account_adapter=account_adapter)
+        replay_account = replay_broker.open_account()
+        replay_broker.sell_to_open(replay_account, 'AAL170203P00046500', 2)
+
+        self.assertAlmostEqual(replay_account.cash, account.cash)
+        self.assertEqual(len(replay_account.positions), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import math
+import unittest
+
+import numpy as np
+
+from .TestDataQuoteAdapter import TestDataQuoteAdapter
+from ..accounts import Account
+from ..assets import Asset, asset_factory
+from ..logic.scenario_risk import scenario_grid
+from ..positions import Position
+from ..quotes import OptionQuote
+
+
+class TestScenarioGrid(unittest.TestCase):
+
+    def setUp(self):
+        self.quote_adapter = TestDataQuoteAdapter(current_date='2017-01-27')
+
+    def account(self, *positions):
+        account = Account(positions=[Position(asset_factory(symbol), quantity) for symbol, quantity in positions])
+        account.cash = 10000
+        return account
+
+    def test_no_shock_is_no_change(self):
+        account = self.account(('AAL', 100), ('AAL170203C00047000', 2), ('AAL170210P00046000', -1), ('AAL170210P00045000', 1))
+        grid = scenario_grid(account, [-0.1, 0.0, 0.1], [-5, 0, 5], quote_adapter=self.quote_adapter)
+
+        self.assertEqual(grid.pnl.shape, (3, 3))
+        self.assertAlmostEqual(grid.pnl[1, 1], 0.0, places=6)
+        value = sum(self.quote_adapter.get_quote(_.asset).price * _.quantity * _.multiplier for _ in account.positions)
+        self.assertAlmostEqual(grid.value, value, places=6)
+        self.assertAlmostEqual(grid.net_liquidation[1, 1], 10000 + value, places=6)
+
+        with self.assertRaises(Exception):
+            scenario_grid(account, [0.0], [0.0])
+
+    def test_options_move_with_spot_and_vol(self):
+        spot_shocks, vol_shocks = np.linspace(-0.1, 0.1, 11), np.linspace(-5, 5, 5)
+        calls = scenario_grid(self.account(('AAL170203C00047000', 1)), spot_shocks, vol_shocks, quote_adapter=self.quote_adapter)
+        puts = scenario_grid(self.account(('AAL170203P00047000', 1)), spot_shocks, vol_shocks, quote_adapter=self.quote_adapter)
+
+        self.assertTrue(np.all(np.diff(calls.pnl, axis=0) > 0))
+        self.assertTrue(np.all(np.diff(puts.pnl, axis=0) < 0))
+        self.assertTrue(np.all(np.diff(calls.pnl, axis=1) > 0))
+        self.assertTrue(np.all(np.diff(puts.pnl, axis=1) > 0))
+
+        # a small move is the option's delta
+        quote = self.quote_adapter.get_quote('AAL170203C00047000')
+        small = scenario_grid(self.account(('AAL170203C00047000', 1)), [-0.001, 0.001], [0], quote_adapter=self.quote_adapter)
+        delta = (small.pnl[1, 0] - small.pnl[0, 0]) / (quote.underlying_price * 0.002)
+        self.assertAlmostEqual(delta, quote.delta, delta=1.0)
+
+        stock = scenario_grid(self.account(('AAL', 100)), [-0.1, 0.1], [0], quote_adapter=self.quote_adapter)
+        self.assertAlmostEqual(stock.pnl[1, 0], 100 * self.quote_adapter.get_quote('AAL').price * 0.1)
+
+    def test_margin_surface(self):
+        price = self.quote_adapter.get_quote('AAL').price
+        account = self.account(('AAL', -200), ('AAL170203P00047000', -1), ('AAL170203P00046000', 1))
+        grid = scenario_grid(account, [-0.1, 0.0, 0.1], [-5, 5], quote_adapter=self.quote_adapter)
+        for i, shock in enumerate([-0.1, 0.0, 0.1]):
+            self.assertAlmostEqual(grid.margin[i, 0], 100.0 + 200 * price * (1 + shock))
+            self.assertEqual(grid.margin[i, 0], grid.margin[i, 1])
+
+        naked = scenario_grid(self.account(('AAL170203C00047000', -1)), [0.0], [0.0], quote_adapter=self.quote_adapter)
+        self.assertTrue(math.isnan(naked.margin[0, 0]))
+
+    def test_options_without_an_underlying_price(self):
+        # moved by intrinsic value off AAL's own quote, rather than not at all
+        price = self.quote_adapter.get_quote('AAL').price
+        quote = OptionQuote('2017-01-27', 'AAL170203C00045000', price=2.5)
+        account = self.account()
+        account.positions.append(Position(quote.asset, 1, quote=quote))
+        grid = scenario_grid(account, [-0.1, 0.0, 0.1], [0], quote_adapter=self.quote_adapter)
+
+        self.assertEqual(grid.unpriced, [])
+        self.assertAlmostEqual(grid.value, 250.0)
+        for i, shock in enumerate([-0.1, 0.0, 0.1]):
+            self.assertAlmostEqual(grid.pnl[i, 0], 100 * (max(price * (1 + shock) - 45, 0) - (price - 45)))
+
+        # and listed, and left out, when the underlying can't be priced either
+        quote = OptionQuote('2017-01-27', 'ZZZ170203C00045000', price=2.5)
+        account.positions.append(Position(quote.asset, 1, quote=quote))
+        grid = scenario_grid(account, [-0.1, 0.0, 0.1], [0], quote_adapter=self.quote_adapter)
+        self.assertEqual(grid.unpriced, ['ZZZ170203C00045000'])
+        self.assertAlmostEqual(grid.value, 250.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
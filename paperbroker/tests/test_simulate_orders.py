@@ -0,0 +1,96 @@
+import tempfile
+import unittest
+from copy import deepcopy
+from itertools import combinations
+
+from .TestDataQuoteAdapter import TestDataQuoteAdapter
+from ..PaperBroker import PaperBroker
+from ..accounts import Account
+from ..adapters.accounts import LocalFileSystemAccountAdapter
+from ..logic.fill_order import fill_order
+from ..orders import Order
+
+
+class TestSimulateOrders(unittest.TestCase):
+
+    def setUp(self):
+        self.quote_adapter = TestDataQuoteAdapter(current_date='2017-01-27')
+        self.broker = PaperBroker(quote_adapter=self.quote_adapter, account_adapter=LocalFileSystemAccountAdapter(root=tempfile.mkdtemp()))
+
+        self.account = Account()
+        self.account.cash = 100000
+        for asset, quantity, order_type in (('AAL', 200, 'bto'), ('AAL170203C00047000', -1, 'sto'),
+                                            ('AAL170203P00047000', -1, 'sto'), ('AAL170203P00045000', 1, 'bto')):
+            fill_order(account=self.account, order=self.order((asset, quantity, order_type)), quote_adapter=self.quote_adapter)
+
+    def order(self, *legs):
+        order = Order()
+        for asset, quantity, order_type in legs:
+            order.add_leg(asset=asset, quantity=quantity, order_type=order_type)
+        return order
+
+    def candidates(self):
+        """Put spreads both ways across the 2017-02-03 strikes, and a few orders that can't go through"""
+        puts = sorted([_.asset.symbol for _ in self.quote_adapter.get_options('AAL', '2017-02-03')
+                       if _.asset.option_type == 'put' and _.is_priceable() and 45 <= _.asset.strike <= 49])
+        orders = []
+        for low, high in combinations(puts, 2):
+            orders.append(self.order((high, -1, 'sto'), (low, 1, 'bto')))
+            orders.append(self.order((low, -1, 'sto'), (high, 1, 'bto')))
+        orders.append(self.order(('AAL170203P00046500', 1, 'btc')))
+        orders.append(self.order(('AAL', -100, 'stc')))
+        orders.append(self.order(('AAL', 5000, 'bto')))
+        return orders
+
+    def expected(self, order):
+        """simulate_order the slow way, a full fill and margin calculation on a deep copy"""
+        account = deepcopy(self.account)
+        try:
+            fill_order(account=account, order=deepcopy(order), quote_adapter=self.quote_adapter)
+        except Exception:
+            return None
+        return account
+
+    def test_matches_one_at_a_time(self):
+        orders = self.candidates()
+        before = (self.account.cash, [(_.asset.symbol, _.quantity) for _ in self.account.positions])
+
+        impacts = self.broker.simulate_orders(self.account, orders)
+        self.assertEqual(len(impacts), len(orders))
+
+        for order, impact in zip(orders, impacts):
+            expected = self.expected(order)
+            self.assertIs(impact.account0, self.account)
+            if expected is None:
+                self.assertIsNotNone(impact.validation_error)
+                continue
+            self.assertAlmostEqual(impact.account1.cash, expected.cash, places=6)
+            self.assertEqual(impact.account1.maintenance_margin, expected.maintenance_margin)
+            self.assertEqual(impact.validation_error is None, expected.cash >= 0 and expected.maintenance_margin is not None
+                             and expected.cash >= expected.maintenance_margin)
+
+        # the closing order, the covered stock sale and the order that's too big
+        self.assertEqual([_.validation_error is None for _ in impacts[-3:]], [False, True, False])
+        self.assertEqual((self.account.cash, [(_.asset.symbol, _.quantity) for _ in self.account.positions]), before)
+
+    def test_process_pool(self):
+        orders = self.candidates()
+        impacts = self.broker.simulate_orders(self.account, orders)
+        pooled = self.broker.simulate_orders(self.account, orders, processes=2)
+
+        self.assertEqual([(round(_.account1.cash, 6), _.account1.maintenance_margin, _.validation_error is None) for _ in pooled],
+                         [(round(_.account1.cash, 6), _.account1.maintenance_margin, _.validation_error is None) for _ in impacts])
+        self.assertTrue(all(_.account0 is self.account for _ in pooled))
+
+    def test_fail_fast(self):
+        orders = self.candidates()
+        with self.assertRaises(Exception):
+            self.broker.simulate_orders(self.account, orders[-3:], fail_fast=True)
+
+        impacts = self.broker.simulate_orders(self.account, orders)
+        valid = [order for order, impact in zip(orders, impacts) if impact.validation_error is None]
+        self.assertEqual(len(self.broker.simulate_orders(self.account, valid, fail_fast=True)), len(valid))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+from ..adapters.quotes.StreamingQuoteAdapter import StreamingQuoteAdapter
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), 'test_data', 'data.csv.gz')
+
+
+class TestStreamingQuoteAdapter(unittest.TestCase):
+
+    def test_starts_on_the_first_date(self):
+        adapter = StreamingQuoteAdapter(TEST_DATA)
+        self.assertEqual(adapter.current_date, '2017-01-27')
+        self.assertAlmostEqual(adapter.get_quote('AAL').price, 47.36, places=2)
+        self.assertEqual(list(adapter._stores), [adapter._first_date])
+
+    def test_window_slides_forward(self):
+        adapter = StreamingQuoteAdapter(TEST_DATA, window=2, underlyings=['AAL'])
+        for quote_date in ['2017-01-27', '2017-01-28', '2017-03-24', '2017-03-25']:
+            adapter.current_date = quote_date
+            self.assertEqual(adapter.get_quote('AAL').quote_date, quote_date)
+            self.assertIsNone(adapter.get_quote('GOOG'))
+            self.assertLessEqual(len(adapter._stores), 2)
+
+        options = adapter.get_options('AAL', adapter.get_expiration_dates('AAL')[0])
+        self.assertTrue(len(options) > 0 and all(_.quote_date == '2017-03-25' for _ in options))
+
+    def test_dates_without_quotes(self):
+        adapter = StreamingQuoteAdapter(TEST_DATA, current_date='2017-02-15')
+        self.assertIsNone(adapter.get_quote('AAL'))
+        self.assertEqual(adapter.get_options('AAL'), [])
+
+        # going back to a date that left the window starts over
+        adapter.current_date = '2017-01-27'
+        self.assertAlmostEqual(adapter.get_quote('AAL').price, 47.36, places=2)
+
+    def test_file_must_be_in_date_order(self):
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'unordered.csv')
+            with gzip.open(TEST_DATA, 'rt') as f, open(filename, 'w') as out:
+                lines = f.readlines()
+                out.writelines(lines[-10:] + lines[:10])
+
+            adapter = StreamingQuoteAdapter(filename)
+            with self.assertRaises(Exception):
+                adapter.current_date = '2017-03-26'
+                adapter.get_quote('AAL')
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
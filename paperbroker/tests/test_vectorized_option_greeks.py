@@ -0,0 +1,68 @@
+import unittest
+import math
+
+from .TestDataQuoteAdapter import TestDataQuoteAdapter
+from ..logic.ivolat3_option_greeks import get_option_greeks
+from ..logic.vectorized_option_greeks import get_option_greeks_batch, set_option_quote_greeks
+from ..quotes import OptionQuote
+
+
+class TestVectorizedOptionGreeks(unittest.TestCase):
+
+    # how closely the batch engine has to agree with the scalar one
+    tolerance = {'iv': 1e-4, 'delta': 1e-4, 'vega': 1e-2, 'theta': 1e-4, 'rho': 1e-2, 'gamma': 1e-4}
+
+    def setUp(self):
+        self.quote_adapter = TestDataQuoteAdapter()
+
+    def get_chain(self, current_date):
+        self.quote_adapter.current_date = current_date
+        underlying_price = self.quote_adapter.get_quote('AAL').price
+        options = [_ for _ in self.quote_adapter.get_options('AAL') if _.price]
+        return options, underlying_price
+
+    def test_matches_scalar_greeks(self):
+        for current_date in ['2017-01-27', '2017-03-24']:
+            options, underlying_price = self.get_chain(current_date)
+
+            batch = get_option_greeks_batch(option_types=[_.asset.option_type for _ in options],
+                                            strikes=[_.asset.strike for _ in options],
+                                            underlying_prices=underlying_price,
+                                            days_to_expiration=[_.days_to_expiration for _ in options],
+                                            prices=[_.price for _ in options])
+            self.assertEqual(len(batch), len(options))
+
+            compared = 0
+            for option, row in zip(options, batch):
+                scalar = get_option_greeks(option.asset.option_type, option.asset.strike, underlying_price,
+                                           option.days_to_expiration, option.price)
+                if scalar['iv'] is None or math.isnan(scalar['iv']) or scalar['iv'] == 0.0:
+                    continue
+                compared += 1
+                for name, tolerance in self.tolerance.items():
+                    self.assertLess(abs(scalar[name] - row[name]), tolerance, msg='{} {}'.format(option.asset.symbol, name))
+
+            self.assertGreater(compared, 100)
+
+    def test_unsolvable_options_are_nan(self):
+        batch = get_option_greeks_batch(option_types=['call', 'put', 'straddle', 'put'],
+                                        strikes=[46.5, 46.5, 46.5, 60.0],
+                                        underlying_prices=[47.36, 47.36, 47.36, 47.36],
+                                        days_to_expiration=[0, 7, 7, 7],
+                                        prices=[1.0, None, 1.0, 1.0])
+        for name in batch.dtype.names:
+            self.assertTrue(all(math.isnan(_) for _ in batch[name]))
+
+    def test_set_option_quote_greeks(self):
+        eager = OptionQuote('2017-01-27', 'AAL170203P00046500', bid=0.49, ask=0.53, underlying_price=47.36)
+        batched = OptionQuote('2017-01-27', 'AAL170203P00046500', bid=0.49, ask=0.53)
+        set_option_quote_greeks([batched], underlying_prices=[47.36])
+
+        self.assertAlmostEqual(batched.iv, eager.iv, places=2)
+        self.assertAlmostEqual(batched.delta, eager.delta, places=2)
+        self.assertAlmostEqual(batched.gamma, eager.gamma, places=2)
+        self.assertAlmostEqual(batched.theta, eager.theta, places=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
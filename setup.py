@@ -15,6 +15,7 @@ setup(name='paperbroker',
                 ],
         install_requires=[
             'ivolat3',
+            'numpy',
             'arrow',
             'googlefinance',
             'flask',